@@ -13,13 +13,6 @@ terminals = {"id", "+", "*", "(", ")", "ε"}  # include ε as terminal
 FIRST = {nt: set() for nt in non_terminals}
 FOLLOW = {nt: set() for nt in non_terminals}
 
-# Display grammar
-print("Grammar:")
-for nt, prods in grammar.items():
-    prod_str = [" ".join(p) for p in prods]
-    print(f"{nt} → {' | '.join(prod_str)}")
-print("\n")
-
 # --- Compute FIRST sets ---
 def compute_FIRST(X):
     if X in terminals:
@@ -70,11 +63,20 @@ def compute_FOLLOW():
 
 compute_FOLLOW()
 
-# --- Print FIRST and FOLLOW sets ---
-print("FIRST sets:")
-for nt in non_terminals:
-    print(f"FIRST({nt}) = {FIRST[nt]}")
 
-print("\nFOLLOW sets:")
-for nt in non_terminals:
-    print(f"FOLLOW({nt}) = {FOLLOW[nt]}")
+if __name__ == "__main__":
+    # Display grammar
+    print("Grammar:")
+    for nt, prods in grammar.items():
+        prod_str = [" ".join(p) for p in prods]
+        print(f"{nt} → {' | '.join(prod_str)}")
+    print("\n")
+
+    # --- Print FIRST and FOLLOW sets ---
+    print("FIRST sets:")
+    for nt in non_terminals:
+        print(f"FIRST({nt}) = {FIRST[nt]}")
+
+    print("\nFOLLOW sets:")
+    for nt in non_terminals:
+        print(f"FOLLOW({nt}) = {FOLLOW[nt]}")
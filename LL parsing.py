@@ -1,3 +1,7 @@
+import random
+import time
+from array import array
+
 from tabulate import tabulate  # pip install tabulate if not installed
 
 # Parsing Table for the grammar
@@ -39,6 +43,17 @@ grammar = [
     ("F", ["(", "E", ")"])
 ]
 
+# (nonterminal, token) -> (production index in grammar, body reversed as it is pushed)
+expansions = {}
+for top, row in parsing_table.items():
+    for token, body in row.items():
+        p = grammar.index((top, body))
+        expansions[(top, token)] = (p, tuple(reversed(body)) if body != ["ε"] else ())
+
+# Trace action codes
+MATCH, EXPAND, ACCEPT, ERROR = range(4)
+
+
 def show_grammar():
     rows = []
     for i, (lhs, rhs) in enumerate(grammar, start=1):
@@ -46,58 +61,211 @@ def show_grammar():
     print("\nGrammar Productions:")
     print(tabulate(rows, headers=["No.", "Production"], tablefmt="fancy_grid"))
 
-def parse(tokens):
+
+class Tracer:
+    """
+    Records the steps of a traced parse() as compact events.
+
+    Each step is one action code, one production index (-1 for anything but
+    EXPAND) and the change in stack depth; the step number is the event's
+    position.  With a capacity only the last capacity events are kept, in a
+    ring.  The parser stack and the remaining input of each step are not
+    stored: rows() rebuilds them by undoing the events backwards from the
+    final stack, when the trace is rendered.
+    """
+
+    def __init__(self, capacity=None):
+        self.capacity = capacity
+        self.count = 0
+        if capacity is None:
+            self.codes, self.productions, self.deltas = array("b"), array("h"), array("b")
+        else:
+            self.codes = array("b", bytes(capacity))
+            self.productions = array("h", [0]) * capacity
+            self.deltas = array("b", bytes(capacity))
+        self.tokens = None
+        self.stack = None
+        self.index = 0
+
+    def record(self, code, production, delta):
+        if self.capacity is None:
+            self.codes.append(code)
+            self.productions.append(production)
+            self.deltas.append(delta)
+        else:
+            i = self.count % self.capacity
+            self.codes[i], self.productions[i], self.deltas[i] = code, production, delta
+        self.count += 1
+
+    def finish(self, tokens, stack, index):
+        """Remember where the parse stopped (tokens is kept by reference, not copied)."""
+        self.tokens, self.stack, self.index = tokens, list(stack), index
+
+    def __len__(self):
+        return min(self.count, self.capacity) if self.capacity is not None else self.count
+
+    def _events(self):
+        """(step, code, production, delta) of the kept events, newest first."""
+        size = self.capacity or self.count
+        for step in range(self.count, self.count - len(self), -1):
+            i = (step - 1) % size
+            yield step, self.codes[i], self.productions[i], self.deltas[i]
+
+    def rows(self, max_input=None):
+        """[step, stack, input, action] for the kept steps, as parse() used to print them."""
+        tokens, n = self.tokens, len(self.tokens)
+        stack, index = list(self.stack), self.index
+
+        def remaining():
+            end = n if max_input is None else min(n, index + max_input)
+            shown = list(tokens[index:end])
+            if end == n:
+                shown.append("$")
+            else:
+                shown.append("…")
+            return shown
+
+        rows = []
+        for step, code, p, delta in self._events():
+            if code == MATCH:
+                token = tokens[index - 1]
+                rows.append([step, list(stack), remaining(), f"Match {token}"])
+                stack.append(token)
+                index -= 1
+            elif code == EXPAND:
+                lhs, rhs = grammar[p]
+                rows.append([step, list(stack), remaining(), f"{lhs} → {' '.join(rhs)}"])
+                del stack[len(stack) - delta - 1:]
+                stack.append(lhs)
+            elif code == ACCEPT:
+                rows.append([step, list(stack), remaining(), "Accept ✅"])
+            else:
+                current = tokens[index] if index < n else "$"
+                rows.append([step, list(stack), remaining(), f"Error ❌ at {current}"])
+        rows.reverse()
+        return rows
+
+    def render(self, max_input=None):
+        if len(self) < self.count:
+            print(f"(steps 1 to {self.count - len(self)} not kept)")
+        print(tabulate(self.rows(max_input), headers=["Step", "Stack", "Input", "Action"], tablefmt="fancy_grid"))
+
+
+def parse(tokens, tracer=None):
+    """True if tokens (without the final "$") are accepted; tracer, if given, records every step."""
+    if tracer is not None:
+        return _parse_traced(tokens, tracer)
     stack = ["$", "E"]
-    tokens.append("$")
+    pop, extend = stack.pop, stack.extend
+    n = len(tokens)
     index = 0
-    step = 1
-    rows = []
+    current = tokens[0] if n else "$"
+    while True:
+        top = pop()
+        if top == current:
+            if top == "$":
+                return True
+            index += 1
+            current = tokens[index] if index < n else "$"
+            continue
+        expansion = expansions.get((top, current))
+        if expansion is None:
+            return False
+        extend(expansion[1])
 
-    while len(stack) > 0:
-        top = stack[-1]
-        current_token = tokens[index]
 
-        if top == current_token == "$":
-            rows.append([step, list(stack), tokens[index:], "Accept ✅"])
+def _parse_traced(tokens, tracer):
+    stack = ["$", "E"]
+    pop, extend = stack.pop, stack.extend
+    record = tracer.record
+    n = len(tokens)
+    index = 0
+    current = tokens[0] if n else "$"
+    accepted = False
+    while True:
+        top = pop()
+        if top == current:
+            if top == "$":
+                stack.append(top)
+                record(ACCEPT, -1, 0)
+                accepted = True
+                break
+            index += 1
+            current = tokens[index] if index < n else "$"
+            record(MATCH, -1, -1)
+            continue
+        expansion = expansions.get((top, current))
+        if expansion is None:
+            stack.append(top)
+            record(ERROR, -1, 0)
             break
+        p, pushed = expansion
+        extend(pushed)
+        record(EXPAND, p, len(pushed) - 1)
+    tracer.finish(tokens, stack, index)
+    return accepted
 
-        elif top == current_token:
-            stack.pop()
-            index += 1
-            rows.append([step, list(stack), tokens[index:], f"Match {current_token}"])
 
-        elif top in parsing_table and current_token in parsing_table[top]:
-            stack.pop()
-            production = parsing_table[top][current_token]
-            if production != ["ε"]:
-                for symbol in reversed(production):
-                    stack.append(symbol)
-            rows.append([step, list(stack), tokens[index:], f"{top} → {' '.join(production)}"])
+def print_parse(tokens, capacity=None, max_input=None):
+    """Parse tokens and print the step table (only the last capacity steps, if given)."""
+    tracer = Tracer(capacity)
+    parse(tokens, tracer)
+    tracer.render(max_input)
+    return tracer
 
-        else:
-            rows.append([step, list(stack), tokens[index:], f"Error ❌ at {current_token}"])
+
+def random_tokens(n, seed=0):
+    """A valid input of about n tokens: ids joined by + and *, with some parenthesized groups."""
+    rng = random.Random(seed)
+    tokens, depth = [], 0
+    while True:
+        while rng.random() < 0.2:
+            tokens.append("(")
+            depth += 1
+        tokens.append("id")
+        while depth and rng.random() < 0.2:
+            tokens.append(")")
+            depth -= 1
+        if len(tokens) >= n:
             break
+        tokens.append(rng.choice("+*"))
+    tokens.extend(")" * depth)
+    return tokens
 
-        step += 1
 
-    print(tabulate(rows, headers=["Step", "Stack", "Input", "Action"], tablefmt="fancy_grid"))
+if __name__ == "__main__":
+    # --------------------
+    # Example Runs
+    # --------------------
+    print("\n--- Grammar ---")
+    show_grammar()
 
+    tokens1 = ["id", "+", "id", "*", "id"]   # valid
+    tokens2 = ["(", "id", "+", "id", ")", "*", "id"]  # valid
+    tokens3 = ["id", "*", "+", "id"]  # invalid
 
-# --------------------
-# Example Runs
-# --------------------
-print("\n--- Grammar ---")
-show_grammar()
+    print("\n--- Parsing tokens1 ---")
+    print_parse(tokens1)
 
-tokens1 = ["id", "+", "id", "*", "id"]   # valid
-tokens2 = ["(", "id", "+", "id", ")", "*", "id"]  # valid
-tokens3 = ["id", "*", "+", "id"]  # invalid
+    print("\n--- Parsing tokens2 ---")
+    print_parse(tokens2)
 
-print("\n--- Parsing tokens1 ---")
-parse(tokens1.copy())
+    print("\n--- Parsing tokens3 ---")
+    print_parse(tokens3)
 
-print("\n--- Parsing tokens2 ---")
-parse(tokens2.copy())
+    print("\n--- Last steps of a 10^6-token input ---")
+    big = random_tokens(10 ** 6, seed=1)
+    print_parse(big, capacity=4, max_input=5)
 
-print("\n--- Parsing tokens3 ---")
-parse(tokens3.copy())
+    print(f"\n{'tokens':>9} {'parse s':>8} {'traced s':>9} {'steps':>10} {'trace KB (ring of 1000)':>24}")
+    for n in (10 ** 4, 10 ** 5, 10 ** 6):
+        tokens = random_tokens(n, seed=n)
+        start = time.perf_counter()
+        assert parse(tokens)
+        fast = time.perf_counter() - start
+        tracer = Tracer(1000)
+        start = time.perf_counter()
+        assert parse(tokens, tracer)
+        traced = time.perf_counter() - start
+        size = sum(a.itemsize * len(a) for a in (tracer.codes, tracer.productions, tracer.deltas))
+        print(f"{len(tokens):9,} {fast:8.2f} {traced:9.2f} {tracer.count:10,} {size / 1024:24.1f}")
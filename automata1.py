@@ -1,5 +1,12 @@
 # DFA for even number of 1's
 
+dfa = {
+    'q0': {'0': 'q0', '1': 'q1'},
+    'q1': {'0': 'q1', '1': 'q0'}
+}
+start_state = 'q0'
+accept_states = {'q0'}
+
 def dfa_even_ones(string, verbose=False):
     state = 'q0'  # start in even
     for ch in string:
@@ -16,17 +23,18 @@ def dfa_even_ones(string, verbose=False):
     return state == 'q0'
 
 
-# Example simulation:
-dfa_even_ones("1101010", verbose=True)
+if __name__ == "__main__":
+    # Example simulation:
+    dfa_even_ones("1101010", verbose=True)
 
-# Testing
-accepted = ["", "0", "11", "1010", "1101010"]
-rejected = ["1", "10", "111", "1011", "001"]
+    # Testing
+    accepted = ["", "0", "11", "1010", "1101010"]
+    rejected = ["1", "10", "111", "1011", "001"]
 
-print("\nAccepted:")
-for s in accepted:
-    print(s, "->", dfa_even_ones(s))
+    print("\nAccepted:")
+    for s in accepted:
+        print(s, "->", dfa_even_ones(s))
 
-print("\nRejected:")
-for s in rejected:
-    print(s, "->", dfa_even_ones(s))
+    print("\nRejected:")
+    for s in rejected:
+        print(s, "->", dfa_even_ones(s))
@@ -18,15 +18,16 @@ def nfa_accept(string, current_states=None):
         current_states = next_states
     return bool(current_states & accept_states)
 
-# Testing
-accepted = ["a", "ba", "aba", "bba", "abba"]
-rejected = ["", "b", "bb", "abb", "bab"]
+if __name__ == "__main__":
+    # Testing
+    accepted = ["a", "ba", "aba", "bba", "abba"]
+    rejected = ["", "b", "bb", "abb", "bab"]
 
-print("\nTask 2: (a|b)*a")
-print("Accepted:")
-for s in accepted:
-    print(s, "->", nfa_accept(s))
+    print("\nTask 2: (a|b)*a")
+    print("Accepted:")
+    for s in accepted:
+        print(s, "->", nfa_accept(s))
 
-print("\nRejected:")
-for s in rejected:
-    print(s, "->", nfa_accept(s))
+    print("\nRejected:")
+    for s in rejected:
+        print(s, "->", nfa_accept(s))
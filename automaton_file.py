@@ -0,0 +1,329 @@
+"""
+Binary automaton files, loaded with mmap and used in place.
+
+Layout (little-endian; every section starts on an 8-byte boundary):
+
+    header   magic "LXAUTOMA", version, kind (DFA or NFA), n_states,
+             n_classes, start, n_names, then (offset, length) of each section
+    classmap N_SYMBOLS bytes: symbol -> alphabet class (regex_dfa.py)
+    names    token names, utf-8, NUL separated
+    accept   int32 per state: index of the accepted token, -1 for none
+    DFA:     table   int32 [n_states * n_classes], -1 = dead
+    NFA:     index   uint32 [n_states * (n_classes + 1) + 1] into targets;
+                     the last class of each state holds its epsilon moves
+             targets uint32
+
+load() maps the file read-only and casts the sections to memoryviews, so a
+DFA's table is never parsed or copied: regex_dfa.DFA.scan() runs directly
+over the mapped pages, startup costs the same for ten states or ten
+thousand, and worker processes that load the same file share its pages
+through the page cache.
+
+scanner(tokens) keeps compiled Lex program.py-style specs in CACHE_DIR,
+keyed by Lex program.spec_key(), the file format VERSION and
+regex_dfa.PIPELINE_VERSION, and only runs the regex -> DFA pipeline on a
+cache miss or when the cached file does not load.
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+
+from loader import load_script
+
+_regex_dfa = load_script("regex_dfa.py")
+
+MAGIC = b"LXAUTOMA"
+VERSION = 1
+DFA_KIND, NFA_KIND = 1, 2
+CACHE_DIR = ".automata_cache"
+
+_HEADER = struct.Struct("<8sIIIIiI6Q")   # magic, version, kind, states, classes, start, names, 3 sections
+_ALIGN = 8
+
+
+class FormatError(ValueError):
+    pass
+
+
+def _int_array(values, typecode):
+    """array of values in the file's (little-endian) byte order."""
+    arr = array(typecode, values)
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr
+
+
+def _write(path, kind, n_states, n_classes, start, classmap, names, accept, sections):
+    """Write header + classmap + names + accept + the kind-specific sections."""
+    blobs = [bytes(classmap), "\0".join(names).encode("utf-8"), _int_array(accept, "i").tobytes()]
+    blobs += [arr.tobytes() for arr in sections]
+    offset = _HEADER.size + 8 * 2 * (len(blobs) - 3)   # extra (offset, length) pairs
+    layout = []
+    for blob in blobs:
+        offset += -offset % _ALIGN
+        layout.append((offset, len(blob)))
+        offset += len(blob)
+    fixed, extra = layout[:3], layout[3:]
+    header = _HEADER.pack(MAGIC, VERSION, kind, n_states, n_classes, start, len(names),
+                          *(v for pair in fixed for v in pair))
+    header += b"".join(struct.pack("<2Q", *pair) for pair in extra)
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(header)
+        for (offset, _), blob in zip(layout, blobs):
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(blob)
+    os.replace(tmp, path)   # readers never see a half-written file
+
+
+def save_dfa(path, dfa):
+    """Write a regex_dfa.DFA."""
+    _write(path, DFA_KIND, dfa.n_states, dfa.n_classes, 0, dfa.classmap, dfa.names,
+           dfa.accept, [_int_array(dfa.table, "i")])
+
+
+def save_nfa(path, nfa, start, accepts, classmap, members, names):
+    """
+    Write a regex_dfa.thompson() result (nfa has the automata2.py shape,
+    integer states, edges labelled by each class's representative character).
+    """
+    k = len(members)
+    class_of = {chr(symbols[0]): c for c, symbols in enumerate(members)}
+    class_of[_regex_dfa.EPSILON] = k
+    index, targets = [0], []
+    for s in range(len(nfa)):
+        by_class = [[] for _ in range(k + 1)]
+        for symbol, dsts in nfa[s].items():
+            by_class[class_of[symbol]].extend(dsts)
+        for dsts in by_class:
+            targets.extend(dsts)
+            index.append(len(targets))
+    accept = [accepts.get(s, -1) for s in range(len(nfa))]
+    _write(path, NFA_KIND, len(nfa), k, start, classmap, names, accept,
+           [_int_array(index, "I"), _int_array(targets, "I")])
+
+
+# -----------------------------
+# Loading
+# -----------------------------
+class _Mapped:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < _HEADER.size:   # mmap refuses empty files
+                raise FormatError(f"{path}: too short for an automaton file")
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        self._views = []   # every view taken from the mapping, released by close()
+        try:
+            self._parse(path)
+        except Exception:
+            self.close()
+            raise
+
+    def _parse(self, path):
+        """
+        Read the header and check each section's bounds and length against
+        it; FormatError if anything is off.  Table contents are not scanned,
+        so mapping a file stays independent of its size.
+        """
+        size = len(self._view)
+        (magic, version, self.kind, self.n_states, self.n_classes, self.start, n_names,
+         *fixed) = _HEADER.unpack_from(self._view)
+        if magic != MAGIC:
+            raise FormatError(f"{path}: not an automaton file")
+        if version != VERSION:
+            raise FormatError(f"{path}: format version {version}, expected {VERSION}")
+        if self.kind not in (DFA_KIND, NFA_KIND):
+            raise FormatError(f"{path}: unknown automaton kind {self.kind}")
+        n, k = self.n_states, self.n_classes
+        if not 0 < k <= _regex_dfa.N_SYMBOLS or not 0 <= self.start < max(n, 1):
+            raise FormatError(f"{path}: bad header ({n} states, {k} classes, start {self.start})")
+        extra = 1 if self.kind == DFA_KIND else 2
+        if _HEADER.size + 16 * extra > size:
+            raise FormatError(f"{path}: truncated section table")
+        pairs = [tuple(fixed[i:i + 2]) for i in range(0, 6, 2)]
+        pairs += [struct.unpack_from("<2Q", self._view, _HEADER.size + 16 * i) for i in range(extra)]
+        if any(offset + length > size for offset, length in pairs):
+            raise FormatError(f"{path}: truncated")
+        end = _HEADER.size + 16 * extra
+        for offset, length in pairs:   # aligned, in order, not overlapping
+            if offset % _ALIGN or offset < end:
+                raise FormatError(f"{path}: misplaced section at offset {offset}")
+            end = offset + length
+        # expected byte length of each section (None: any multiple of 4)
+        lengths = [_regex_dfa.N_SYMBOLS, pairs[1][1], 4 * n]
+        lengths += [4 * n * k] if self.kind == DFA_KIND else [4 * (n * (k + 1) + 1), None]
+        for i, ((_, length), expected) in enumerate(zip(pairs, lengths)):
+            if length != expected and not (expected is None and length % 4 == 0):
+                raise FormatError(f"{path}: section {i} is {length} bytes, expected {expected}")
+        self._sections = [self._view[offset:offset + length] for offset, length in pairs]
+        self._views.extend(self._sections)
+        classmap, names, accept = self._sections[:3]
+        if max(classmap) >= k:
+            raise FormatError(f"{path}: classmap refers to class {max(classmap)} of {k}")
+        try:
+            self.names = str(names, "utf-8").split("\0") if n_names else []
+        except UnicodeDecodeError as e:
+            raise FormatError(f"{path}: token names are not utf-8") from e
+        if len(self.names) != n_names:
+            raise FormatError(f"{path}: {len(self.names)} token names, expected {n_names}")
+        self.classmap = classmap
+        self.accept = self._ints(accept, "i")
+
+    def _ints(self, view, typecode):
+        if sys.byteorder == "little":
+            view = view.cast(typecode)
+            self._views.append(view)
+            return view
+        arr = array(typecode, view)   # big-endian host: one swapped copy
+        arr.byteswap()
+        return arr
+
+    def close(self):
+        """Release the mapping; tables taken from this file become invalid."""
+        for view in reversed(self._views):
+            view.release()
+        self._view.release()
+        self._mmap.close()
+
+
+class MappedDFA(_regex_dfa.DFA):
+    """A regex_dfa.DFA whose table, accept and classmap live in a mapped file."""
+
+    def __init__(self, mapped):
+        super().__init__(mapped._ints(mapped._sections[3], "i"), mapped.accept, mapped.classmap,
+                         mapped.n_classes, mapped.names)
+        self.file = mapped
+
+    def close(self):
+        self.table = self.accept = self.classmap = None
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class MappedNFA:
+    """An NFA read from a mapped file, simulated over sets of state numbers."""
+
+    def __init__(self, mapped):
+        self.file = mapped
+        self.n_states, self.n_classes, self.start = mapped.n_states, mapped.n_classes, mapped.start
+        self.classmap, self.accept, self.names = mapped.classmap, mapped.accept, mapped.names
+        self.index = mapped._ints(mapped._sections[3], "I")
+        self.targets = mapped._ints(mapped._sections[4], "I")
+
+    def _moves(self, state, cls):
+        i = state * (self.n_classes + 1) + cls
+        return self.targets[self.index[i]:self.index[i + 1]]
+
+    def closure(self, states):
+        seen, stack = set(states), list(states)
+        while stack:
+            for t in self._moves(stack.pop(), self.n_classes):
+                if t not in seen:
+                    seen.add(t)
+                    stack.append(t)
+        return seen
+
+    def accepts(self, string):
+        """Name of the lowest-numbered rule matching the whole string, or None."""
+        other = _regex_dfa.OTHER
+        current = self.closure([self.start])
+        for ch in string:
+            c = self.classmap[min(ord(ch), other)]
+            current = self.closure({t for s in current for t in self._moves(s, c)})
+            if not current:
+                return None
+        rules = [self.accept[s] for s in current if self.accept[s] >= 0]
+        return self.names[min(rules)] if rules else None
+
+    def close(self):
+        self.classmap = self.accept = self.index = self.targets = None
+        self.file.close()
+
+
+def load(path):
+    """Map an automaton file: a MappedDFA or a MappedNFA."""
+    mapped = _Mapped(path)
+    try:
+        return MappedDFA(mapped) if mapped.kind == DFA_KIND else MappedNFA(mapped)
+    except Exception:
+        mapped.close()
+        raise
+
+
+def cache_key(tokens):
+    """Cache file key of a TOKENS dict: its spec_key plus the format and pipeline versions."""
+    spec = load_script("Lex program.py").spec_key(tokens)
+    return hashlib.sha1(f"{VERSION}:{_regex_dfa.PIPELINE_VERSION}:{spec}".encode()).hexdigest()
+
+
+def scanner(tokens, cache_dir=CACHE_DIR):
+    """Minimal scanner DFA for a TOKENS dict, mapped from cache_dir when already built."""
+    path = os.path.join(cache_dir, f"{cache_key(tokens)}.dfa")
+    try:
+        dfa = load(path)
+    except (OSError, FormatError):
+        pass
+    else:
+        if isinstance(dfa, MappedDFA):
+            return dfa
+        dfa.close()   # an NFA file under a DFA's name: rebuild it
+    os.makedirs(cache_dir, exist_ok=True)
+    save_dfa(path, _regex_dfa.compile_rules(_regex_dfa.rules_from_tokens(tokens)))
+    return load(path)
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    lex_program = load_script("Lex program.py")
+
+    def timed_load(path):
+        start = time.perf_counter()
+        dfa = load(path)
+        return dfa, time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as cache:
+        for title, tokens in [("Lex program", lex_program.TOKENS), ("1000 keywords", None)]:
+            if tokens is None:
+                # thousands of states: one rule per keyword
+                words = sorted({f"kw{i * 7919 % 100000:05d}" for i in range(1000)})
+                tokens = {w.upper(): w for w in words}
+                tokens.update(ID=r"[a-z][a-z0-9]*", WS=r"[ \t\n]+")
+            start = time.perf_counter()
+            scanner(tokens, cache).close()
+            built = time.perf_counter() - start
+            path = os.path.join(cache, f"{cache_key(tokens)}.dfa")
+            dfa, mapped = timed_load(path)
+            print(f"{title}: {dfa.n_states} states, {os.path.getsize(path):,} bytes; "
+                  f"built {built * 1e3:.1f} ms, mapped {mapped * 1e6:.0f} µs")
+            code = "if x1 <= 10 then y else z" if title == "Lex program" else "kw07919 kw0791"
+            print("  ", [(name, code[i:j]) for name, i, j in dfa.scan(code) if name != "WS"])
+            dfa.close()
+
+        # a damaged cache file is rebuilt, not trusted
+        with open(path, "r+b") as f:
+            f.truncate(_HEADER.size + 4)
+        try:
+            load(path)
+        except FormatError as e:
+            print("Truncated:", e)
+        scanner(tokens, cache).close()
+        print("Rebuilt:", os.path.getsize(path) > _HEADER.size)
+
+        nfa_path = os.path.join(cache, "relop.nfa")
+        save_nfa(nfa_path, *_regex_dfa.thompson([("LE", "<="), ("LT", "<"), ("NE", "<>")]), ["LE", "LT", "NE"])
+        nfa = load(nfa_path)
+        print("NFA:", [nfa.accepts(s) for s in ["<=", "<", "<>", ">"]])
+        nfa.close()
@@ -0,0 +1,298 @@
+"""
+Plain-text BNF/EBNF grammars, with their analysis cached on disk.
+
+    # comments run to the end of the line
+    E   ::= T E'
+    E'  ::= '+' T E' | ε
+    T   ->  F T'            # "::=", "->" and "→" all define a rule
+    T'  ->  '*' F T'
+          | epsilon         # alternatives may continue on the next line
+    F   ->  '(' E ')' | id
+
+Quoted symbols are terminals; a bare name (or <name>) is a nonterminal when
+some rule defines it and a terminal otherwise, as in the grammar dicts of the
+scripts.  ε or epsilon is the empty body.  The first rule's head is the start
+symbol.  EBNF groups are rewritten into fresh nonterminals:
+
+    [ x ]  x?     X_opt ::= x | ε
+    { x }  x*     X_rep ::= x X_rep | ε       (right recursive, so LL-friendly)
+    x+            X_plus ::= x X_rep
+    ( a | b )     X_group ::= a | b
+
+load() parses a file and returns the Grammar together with its LL(1) table
+(Grammar.ll1_table()) and SLR(1) tables (lr.SLRTables).  Everything derived
+is pickled under CACHE_DIR, keyed by a hash of the normalized grammar (the
+production list and start symbol after EBNF rewriting, so comments and
+layout do not matter) and of the source of the modules that compute it.
+Editing the grammar or the analysis code therefore changes the key, and a
+cache file is only used when the key stored inside it matches.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import re
+import time
+
+from loader import HERE, load_script
+
+_grammar = load_script("grammar.py")
+_lr = load_script("lr.py")
+
+CACHE_DIR = ".grammar_cache"
+CACHE_VERSION = 1
+
+_TOKEN = re.compile(r"""
+    (?P<space>\s+|\#[^\n]*)
+  | (?P<define>::=|->|→)
+  | (?P<string>'[^'\n]*'|"[^"\n]*")
+  | (?P<angle><[^<>\n]+>)
+  | (?P<name>[^\W\d][\w']*)
+  | (?P<op>[|\[\]{}()*+?;])
+""", re.VERBOSE)
+
+
+class _Parser:
+    """Recursive descent over the token list; rewrites EBNF as it goes."""
+
+    def __init__(self, text):
+        self.tokens = []   # (kind, value, line)
+        line, pos = 1, 0
+        while pos < len(text):
+            m = _TOKEN.match(text, pos)
+            if m is None:
+                raise ValueError(f"Unexpected character {text[pos]!r} on line {line}")
+            if m.lastgroup == "angle":
+                self.tokens.append(("name", m.group()[1:-1].strip(), line))
+            elif m.lastgroup != "space":
+                self.tokens.append((m.lastgroup, m.group(), line))
+            line += m.group().count("\n")
+            pos = m.end()
+        self.tokens.append(("end", "", line))
+        self.i = 0
+        self.productions = []   # (head, [symbols]); quoted terminals kept as ("t", name)
+        self.pending = []       # productions of fresh nonterminals, added after the current rule
+        self.generated = {}     # (kind, alternatives) -> fresh nonterminal
+        self.used = {value for kind, value, _ in self.tokens if kind == "name"}
+
+    def error(self, message):
+        kind, value, line = self.tokens[self.i]
+        raise ValueError(f"{message} at {value or 'end of input'!r} on line {line}")
+
+    def peek(self, offset=0):
+        return self.tokens[min(self.i + offset, len(self.tokens) - 1)][:2]
+
+    def take(self):
+        token = self.tokens[self.i]
+        self.i += 1
+        return token[1]
+
+    def grammar(self):
+        while self.peek()[0] != "end":
+            if self.peek()[0] != "name" or self.peek(1)[0] != "define":
+                self.error("Expected a rule")
+            head = self.take()
+            self.take()
+            self.productions.extend((head, body) for body in self.alternatives(head))
+            self.productions.extend(self.pending)
+            self.pending.clear()
+            if self.peek() == ("op", ";"):
+                self.take()
+        if not self.productions:
+            raise ValueError("Grammar has no rules")
+        return self.productions
+
+    def alternatives(self, head):
+        bodies = [self.sequence(head)]
+        while self.peek() == ("op", "|"):
+            self.take()
+            bodies.append(self.sequence(head))
+        return bodies
+
+    def at_rule_start(self):
+        return self.peek()[0] == "name" and self.peek(1)[0] == "define"
+
+    def sequence(self, head):
+        body = []
+        while not self.at_rule_start():
+            kind, value = self.peek()
+            if kind == "name" and value in _grammar.EMPTY_MARKERS:
+                self.take()
+                continue
+            if kind == "name":
+                item = self.take()
+            elif kind == "string":
+                item = ("t", self.take()[1:-1])
+            elif (kind, value) in (("op", "["), ("op", "{"), ("op", "(")):
+                self.take()
+                alternatives = self.alternatives(head)
+                close = {"[": "]", "{": "}", "(": ")"}[value]
+                if self.peek() != ("op", close):
+                    self.error(f"Expected {close!r}")
+                self.take()
+                item = self.fresh(head, {"[": "opt", "{": "rep", "(": "group"}[value], alternatives)
+            else:
+                break
+            while self.peek() in (("op", "*"), ("op", "+"), ("op", "?")):
+                suffix = self.take()
+                item = self.fresh(head, {"*": "rep", "+": "plus", "?": "opt"}[suffix], [[item]])
+            body.append(item)
+        return body
+
+    def fresh(self, head, kind, alternatives):
+        """Nonterminal for an EBNF construct (shared by identical constructs)."""
+        key = (kind, tuple(tuple(body) for body in alternatives))
+        if key in self.generated:
+            return self.generated[key]
+        if kind == "group" and len(alternatives) == 1 and len(alternatives[0]) == 1:
+            return alternatives[0][0]
+        name = f"{head}_{kind}"
+        n = 1
+        while name in self.used:
+            n += 1
+            name = f"{head}_{kind}{n}"
+        self.used.add(name)
+        self.generated[key] = name
+        if kind == "opt":
+            bodies = [*alternatives, []]
+        elif kind == "rep" and len(alternatives) == 1:
+            bodies = [[*alternatives[0], name], []]
+        elif kind == "rep":
+            bodies = [[self.fresh(head, "group", alternatives), name], []]
+        elif kind == "plus":
+            inner = self.fresh(head, "group", alternatives)
+            bodies = [[inner, self.fresh(head, "rep", [[inner]])]]
+        else:
+            bodies = alternatives
+        self.pending.extend((name, body) for body in bodies)
+        return name
+
+
+def parse_bnf(text):
+    """Grammar for BNF/EBNF text; ValueError on malformed input."""
+    productions = _Parser(text).grammar()
+    heads = {head for head, _ in productions}
+    for _, body in productions:
+        for symbol in body:
+            if isinstance(symbol, tuple) and symbol[1] in heads:
+                raise ValueError(f"Quoted terminal {symbol[1]!r} is also a nonterminal")
+    return _grammar.Grammar([(head, [s[1] if isinstance(s, tuple) else s for s in body])
+                             for head, body in productions], start=productions[0][0])
+
+
+def load_bnf(path):
+    with open(path, encoding="utf-8") as f:
+        return parse_bnf(f.read())
+
+
+def to_bnf(grammar):
+    """BNF text for a Grammar (terminals quoted, one alternative per line)."""
+    g = grammar
+    lines, width = [], max(len(g.names[nt]) for nt in g.nonterminals)
+    order = [g.start] + [nt for nt in g.nonterminals if nt != g.start]
+    for nt in order:
+        for i, p in enumerate(g.by_head[g.index[nt]]):
+            body = " ".join(repr(g.names[s]) if g.is_terminal[s] else g.names[s] for s in g.bodies[p]) or "ε"
+            lead = f"{g.names[nt]:<{width}} ::=" if i == 0 else f"{'':<{width}}   |"
+            lines.append(f"{lead} {body}")
+    return "\n".join(lines) + "\n"
+
+
+# -----------------------------
+# Analysis cache
+# -----------------------------
+_code_key = None
+
+
+def _code_fingerprint():
+    """Hash of the modules whose output is cached, so editing them invalidates it."""
+    global _code_key
+    if _code_key is None:
+        h = hashlib.sha256(str(CACHE_VERSION).encode())
+        for filename in ("grammar.py", "lr.py", "bnf.py"):
+            with open(os.path.join(HERE, filename), "rb") as f:
+                h.update(f.read())
+        _code_key = h.hexdigest()
+    return _code_key
+
+
+def grammar_key(grammar):
+    """Content hash of the normalized grammar and the analysis code."""
+    g = grammar
+    normalized = json.dumps([g.names[g.start],
+                             [[g.names[h], [g.names[s] for s in body]] for h, body in zip(g.heads, g.bodies)]],
+                            ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256((_code_fingerprint() + normalized).encode("utf-8")).hexdigest()
+
+
+def _read_cache(path, key):
+    try:
+        with open(path, "rb") as f:
+            entry = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+    if not isinstance(entry, dict) or entry.get("key") != key:
+        return None   # stale or foreign: recompute and overwrite
+    return entry
+
+
+def _write_cache(path, entry):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def analyze(grammar, cache_dir=CACHE_DIR, lr=True):
+    """
+    (grammar, LL(1) table, lr.SLRTables or None) with nullable/FIRST/FOLLOW
+    installed on grammar, read from cache_dir when a matching entry exists.
+    """
+    key = grammar_key(grammar)
+    path = os.path.join(cache_dir, f"{key}.pickle")
+    entry = _read_cache(path, key)
+    if entry is not None and (entry["slr"] is not None or not lr):
+        grammar.restore_analysis(entry["analysis"])
+        return grammar, entry["ll1"], entry["slr"]
+    entry = {"key": key, "analysis": grammar.analysis(), "ll1": grammar.ll1_table(),
+             "slr": _lr.SLRTables(grammar) if lr else None}
+    _write_cache(path, entry)
+    return grammar, entry["ll1"], entry["slr"]
+
+
+def load(path, cache_dir=CACHE_DIR, lr=True):
+    """Parse a BNF/EBNF file and analyze() it."""
+    return analyze(load_bnf(path), cache_dir, lr)
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    expr = parse_bnf("""
+        # the expression grammar of First and follow.py, in EBNF
+        E ::= T { '+' T }
+        T ::= F { '*' F }
+        F ::= '(' E ')' | id
+    """)
+    print(to_bnf(expr))
+
+    with tempfile.TemporaryDirectory() as cache:
+        for name in ("expr_ll.bnf", "expr_lr.bnf"):
+            g, ll1, slr = load(os.path.join(HERE, "grammars", name), cache)
+            conflicts = sum(len(cell) > 1 for cell in ll1.values())
+            print(f"{name}: {len(g)} productions, LL(1) conflicts {conflicts}, "
+                  f"SLR {slr.n_states} states / {len(slr.conflicts)} conflicts")
+
+        big = tempfile.NamedTemporaryFile("w", suffix=".bnf", delete=False)
+        big.write(to_bnf(_grammar.random_grammar(250, 50, 1000, max_body=4, seed=1)))
+        big.close()
+        try:
+            print(f"\n{'run':>5} {'ms':>9}")
+            for run in ("cold", "warm"):
+                start = time.perf_counter()
+                load(big.name, cache)
+                print(f"{run:>5} {(time.perf_counter() - start) * 1e3:9.1f}")
+        finally:
+            os.unlink(big.name)
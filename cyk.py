@@ -0,0 +1,269 @@
+"""
+CYK membership testing with NumPy, for many strings at once.
+
+to_cnf() puts any grammar of the scripts into Chomsky normal form:
+
+    1. normalize.py's useless, epsilon and cycles passes (ε survives only
+       on the start symbol, which becomes accepts_empty)
+    2. unit productions A -> B replaced by B's other bodies
+    3. terminals inside longer bodies moved to A_t -> t
+    4. bodies longer than two split into chains, identical tails shared
+
+The chart is indexed by span length: chart[l][b, i] is a bool vector over
+nonterminals, those deriving tokens i .. i+l-1 of string b.  A span is
+filled from every split with one gather and one matrix product:
+
+    hits[r, k]  = left[r, B_k] & right[r, C_k]      for each distinct pair
+                                                    (B, C) of rule bodies
+    cell[r, A] |= (hits @ produces)[r, A] > 0       produces[k, A]: A -> B_k C_k
+
+where r runs over every start position of every string in the batch, so the
+Python loop is over (length, split) pairs only: n^2 / 2 of them for a batch
+of strings of length n, whatever the batch size.  accepts_many() groups
+strings by length and cuts each group into blocks that keep the chart
+within CELLS booleans.
+
+Strings are sequences of token names, or str when every terminal is a
+single character (then a whole block is encoded with one table lookup).
+"""
+
+import random
+import time
+
+import numpy as np
+
+from loader import load_script
+
+_grammar = load_script("grammar.py")
+_normalize = load_script("normalize.py")
+
+CELLS = 1 << 25
+
+
+class CNF:
+    def __init__(self, names, start, terminal_rules, binary_rules, accepts_empty):
+        """names: nonterminals; terminal_rules {terminal: [A]}; binary_rules [(A, B, C)] as indices."""
+        self.names = names
+        self.start = start
+        self.accepts_empty = accepts_empty
+        self.terminal_rules = terminal_rules
+        self.binary_rules = binary_rules
+        n = len(names)
+        self.terminals = sorted(terminal_rules)
+        self.terminal_index = {t: i for i, t in enumerate(self.terminals)}
+        # row per terminal, plus a last all-False row for tokens outside the grammar
+        self.lexical = np.zeros((len(self.terminals) + 1, n), dtype=bool)
+        for t, heads in terminal_rules.items():
+            self.lexical[self.terminal_index[t], heads] = True
+        pairs = sorted({(b, c) for _, b, c in binary_rules})
+        pair_index = {pair: k for k, pair in enumerate(pairs)}
+        self.left = np.array([b for b, _ in pairs], dtype=np.intp)
+        self.right = np.array([c for _, c in pairs], dtype=np.intp)
+        self.produces = np.zeros((len(pairs), n), dtype=np.float32)
+        for a, b, c in binary_rules:
+            self.produces[pair_index[(b, c)], a] = 1
+        self.char_table = None
+        if self.terminals and all(len(t) == 1 and ord(t) < 128 for t in self.terminals):
+            self.char_table = np.full(256, len(self.terminals), dtype=np.intp)
+            for t, i in self.terminal_index.items():
+                self.char_table[ord(t)] = i
+
+    def __str__(self):
+        lines = [f"{self.names[a]} → {t}" for t, heads in self.terminal_rules.items() for a in heads]
+        lines += [f"{self.names[a]} → {self.names[b]} {self.names[c]}" for a, b, c in self.binary_rules]
+        return "\n".join(sorted(lines))
+
+    # -----------------------------
+    # Encoding
+    # -----------------------------
+    def _encode(self, strings, length):
+        """[batch, length] terminal indices (len(terminals) for unknown tokens)."""
+        unknown = len(self.terminals)
+        if self.char_table is not None and all(isinstance(s, str) for s in strings):
+            try:
+                data = np.frombuffer("".join(strings).encode("latin-1"), dtype=np.uint8)
+                return self.char_table[data].reshape(len(strings), length)
+            except UnicodeEncodeError:
+                pass   # characters beyond latin-1: not terminals, looked up one by one below
+        index = self.terminal_index
+        return np.array([[index.get(t, unknown) for t in s] for s in strings],
+                        dtype=np.intp).reshape(len(strings), length)
+
+    # -----------------------------
+    # Recognition
+    # -----------------------------
+    def _block(self, codes):
+        """Membership of a [batch, n] block of equal-length strings (n >= 1)."""
+        batch, n = codes.shape
+        chart = [None, self.lexical[codes]]   # chart[l]: [batch, n - l + 1, nonterminals]
+        for length in range(2, n + 1):
+            m = n - length + 1
+            cell = np.zeros((batch, m, len(self.names)), dtype=bool)
+            for split in range(1, length):
+                left = chart[split][:, :m][..., self.left]
+                right = chart[length - split][:, split:split + m][..., self.right]
+                hits = (left & right).reshape(batch * m, -1)
+                if hits.any():
+                    cell |= (hits.astype(np.float32) @ self.produces).reshape(batch, m, -1) > 0
+            chart.append(cell)
+        return chart[n][:, 0, self.start]
+
+    def accepts(self, tokens):
+        return bool(self.accepts_many([tokens])[0])
+
+    def accepts_many(self, strings, cells=CELLS):
+        """Bool array: strings[i] in L(G)."""
+        strings = list(strings)
+        result = np.zeros(len(strings), dtype=bool)
+        by_length = {}
+        for i, s in enumerate(strings):
+            by_length.setdefault(len(s), []).append(i)
+        for n, members in by_length.items():
+            if n == 0:
+                result[members] = self.accepts_empty
+                continue
+            block = max(1, cells // (n * n * len(self.names)))
+            for lo in range(0, len(members), block):
+                chunk = members[lo:lo + block]
+                result[chunk] = self._block(self._encode([strings[i] for i in chunk], n))
+        return result
+
+
+def to_cnf(grammar):
+    """CNF for a grammar.Grammar or a {head: [[symbol, ...], ...]} dict."""
+    if isinstance(grammar, dict):
+        grammar = _grammar.Grammar.from_dict(grammar)
+    g = _normalize.normalize(grammar, ["useless", "epsilon", "cycles"])[0]
+    names, terminal = g.names, g.is_terminal
+    start = g.start
+    rules = {nt: [g.bodies[p] for p in g.by_head[g.index[nt]]] for nt in g.nonterminals}
+    accepts_empty = () in rules[start]
+    rules[start] = [body for body in rules[start] if body]
+
+    def is_unit(body):
+        return len(body) == 1 and not terminal[body[0]]
+
+    # unit productions: A gets every non-unit body of each B with A =>* B
+    expanded = {}
+    for a in rules:
+        seen, stack, bodies = {a}, [a], []
+        while stack:
+            for body in rules[stack.pop()]:
+                if is_unit(body):
+                    if body[0] not in seen:
+                        seen.add(body[0])
+                        stack.append(body[0])
+                else:
+                    bodies.append(body)
+        expanded[a] = list(dict.fromkeys(bodies))
+
+    index = {}        # nonterminal symbol id or ("term", t) / ("tail", symbols) -> CNF index
+    cnf_names = []
+    terminal_rules, binary_rules = {}, []
+
+    def nonterminal(key, name):
+        if key not in index:
+            index[key] = len(cnf_names)
+            cnf_names.append(name)
+        return index[key]
+
+    for a in expanded:
+        nonterminal(a, names[a])
+
+    def symbol(s):
+        if not terminal[s]:
+            return index[s]
+        t = nonterminal(("term", s), f"<{names[s]}>")
+        terminal_rules.setdefault(names[s], [])
+        if t not in terminal_rules[names[s]]:
+            terminal_rules[names[s]].append(t)
+        return t
+
+    tails = {}
+
+    def tail(symbols):
+        """Nonterminal deriving exactly the sequence symbols (CNF indices), len >= 2."""
+        if symbols not in tails:
+            tails[symbols] = t = nonterminal(("tail", symbols), "<" + " ".join(cnf_names[s] for s in symbols) + ">")
+            rest = symbols[1:]
+            binary_rules.append((t, symbols[0], rest[0] if len(rest) == 1 else tail(rest)))
+        return tails[symbols]
+
+    for a, bodies in expanded.items():
+        head = index[a]
+        for body in bodies:
+            if len(body) == 1:
+                terminal_rules.setdefault(names[body[0]], [])
+                if head not in terminal_rules[names[body[0]]]:
+                    terminal_rules[names[body[0]]].append(head)
+                continue
+            symbols = tuple(symbol(s) for s in body)
+            if len(symbols) == 2:
+                binary_rules.append((head, symbols[0], symbols[1]))
+            else:
+                binary_rules.append((head, symbols[0], tail(symbols[1:])))
+    return CNF(cnf_names, index[start], terminal_rules, list(dict.fromkeys(binary_rules)), accepts_empty)
+
+
+def sentences(grammar, count, max_length, seed=0):
+    """Random strings of the language (lists of token names) up to max_length tokens."""
+    g = grammar if isinstance(grammar, _grammar.Grammar) else _grammar.Grammar.from_dict(grammar)
+    rng = random.Random(seed)
+    result = []
+    while len(result) < count:
+        out, stack = [], [g.start]
+        while stack and len(out) + len(stack) <= max_length + 4:
+            s = stack.pop()
+            if g.is_terminal[s]:
+                out.append(g.names[s])
+            else:
+                stack.extend(reversed(g.bodies[rng.choice(g.by_head[g.index[s]])]))
+        if not stack and len(out) <= max_length:
+            result.append(out)
+    return result
+
+
+if __name__ == "__main__":
+    new = load_script("new.py")
+    first_and_follow = load_script("First and follow.py")
+    cnf = to_cnf(new.GRAMMAR)
+    print(f"new.py GRAMMAR in CNF: {len(cnf.names)} nonterminals, {len(cnf.binary_rules)} binary rules")
+    print(cnf)
+    other = to_cnf(first_and_follow.grammar)
+    for text in ["id + id * id", "( id + id ) * id", "id + * id", "", "( id"]:
+        print(f"{text!r:20} {cnf.accepts(text.split())} {other.accepts(text.split())}")
+
+    # Bulk: half sentences, half random token strings, checked against the Earley parser
+    earley = load_script("earley.py").Earley(new.GRAMMAR)
+    g = _grammar.Grammar.from_dict(new.GRAMMAR)
+    rng = random.Random(1)
+    terminals = [g.names[t] for t in g.terminals[1:]]
+    # strings are drawn from pools of 1000 sentences and 1000 random strings per length,
+    # so building the batch stays cheap next to recognizing it
+    pools = {}
+    for length in (5, 9):
+        positives, seed = [], length
+        while len(positives) < 1000:
+            positives += [s for s in sentences(new.GRAMMAR, 1000, length, seed=seed) if len(s) == length]
+            seed += 1
+        pools[length] = positives[:1000], [rng.choices(terminals, k=length) for _ in range(1000)]
+    print(f"\n{'strings':>9} {'length':>6} {'in L':>6} {'batched s':>10} {'strings/s':>10} {'one by one s':>13}")
+    for count, length in ((10_000, 5), (100_000, 9), (1_000_000, 5)):
+        positives, negatives = pools[length]
+        strings = rng.choices(positives, k=count // 2) + rng.choices(negatives, k=count - count // 2)
+        start = time.perf_counter()
+        found = cnf.accepts_many(strings)
+        seconds = time.perf_counter() - start
+        sample = range(0, count, max(1, count // 300))
+        for i in sample:
+            try:
+                earley.parse(strings[i])
+                expected = True
+            except SyntaxError:
+                expected = False
+            assert found[i] == expected, strings[i]
+        start = time.perf_counter()
+        for i in sample:
+            cnf.accepts(strings[i])
+        single = (time.perf_counter() - start) / len(sample) * count
+        print(f"{count:9,} {length:6} {int(found.sum()):6,} {seconds:10.2f} {count / seconds:10,.0f} {single:13.1f}")
@@ -0,0 +1,190 @@
+"""
+Leftmost and rightmost derivations recovered from an Earley chart.
+
+"leftmost dervation.py" and "rightmost dervation.py" search for a
+derivation by expanding sentential forms and backtracking, which is
+exponential in the length of the target (S -> SS+ | SS* | a gives up after a
+couple of dozen characters).  Here the target is parsed once with Earley's
+algorithm, O(n^3) at worst and for any context-free grammar (ε-productions
+and cycles included), and every item remembers how it was first added:
+
+    back[(end, p, dot, origin)] = (k, child)
+
+where the symbol before the dot was matched from k to end, child being None
+for a terminal and (q, k, end) for a completed production q.  An item is
+only ever justified by items added before it, so following these pointers
+always ends: together they are a parse tree for the target.
+
+The derivations are that tree walked in preorder.  For the leftmost one the
+nonterminal expanded by each step is preceded only by terminals, so its
+position in the sentential form is the start of its span; for the rightmost
+one it is followed only by terminals, so its position counted from the end
+is n - end of its span.  Steps are produced one at a time from a stack of
+pending tree nodes, so a long derivation is never held as a whole, nor are
+its sentential forms (sentential_forms() renders them on demand).
+"""
+
+import random
+import time
+
+from loader import load_script
+
+_grammar = load_script("grammar.py")
+
+
+class Chart:
+    def __init__(self, grammar, tokens):
+        """Earley-parse tokens (terminal names) with grammar (a grammar.Grammar)."""
+        self.grammar = g = grammar
+        self.tokens = list(tokens)
+        n = len(self.tokens)
+        codes = [g.ids.get(t, -1) for t in self.tokens]
+        heads, bodies, by_head, index = g.heads, g.bodies, g.by_head, g.index
+
+        self.back = back = {}
+        sets = [dict() for _ in range(n + 1)]          # item (p, dot, origin) -> None, in insertion order
+        waiting = [dict() for _ in range(n + 1)]       # symbol -> items with that symbol after the dot
+        empty = [dict() for _ in range(n + 1)]         # nonterminal -> production completed from j to j
+
+        def add(j, item, k, child):
+            if item not in sets[j]:
+                sets[j][item] = None
+                back[(j, *item)] = (k, child)
+                work.append(item)
+
+        for p in by_head[index[g.start]]:
+            sets[0][(p, 0, 0)] = None
+        for j in range(n + 1):
+            work = list(sets[j])
+            while work:
+                p, dot, origin = item = work.pop()
+                body = bodies[p]
+                if dot == len(body):
+                    a = heads[p]
+                    if origin == j:
+                        empty[j].setdefault(a, p)
+                    for p2, d2, o2 in list(waiting[origin].get(a, ())):
+                        add(j, (p2, d2 + 1, o2), origin, (p, origin, j))
+                    continue
+                x = body[dot]
+                if g.is_terminal[x]:
+                    if j < n and codes[j] == x and (p, dot + 1, origin) not in sets[j + 1]:
+                        sets[j + 1][(p, dot + 1, origin)] = None
+                        back[(j + 1, p, dot + 1, origin)] = (j, None)
+                    continue
+                pending = waiting[j].get(x)
+                if pending is None:
+                    waiting[j][x] = [item]
+                    for q in by_head[index[x]]:
+                        add(j, (q, 0, j), j, None)
+                else:
+                    pending.append(item)
+                if x in empty[j]:
+                    add(j, (p, dot + 1, origin), j, (empty[j][x], j, j))
+
+        self.n_items = sum(map(len, sets))
+        self.root = next(((p, 0, n) for p, dot, origin in sets[n]
+                          if origin == 0 and heads[p] == g.start and dot == len(bodies[p])), None)
+
+    @property
+    def accepted(self):
+        return self.root is not None
+
+    def children(self, node):
+        """Children of a tree node (p, i, j): (q, k, l) for nonterminals, token positions for terminals."""
+        p, origin, end = node
+        result = []
+        for dot in range(len(self.grammar.bodies[p]), 0, -1):
+            k, child = self.back[(end, p, dot, origin)]
+            result.append(k if child is None else child)
+            end = k
+        result.reverse()
+        return result
+
+    def _root(self):
+        if self.root is None:
+            raise SyntaxError(f"{' '.join(self.tokens)!r} is not in the language")
+        return self.root
+
+    def _walk(self, rightmost):
+        """(node, pending stack) for each nonterminal expansion, in derivation order."""
+        stack = [self._root()]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, int):
+                continue
+            yield node, stack
+            children = self.children(node)
+            stack.extend(children if rightmost else reversed(children))
+
+    def leftmost(self):
+        """(production, position of the expanded nonterminal) for each step."""
+        for (p, i, _), _ in self._walk(rightmost=False):
+            yield p, i
+
+    def rightmost(self):
+        """(production, position of the expanded nonterminal counted from the end) for each step."""
+        n = len(self.tokens)
+        for (p, _, j), _ in self._walk(rightmost=True):
+            yield p, n - j
+
+    def sentential_forms(self, rightmost=False, sep=" "):
+        """Each sentential form of the derivation as a string, starting with the start symbol."""
+        g, tokens = self.grammar, self.tokens
+
+        def name(node):
+            return tokens[node] if isinstance(node, int) else g.names[g.heads[node[0]]]
+
+        for node, stack in self._walk(rightmost):
+            pending = [name(node)] + [name(s) for s in reversed(stack)]
+            if rightmost:
+                yield sep.join(pending[::-1] + tokens[node[2]:])
+            else:
+                yield sep.join(tokens[:node[1]] + pending)
+        yield sep.join(tokens)
+
+
+def postfix_expression(leaves, seed=0):
+    """A random target for S -> SS+ | SS* | a with the given number of a's."""
+    rng = random.Random(seed)
+    stack = []
+    for _ in range(leaves):
+        stack.append("a")
+        while len(stack) > 1 and rng.random() < 0.5:
+            right, left = stack.pop(), stack.pop()
+            stack.append(left + right + rng.choice("+*"))
+    while len(stack) > 1:
+        right, left = stack.pop(), stack.pop()
+        stack.append(left + right + rng.choice("+*"))
+    return stack[0]
+
+
+if __name__ == "__main__":
+    leftmost_script = load_script("leftmost dervation.py")
+    rightmost_script = load_script("rightmost dervation.py")
+    g = _grammar.Grammar([(head, list(body)) for head, bodies in leftmost_script.grammar.items() for body in bodies])
+
+    chart = Chart(g, "aa+a*")
+    print("Leftmost derivation for 'aa+a*':")
+    for i, form in enumerate(chart.sentential_forms(sep="")):
+        print(f"Step {i}: {form}")
+    print("Rightmost derivation for 'aa+a*':")
+    for i, form in enumerate(chart.sentential_forms(rightmost=True, sep="")):
+        print(f"Step {i}: {form}")
+
+    print(f"\n{'length':>6} {'backtracking ms (leftmost, rightmost)':>37} {'chart ms':>9} {'items':>8} {'steps':>6}")
+    for leaves in (3, 5, 7, 9, 20, 100, 300):
+        target = postfix_expression(leaves, seed=leaves)
+        slow = ""
+        if leaves <= 9:
+            times = []
+            for search in (leftmost_script.leftmost_derivation, rightmost_script.rightmost_derivation):
+                start = time.perf_counter()
+                assert search(["S"], target, [])
+                times.append(f"{(time.perf_counter() - start) * 1e3:.1f}")
+            slow = ", ".join(times)
+        start = time.perf_counter()
+        chart = Chart(g, target)
+        steps = sum(1 for _ in chart.leftmost())
+        assert steps == sum(1 for _ in chart.rightmost())
+        print(f"{len(target):6} {slow:>37} {(time.perf_counter() - start) * 1e3:9.1f} {chart.n_items:8,} {steps:6}")
@@ -0,0 +1,190 @@
+"""
+Batch acceptance of many strings by one DFA with NumPy.
+
+A BatchDFA is a transition matrix over byte classes:
+
+    table[state, cls]   next state
+    classes[byte]       class of a byte; bytes outside the alphabet get a
+                        class of their own that leads to a dead state
+    accepting[state]    True for accepting states
+
+Strings are packed into one uint8 buffer with int64 offsets (string i is
+buf[offsets[i]:offsets[i + 1]]).  accepts_packed() works through BLOCK
+strings at a time: it maps their bytes to classes once, keeps one state per
+string and advances all of them together one column at a time:
+
+    states[:m] = flat[states[:m] + cls[starts[:m] + j]]
+
+flat is the transition matrix raveled with states premultiplied by the
+number of classes, so a step is one add and one gather.  Within a block,
+strings are ordered by length, longest first, so the m strings that still
+have a j-th character are always a prefix and no masking is needed.  The
+Python loop runs once per column of a block, not once per character, and
+blocks keep the working arrays in cache however many strings there are.
+
+Usage:
+    python dfa_batch.py [N] [LENGTH]     benchmark against automata1/3
+"""
+
+import random
+import sys
+import time
+
+import numpy as np
+
+from loader import load_script
+
+BLOCK = 1 << 14
+
+
+class BatchDFA:
+    def __init__(self, table, classes, accepting, start=0, alphabet=None):
+        self.table = np.ascontiguousarray(table, dtype=np.int32)
+        self.classes = np.ascontiguousarray(classes, dtype=np.intp)
+        self.accepting = np.asarray(accepting, dtype=bool)
+        self.start = start
+        self.alphabet = alphabet   # bytes accepted by strict checking, None = all
+
+    @classmethod
+    def from_dict(cls, dfa, start, accept):
+        """
+        From the dict form used in automata1.py / automata3.py:
+        {state: {symbol: next state}}, a start state and a set of accepting
+        states.  Symbols must be single characters below 256.
+        """
+        names = list(dfa)
+        index = {name: i for i, name in enumerate(names)}
+        symbols = sorted({sym for row in dfa.values() for sym in row})
+        if any(len(sym) != 1 or ord(sym) > 255 for sym in symbols):
+            raise ValueError("BatchDFA symbols must be single characters below 256")
+        dead, invalid = len(names), len(symbols)
+        table = np.full((len(names) + 1, len(symbols) + 1), dead, dtype=np.int32)
+        for state, row in dfa.items():
+            for sym, target in row.items():
+                table[index[state], symbols.index(sym)] = index[target]
+        classes = np.full(256, invalid, dtype=np.intp)
+        for c, sym in enumerate(symbols):
+            classes[ord(sym)] = c
+        accepting = [name in accept for name in names] + [False]
+        return cls(table, classes, accepting, index[start], bytes(ord(s) for s in symbols))
+
+    @classmethod
+    def from_regex_dfa(cls, dfa, rule=None):
+        """
+        From a regex_dfa.DFA.  A string is accepted if the DFA ends in a
+        state accepting `rule` (any rule if None).  Bytes >= 128 take the
+        DFA's OTHER class, as every non-ASCII character does there.
+        """
+        k, n = dfa.n_classes, dfa.n_states
+        table = np.asarray(dfa.table, dtype=np.int32).reshape(n, k)
+        table = np.vstack([np.where(table < 0, n, table), np.full((1, k), n)])
+        classmap = np.frombuffer(dfa.classmap, dtype=np.uint8).astype(np.intp)
+        classes = np.concatenate([classmap[:128], np.full(128, classmap[128])])
+        accept = np.asarray(dfa.accept)
+        accepting = (accept >= 0) if rule is None else (accept == dfa.names.index(rule))
+        return cls(table, classes, np.append(accepting, False))
+
+    @property
+    def n_states(self):
+        return self.table.shape[0]
+
+    def accepts_packed(self, buf, offsets, strict=True, block=BLOCK):
+        """
+        Boolean array: does the DFA accept each packed string?
+
+        buf is a uint8 array (or bytes-like), offsets has one more entry than
+        there are strings.  With strict, a byte outside the alphabet raises
+        ValueError as the scalar functions do; otherwise that string is
+        simply rejected.
+        """
+        buf = np.frombuffer(buf, dtype=np.uint8) if not isinstance(buf, np.ndarray) else buf
+        offsets = np.asarray(offsets, dtype=np.int64)
+        if strict and self.alphabet is not None:
+            allowed = np.zeros(256, dtype=bool)
+            allowed[np.frombuffer(self.alphabet, dtype=np.uint8)] = True
+            bad = ~allowed[buf[offsets[0]:offsets[-1]]]
+            if bad.any():
+                at = int(offsets[0] + np.argmax(bad))
+                raise ValueError(f"Byte {bytes(buf[at:at + 1])!r} at offset {at} is not in the alphabet")
+
+        k = self.table.shape[1]
+        flat = (self.table.astype(np.intp) * k).ravel()
+        lengths = np.diff(offsets)
+        result = np.empty(len(lengths), dtype=bool)
+        for lo in range(0, len(lengths), block):
+            part = lengths[lo:lo + block]
+            n = len(part)
+            first, last = offsets[lo], offsets[lo + n]
+            cls = self.classes[buf[first:last]]
+            order = np.argsort(-part, kind="stable")
+            starts = offsets[lo:lo + n][order] - first
+            ascending = part[order][::-1]
+            states = np.full(n, self.start * k, dtype=np.intp)
+            for j in range(int(ascending[-1])):
+                m = n - int(np.searchsorted(ascending, j, side="right"))   # strings longer than j
+                states[:m] = flat[states[:m] + cls[starts[:m] + j]]
+            result[lo:lo + n][order] = self.accepting[states // k]
+        return result
+
+    def accepts(self, strings, strict=True):
+        """Boolean array for a sequence of str or bytes."""
+        return self.accepts_packed(*pack(strings), strict=strict)
+
+
+def pack(strings, encoding="latin-1"):
+    """(uint8 buffer, int64 offsets) holding the strings back to back."""
+    data = [s.encode(encoding) if isinstance(s, str) else s for s in strings]
+    offsets = np.zeros(len(data) + 1, dtype=np.int64)
+    np.cumsum(np.fromiter(map(len, data), dtype=np.int64, count=len(data)), out=offsets[1:])
+    return np.frombuffer(b"".join(data), dtype=np.uint8), offsets
+
+
+# -----------------------------
+# DFAs of automata1.py / automata3.py
+# -----------------------------
+def even_ones():
+    automata1 = load_script("automata1.py")
+    return BatchDFA.from_dict(automata1.dfa, automata1.start_state, automata1.accept_states)
+
+
+def contains_a():
+    automata3 = load_script("automata3.py")
+    return BatchDFA.from_dict(automata3.dfa, automata3.start_state, automata3.accept_states)
+
+
+def benchmark(scalar, batch, alphabet, n=1_000_000, length=(0, 32), seed=0):
+    """Time scalar(s) for each string against one batch call; checks they agree."""
+    rng = random.Random(seed)
+    strings = ["".join(rng.choices(alphabet, k=rng.randint(*length))) for _ in range(n)]
+
+    start = time.perf_counter()
+    expected = [scalar(s) for s in strings]
+    scalar_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    buf, offsets = pack(strings)
+    pack_time = time.perf_counter() - start
+    start = time.perf_counter()
+    got = batch.accepts_packed(buf, offsets)
+    batch_time = time.perf_counter() - start
+
+    assert got.tolist() == expected, "batch and scalar results differ"
+    return scalar_time, pack_time, batch_time
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    length = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    automata1 = load_script("automata1.py")
+    automata3 = load_script("automata3.py")
+
+    print(even_ones().accepts(["", "0", "11", "1010", "1101010", "1", "10", "111", "1011", "001"]))
+    print(contains_a().accepts(["a", "ba", "abb", "babab", "aa", "", "b", "bb", "bbbb", "bbb"]))
+
+    print(f"\n{n:,} strings of length 0..{length}")
+    print(f"{'DFA':12} {'scalar s':>9} {'pack s':>8} {'batch s':>8} {'strings/s':>13} {'speedup':>8}")
+    for name, scalar, batch, alphabet in [("even ones", automata1.dfa_even_ones, even_ones(), "01"),
+                                          ("contains a", automata3.dfa_contains_a, contains_a(), "ab")]:
+        scalar_time, pack_time, batch_time = benchmark(scalar, batch, alphabet, n, (0, length))
+        print(f"{name:12} {scalar_time:9.2f} {pack_time:8.2f} {batch_time:8.2f} "
+              f"{n / batch_time:13,.0f} {scalar_time / batch_time:7.0f}x")
@@ -0,0 +1,151 @@
+"""
+Mechanical checks on DFAs: minimization, equivalence and inclusion.
+
+Everything works on regex_dfa.DFA tables.  from_dict() converts the
+hand-written DFAs of automata1.py / automata3.py ({state: {symbol: state}}
+plus start and accepting states), and to_dict() converts back, so a
+minimized table can be read like the originals.
+
+equivalent() and included() explore the product of two DFAs breadth-first,
+over the pairs of alphabet classes the two class maps actually produce.  The
+first product state where the two disagree gives a shortest counterexample,
+read off the BFS parents.  A state "accepts" a token name (or nothing), so
+scanner DFAs must agree on which token they recognize, not only on whether
+they accept.
+
+minimize() is regex_dfa.minimize (Hopcroft, O(k n log n)).
+"""
+
+from array import array
+from collections import deque
+
+from loader import load_script
+
+_regex_dfa = load_script("regex_dfa.py")
+DFA, OTHER, N_SYMBOLS = _regex_dfa.DFA, _regex_dfa.OTHER, _regex_dfa.N_SYMBOLS
+minimize = _regex_dfa.minimize
+
+MATCH = "MATCH"   # token name of accepting dict-DFA states, as in regex_dfa.compile_regex
+
+
+def from_dict(dfa, start, accept):
+    """A regex_dfa.DFA for {state: {symbol: state}}; symbols must be ASCII characters."""
+    names = [start] + [s for s in dfa if s != start]
+    index = {name: i for i, name in enumerate(names)}
+    symbols = sorted({sym for row in dfa.values() for sym in row})
+    if any(len(sym) != 1 or ord(sym) >= OTHER for sym in symbols):
+        raise ValueError("from_dict needs single ASCII characters as symbols")
+    k = len(symbols) + 1   # the last class holds every other character
+    classmap = bytearray([len(symbols)] * N_SYMBOLS)
+    for c, sym in enumerate(symbols):
+        classmap[ord(sym)] = c
+    table = array("i", [-1] * (len(names) * k))
+    for state, row in dfa.items():
+        for sym, target in row.items():
+            table[index[state] * k + symbols.index(sym)] = index[target]
+    accepting = [0 if name in accept else -1 for name in names]
+    return DFA(table, accepting, bytes(classmap), k, [MATCH])
+
+
+def to_dict(dfa):
+    """(transitions, start, accepting) with states named q0, q1, ...; start is q0."""
+    members = {}
+    for symbol in range(OTHER):
+        members.setdefault(dfa.classmap[symbol], chr(symbol))
+    transitions = {}
+    for s in range(dfa.n_states):
+        row = {}
+        for c, ch in sorted(members.items(), key=lambda item: item[1]):
+            t = dfa.table[s * dfa.n_classes + c]
+            if t >= 0:
+                row[ch] = f"q{t}"
+        transitions[f"q{s}"] = row
+    return transitions, "q0", {f"q{s}" for s in range(dfa.n_states) if dfa.accept[s] >= 0}
+
+
+# -----------------------------
+# Product construction
+# -----------------------------
+def _label(dfa, state):
+    if state < 0 or dfa.accept[state] < 0:
+        return None
+    return dfa.names[dfa.accept[state]]
+
+
+def _letters(a, b):
+    """[(class in a, class in b, representative character)] over the joint alphabet."""
+    letters = {}
+    # printable characters first, so counterexamples stay readable
+    for symbol in [*range(33, 127), *range(0, 33), 127, OTHER]:
+        pair = (a.classmap[symbol], b.classmap[symbol])
+        if pair not in letters:
+            letters[pair] = chr(symbol) if symbol < OTHER else "é"
+    return [(ca, cb, ch) for (ca, cb), ch in letters.items()]
+
+
+def _search(a, b, bad):
+    """Shortest string leading to a product state (p, q) with bad(p, q), or None."""
+    letters = _letters(a, b)
+    ka, kb = a.n_classes, b.n_classes
+    parent = {(0, 0): None}
+    queue = deque([(0, 0)])
+    while queue:
+        p, q = pair = queue.popleft()
+        if bad(p, q):
+            chars = []
+            while parent[pair] is not None:
+                pair, ch = parent[pair]
+                chars.append(ch)
+            return "".join(reversed(chars))
+        for ca, cb, ch in letters:
+            nxt = (a.table[p * ka + ca] if p >= 0 else -1,
+                   b.table[q * kb + cb] if q >= 0 else -1)
+            if nxt not in parent and nxt != (-1, -1):
+                parent[nxt] = (pair, ch)
+                queue.append(nxt)
+    return None
+
+
+def counterexample(a, b):
+    """Shortest string on which a and b disagree (accepted token), or None if equivalent."""
+    return _search(a, b, lambda p, q: _label(a, p) != _label(b, q))
+
+
+def equivalent(a, b):
+    return counterexample(a, b) is None
+
+
+def inclusion_counterexample(a, b):
+    """Shortest string a accepts but b does not (as the same token), or None."""
+    return _search(a, b, lambda p, q: _label(a, p) is not None and _label(a, p) != _label(b, q))
+
+
+def included(a, b):
+    """True if every string a accepts, b accepts as the same token."""
+    return inclusion_counterexample(a, b) is None
+
+
+if __name__ == "__main__":
+    compile_regex = _regex_dfa.compile_regex
+    automata1 = load_script("automata1.py")
+    automata3 = load_script("automata3.py")
+    even_ones = from_dict(automata1.dfa, automata1.start_state, automata1.accept_states)
+    contains_a = from_dict(automata3.dfa, automata3.start_state, automata3.accept_states)
+
+    for name, dfa, regex in [("automata1", even_ones, "(0*10*1)*0*"),
+                             ("automata3", contains_a, "b*a(a|b)*"),
+                             ("automata3", contains_a, "(b*ab*)*|b*")]:
+        witness = counterexample(dfa, compile_regex(regex))
+        verdict = "equivalent" if witness is None else f"differ on {witness!r}"
+        print(f"{name} vs {regex:14} {verdict}")
+
+    print(f"\n(b*ab*)*|b* includes automata3: {included(contains_a, compile_regex('(b*ab*)*|b*'))}")
+    print(f"automata3 includes (b*ab*)*|b*: {included(compile_regex('(b*ab*)*|b*'), contains_a)}")
+
+    rules = _regex_dfa.rules_from_tokens(load_script("Lex program.py").TOKENS)
+    nfa, start, accepts, classmap, members = _regex_dfa.thompson(rules)
+    big = _regex_dfa.subset_construction(nfa, start, accepts, classmap, members, [n for n, _ in rules])
+    small = minimize(big)
+    print(f"\nLex program scanner: {big.n_states} states -> {small.n_states} minimal, "
+          f"equivalent: {equivalent(big, small)}")
+    print("minimal automata3:", to_dict(minimize(contains_a)))
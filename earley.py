@@ -0,0 +1,427 @@
+"""
+Earley parsing for any context-free grammar, into a shared packed parse forest.
+
+Earley(grammar) takes a grammar.Grammar or the dict-of-lists shape of the
+scripts ({head: [[symbol, ...], ...]}, "ε"/"epsilon" for an empty body), so
+left-recursive and ambiguous grammars parse as they are written.
+
+The chart holds items (p, dot, origin) per input position.  Whenever an item
+is added at position j with the symbol before its dot matched from k to j,
+k is recorded as one of its split points; ε-completions are handled by
+remembering which nonterminals were completed empty at j.  The split points
+are the forest: with
+
+    symbol node         (X, i, j)          X derives tokens[i:j]
+    item node           (p, dot, i, j)     body[:dot] of p derives tokens[i:j]
+
+the families (packed nodes) of a symbol node are the complete item nodes for
+its productions, and those of an item node (p, dot, i, j) are the pairs
+
+    (item node (p, dot - 1, i, k) or None when dot == 1,  symbol node (body[dot - 1], k, j))
+
+for its split points k.  Every node is a position pair plus a production or
+symbol, so the forest has O(n^2) nodes and O(n^3) families however many
+trees it packs: E -> E + E | a has Catalan(n) trees on n a's.
+
+Leo's optimization keeps right recursion linear.  When B completes from k
+to j and S[k] holds exactly one item waiting for B, with B its last symbol,
+the parent would complete at once, and so on up the chain; only the topmost
+item of such a chain is added at j, found through a per-(k, B) memo.  The
+skipped items are reconstructed from the chain (and registered as virtual
+items of S[j]) only when the forest reaches the top item.
+
+Forest.count() counts trees, Forest.tree() builds one and Forest.trees()
+enumerates them lazily, as new.py Node trees.
+"""
+
+import random
+import time
+from collections import deque
+from types import GeneratorType
+
+from loader import load_script
+
+_grammar = load_script("grammar.py")
+Node = load_script("new.py").Node
+
+
+class Earley:
+    def __init__(self, grammar, leo=True):
+        if isinstance(grammar, dict):
+            grammar = _grammar.Grammar.from_dict(grammar)
+        self.grammar = grammar
+        self.leo = leo
+
+    def parse(self, tokens):
+        """Forest for tokens (terminal names); SyntaxError if they are not in the language."""
+        return Forest(self, list(tokens))
+
+
+class Forest:
+    def __init__(self, parser, tokens):
+        self.grammar = g = parser.grammar
+        self.tokens = tokens
+        n = len(tokens)
+        codes = [g.ids.get(t, -1) for t in tokens]
+        heads, bodies, by_head, index, is_terminal = g.heads, g.bodies, g.by_head, g.index, g.is_terminal
+
+        sets = [dict() for _ in range(n + 1)]        # item -> set of split points
+        waiting = [dict() for _ in range(n + 1)]     # symbol -> items with it after the dot
+        empty = [set() for _ in range(n + 1)]        # nonterminals completed from j to j
+        completed = [dict() for _ in range(n + 1)]   # (head, origin) -> productions completed at j
+        leo_links = [dict() for _ in range(n + 1)]   # top item -> {(k, B)} chains that skipped to it
+        leo_memo = [dict() for _ in range(n + 1)]    # B -> topmost item (complete) or None
+        self._sets, self._waiting, self._completed, self._leo_links = sets, waiting, completed, leo_links
+        self.n_items = 0
+
+        def leo_top(k, b):
+            """Topmost complete item of the deterministic chain above B at k, or None."""
+            path = []
+            top = None
+            while True:
+                memo = leo_memo[k]
+                if b in memo:
+                    top = memo[b]
+                    break
+                memo[b] = None   # also breaks cycles of unit productions
+                pending = waiting[k].get(b)
+                if pending is None or len(pending) != 1:
+                    break
+                p, dot, origin = pending[0]
+                if dot != len(bodies[p]) - 1:
+                    break
+                path.append((k, b, (p, dot + 1, origin)))
+                if origin == k:
+                    break
+                k, b = origin, heads[p]
+            for k2, b2, item in reversed(path):
+                top = top or item
+                leo_memo[k2][b2] = top
+            return top
+
+        for j in range(n + 1):
+            current = sets[j]
+            if j == 0:
+                work = [(p, 0, 0) for p in by_head[index[g.start]]]
+                for item in work:
+                    current[item] = set()
+            else:
+                work = list(current)
+            while work:
+                item = work.pop()
+                p, dot, origin = item
+                body = bodies[p]
+                if dot == len(body):
+                    a = heads[p]
+                    completed[j].setdefault((a, origin), []).append(p)
+                    if origin == j:
+                        empty[j].add(a)
+                    elif parser.leo:
+                        top = leo_top(origin, a)
+                        if top is not None:
+                            if top not in current:
+                                current[top] = set()
+                                work.append(top)
+                            leo_links[j].setdefault(top, set()).add((origin, a))
+                            continue
+                    for p2, d2, o2 in list(waiting[origin].get(a, ())):
+                        nxt = (p2, d2 + 1, o2)
+                        if nxt not in current:
+                            current[nxt] = {origin}
+                            work.append(nxt)
+                        else:
+                            current[nxt].add(origin)
+                    continue
+                x = body[dot]
+                if is_terminal[x]:
+                    if j < n and codes[j] == x:
+                        sets[j + 1].setdefault((p, dot + 1, origin), set()).add(j)
+                    continue
+                pending = waiting[j].get(x)
+                if pending is None:
+                    waiting[j][x] = [item]
+                    for q in by_head[index[x]]:
+                        if (q, 0, j) not in current:
+                            current[(q, 0, j)] = set()
+                            work.append((q, 0, j))
+                else:
+                    pending.append(item)
+                if x in empty[j]:
+                    nxt = (p, dot + 1, origin)
+                    if nxt not in current:
+                        current[nxt] = {j}
+                        work.append(nxt)
+                    else:
+                        current[nxt].add(j)
+            self.n_items += len(current)
+            if j < n and not sets[j + 1]:
+                raise SyntaxError(f"Unexpected {tokens[j]!r} at token {j}")
+
+        self._virtual = {}   # (j, p, dot, origin) -> split points of items skipped by Leo
+        self._expanded = set()
+        self._ground = None
+        for top in list(leo_links[n]):
+            self._expand(n, top)
+        if not self._complete(g.start, 0, n):
+            raise SyntaxError(f"Input ends early after token {n - 1}" if n else "Empty input is not in the language")
+        self.root = (g.start, 0, n)
+
+    # -----------------------------
+    # Leo chains
+    # -----------------------------
+    def _expand(self, j, top):
+        """Register the items of S[j] that Leo skipped on the way to top."""
+        if (j, top) in self._expanded:
+            return
+        self._expanded.add((j, top))
+        g = self.grammar
+        for k, b in self._leo_links[j].get(top, ()):
+            while True:
+                p, dot, origin = self._waiting[k][b][0]
+                item = (p, dot + 1, origin)
+                if item == top:
+                    self._sets[j][top].add(k)
+                    break
+                self._virtual.setdefault((j, *item), set()).add(k)
+                self._completed[j].setdefault((g.heads[p], origin), [])
+                if p not in self._completed[j][(g.heads[p], origin)]:
+                    self._completed[j][(g.heads[p], origin)].append(p)
+                k, b = origin, g.heads[p]
+
+    def _complete(self, symbol, i, j):
+        return self._completed[j].get((symbol, i), ())
+
+    def _splits(self, p, dot, i, j):
+        if dot == len(self.grammar.bodies[p]) and (p, dot, i) in self._leo_links[j]:
+            self._expand(j, (p, dot, i))
+        splits = self._sets[j].get((p, dot, i))
+        virtual = self._virtual.get((j, p, dot, i))
+        if virtual:
+            return (splits or set()) | virtual
+        return splits or ()
+
+    # -----------------------------
+    # Forest
+    # -----------------------------
+    def families(self, node):
+        """Packed alternatives of a node (see the module docstring)."""
+        g = self.grammar
+        if len(node) == 3:
+            symbol, i, j = node
+            if g.is_terminal[symbol]:
+                return []
+            return [(p, len(g.bodies[p]), i, j) for p in self._complete(symbol, i, j)]
+        p, dot, i, j = node
+        if dot == 0:
+            return []   # an empty body
+        right = g.bodies[p][dot - 1]
+        return [((p, dot - 1, i, k) if dot > 1 else None, (right, k, j))
+                for k in sorted(self._splits(p, dot, i, j))]
+
+    def _children(self, node):
+        """Nodes below node, for walks over the whole forest."""
+        result = []
+        for family in self.families(node):
+            if len(node) == 3:
+                result.append(family)
+            else:
+                result.extend(child for child in family if child is not None)
+        return result
+
+    def size(self):
+        """(nodes, families) reachable from the root."""
+        seen, stack, families = {self.root}, [self.root], 0
+        while stack:
+            node = stack.pop()
+            families += len(self.families(node))
+            for child in self._children(node):
+                if child not in seen:
+                    seen.add(child)
+                    stack.append(child)
+        return len(seen), families
+
+    def count(self):
+        """Number of parse trees (float("inf") if the grammar's cycles make it unbounded)."""
+        counts, state = {}, {}
+        stack = [self.root]
+        while stack:
+            node = stack[-1]
+            if state.get(node) is None:
+                state[node] = "open"
+                for child in self._children(node):
+                    if state.get(child) == "open":
+                        return float("inf")
+                    if child not in state:
+                        stack.append(child)
+                continue
+            stack.pop()
+            if state[node] == "done":
+                continue
+            state[node] = "done"
+            if len(node) == 3:
+                families = self.families(node)
+                counts[node] = sum(counts[item] for item in families) if families else 1
+            elif node[1] == 0:
+                counts[node] = 1
+            else:
+                counts[node] = sum((counts[left] if left else 1) * counts[right]
+                                   for left, right in self.families(node))
+        return counts[self.root]
+
+    def _name(self, symbol_node):
+        symbol, i, _ = symbol_node
+        return self.tokens[i] if self.grammar.is_terminal[symbol] else self.grammar.names[symbol]
+
+    def _grounding(self):
+        """
+        node -> index of a family whose subtrees are all finite (None for
+        leaves), found with a counting worklist from the leaves up, so that
+        following it never cycles.
+        """
+        if self._ground is not None:
+            return self._ground
+        users, remaining, choice = {}, {}, {}
+        work = deque()
+        seen, stack = {self.root}, [self.root]
+        while stack:
+            node = stack.pop()
+            families = self.families(node)
+            if not families:
+                choice[node] = None
+                work.append(node)
+            for f, family in enumerate(families):
+                children = {family} if len(node) == 3 else {c for c in family if c is not None}
+                remaining[(node, f)] = len(children)
+                for child in children:
+                    users.setdefault(child, []).append((node, f))
+                    if child not in seen:
+                        seen.add(child)
+                        stack.append(child)
+        while work:
+            for node, f in users.get(work.popleft(), ()):
+                remaining[(node, f)] -= 1
+                if remaining[(node, f)] == 0 and node not in choice:
+                    choice[node] = f
+                    work.append(node)
+        self._ground = choice
+        return choice
+
+    def tree(self):
+        """One parse tree, built without recursion."""
+        choice = self._grounding()
+        root = Node(self._name(self.root))
+        stack = [(self.root, root)]
+        while stack:
+            node, out = stack.pop()
+            if choice[node] is None:
+                continue
+            item = self.families(node)[choice[node]]
+            sequence = []
+            while item is not None and choice[item] is not None:
+                item, right = self.families(item)[choice[item]]
+                sequence.append(right)
+            sequence.reverse()
+            out.children = [Node(self._name(s)) for s in sequence]
+            stack.extend(zip(sequence, out.children))
+        return root
+
+    def trees(self):
+        """Every parse tree, lazily (trees through a cycle are skipped)."""
+        # The enumeration is a stack of generator frames instead of nested
+        # generators, so deep trees do not hit the recursion limit.  A frame
+        # yields a generator to pull the next value from it (the frame is
+        # sent that value, or None once the generator is exhausted) and
+        # yields anything else as its own next value.  The frames on the
+        # stack are the symbol nodes above the current one: on_path.
+        on_path = set()
+        root = self._symbol_trees(self.root, on_path)
+        stack, sent = [root], None
+        push, pop = stack.append, stack.pop
+        while stack:
+            try:
+                out = stack[-1].send(sent)
+            except StopIteration:
+                pop()
+                sent = None
+                continue
+            if type(out) is GeneratorType:
+                push(out)
+                sent = None
+            elif len(stack) > 1:
+                pop()
+                sent = out
+            else:
+                yield out
+                sent = None
+
+    def _symbol_trees(self, node, on_path):
+        if self.grammar.is_terminal[node[0]]:
+            yield Node(self._name(node))
+            return
+        if node in on_path:
+            return
+        for item in self.families(node):
+            sequences = self._sequences(item, on_path)
+            while True:
+                on_path.add(node)
+                children = yield sequences
+                on_path.discard(node)
+                if children is None:
+                    break
+                yield Node(self._name(node), children)
+
+    def _sequences(self, item, on_path):
+        if item[1] == 0:
+            yield []
+        for left, right in self.families(item):
+            right_trees = self._symbol_trees(right, on_path)
+            while (right_tree := (yield right_trees)) is not None:
+                if left is None:
+                    yield [right_tree]
+                    continue
+                prefixes = self._sequences(left, on_path)
+                while (prefix := (yield prefixes)) is not None:
+                    yield prefix + [right_tree]
+
+
+if __name__ == "__main__":
+    import itertools
+
+    leftmost_script = load_script("leftmost dervation.py")
+    lr_script = load_script("eliminate left recursion.py")
+
+    # the grammars of the scripts, unchanged
+    postfix = Earley({head: [list(body) for body in bodies] for head, bodies in leftmost_script.grammar.items()})
+    left_recursive = Earley({head: [body.split() for body in bodies] for head, bodies in lr_script.grammar.items()})
+    forest = postfix.parse("aa+a*")
+    print("S -> SS+ | SS* | a on aa+a*:")
+    print(forest.tree().pretty())
+    forest = left_recursive.parse("e b d b a a".split())
+    print(f"S -> S a | A b | c, A -> S d | e on 'e b d b a a': {forest.count()} tree")
+    print(forest.tree().pretty())
+
+    ambiguous = Earley({"E": [["E", "+", "E"], ["E", "*", "E"], ["a"]]})
+    forest = ambiguous.parse("a + a * a + a".split())
+    print(f"E -> E + E | E * E | a on 'a + a * a + a': {forest.count()} trees; the first two:")
+    for tree in itertools.islice(forest.trees(), 2):
+        print(tree.pretty())
+
+    print(f"{'grammar':<22} {'n':>6} {'ms':>8} {'items':>10} {'nodes':>9} {'families':>9} {'trees':>12}")
+    rng = random.Random(0)
+    cases = [("E -> E + E | a", ambiguous, lambda n: " + ".join("a" * n).split(), (20, 50, 100)),
+             ("S -> SS+ | SS* | a", postfix, lambda n: load_script("derivation.py").postfix_expression(n, seed=n),
+              (100, 500, 2000)),
+             ("S -> a S | ε (Leo)", Earley({"S": [["a", "S"], ["ε"]]}), lambda n: ["a"] * n, (1000, 4000, 16000)),
+             ("S -> a S | ε (no Leo)", Earley({"S": [["a", "S"], ["ε"]]}, leo=False), lambda n: ["a"] * n,
+              (1000, 2000))]
+    for title, parser, make, sizes in cases:
+        for n in sizes:
+            tokens = make(n)
+            start = time.perf_counter()
+            forest = parser.parse(tokens)
+            seconds = time.perf_counter() - start
+            nodes, families = forest.size()
+            trees = forest.count()
+            shown = f"{trees:.3g}" if trees > 1e9 else str(trees)
+            print(f"{title:<22} {len(tokens):6} {seconds * 1e3:8.1f} {forest.n_items:10,} {nodes:9,} "
+                  f"{families:9,} {shown:>12}")
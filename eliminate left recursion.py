@@ -51,10 +51,11 @@ def eliminate_left_recursion(grammar):
 
     return new_grammar
 
-# Eliminate left recursion
-new_grammar = eliminate_left_recursion(grammar)
-print("S -> S a | A b | c \n A -> S d | e")
-# Print the transformed grammar
-print("Grammar after eliminating left recursion:")
-for nt, prods in new_grammar.items():
-    print(f"{nt} -> {' | '.join(prods)}")
+if __name__ == "__main__":
+    # Eliminate left recursion
+    new_grammar = eliminate_left_recursion(grammar)
+    print("S -> S a | A b | c \n A -> S d | e")
+    # Print the transformed grammar
+    print("Grammar after eliminating left recursion:")
+    for nt, prods in new_grammar.items():
+        print(f"{nt} -> {' | '.join(prods)}")
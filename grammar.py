@@ -0,0 +1,298 @@
+"""
+Context-free grammars with integer symbols and bitset FIRST/FOLLOW.
+
+A Grammar interns every symbol name to an int id.  Terminals and
+nonterminals also get dense indices of their own, so sets of them are ints
+used as bitsets:
+
+    nullable        bit i set if nonterminal i derives ε
+    first[i]        bit j set if terminal j can start a string derived
+                    from nonterminal i
+    follow[i]       bit j set if terminal j can follow nonterminal i
+
+Terminal 0 is always END ("$").  Productions are (head, body) pairs of
+symbol ids, with ε written as an empty body.
+
+The sets are computed with dependency-driven worklists instead of repeated
+passes over every production: nullable by counting the non-nullable symbols
+left in each body, FIRST and FOLLOW by pushing only the bits that are new
+along "X's set flows into Y's" edges.  Each edge moves a given bit at most
+once, so the cost is about (productions + edges) x set size / word size.
+
+Grammar.from_dict() reads the dict-of-lists shape used across the scripts,
+where "ε" or "epsilon" marks an empty body, and first_names() /
+follow_names() answer in that shape again (names, with "ε" for nullable).
+"""
+
+import random
+import time
+from collections import deque
+
+END = "$"
+EPSILON = "ε"
+EMPTY_MARKERS = ("ε", "epsilon")
+
+
+class Grammar:
+    def __init__(self, productions, start=None):
+        """productions: iterable of (head name, [body names]); start defaults to the first head."""
+        self.names = []         # symbol id -> name
+        self.ids = {}           # name -> symbol id
+        self.terminals = []     # terminal index -> symbol id
+        self.nonterminals = []  # nonterminal index -> symbol id
+        self.index = []         # symbol id -> terminal or nonterminal index
+        self.is_terminal = []   # symbol id -> bool
+
+        productions = [(head, list(body)) for head, body in productions]
+        heads = {head for head, _ in productions}
+        self._intern(END, terminal=True)
+        for head in dict.fromkeys(head for head, _ in productions):
+            self._intern(head, terminal=False)
+        for _, body in productions:
+            for name in body:
+                if name not in self.ids:
+                    self._intern(name, terminal=name not in heads)
+
+        self.heads = [self.ids[head] for head, _ in productions]
+        self.bodies = [tuple(self.ids[name] for name in body) for _, body in productions]
+        self.by_head = [[] for _ in self.nonterminals]   # nonterminal index -> production numbers
+        for p, head in enumerate(self.heads):
+            self.by_head[self.index[head]].append(p)
+        self.start = self.ids[start if start is not None else productions[0][0]]
+        self._analyzed = False
+
+    def _intern(self, name, terminal):
+        self.ids[name] = len(self.names)
+        self.names.append(name)
+        self.is_terminal.append(terminal)
+        group = self.terminals if terminal else self.nonterminals
+        self.index.append(len(group))
+        group.append(self.ids[name])
+
+    @classmethod
+    def from_dict(cls, grammar, start=None):
+        """From {head: [[symbol, ...], ...]}; a body of just "ε"/"epsilon" is empty."""
+        productions = [(head, [s for s in body if s not in EMPTY_MARKERS])
+                       for head, bodies in grammar.items() for body in bodies]
+        return cls(productions, start)
+
+    def to_dict(self, empty=EPSILON):
+        """Back to {head: [[symbol, ...], ...]}, empty bodies written as [empty]."""
+        result = {}
+        for head, body in zip(self.heads, self.bodies):
+            result.setdefault(self.names[head], []).append([self.names[s] for s in body] or [empty])
+        return result
+
+    def __len__(self):
+        return len(self.bodies)
+
+    def production_str(self, p):
+        body = " ".join(self.names[s] for s in self.bodies[p]) or EPSILON
+        return f"{self.names[self.heads[p]]} → {body}"
+
+    # -----------------------------
+    # Analysis
+    # -----------------------------
+    def analyze(self):
+        """Compute nullable, FIRST and FOLLOW (done once, on first use)."""
+        if not self._analyzed:
+            self._compute_nullable()
+            self._compute_first()
+            self._compute_follow()
+            self._analyzed = True
+        return self
+
+    def _occurrences(self):
+        """nonterminal index -> [(production, position)] where it occurs in a body."""
+        occurs = [[] for _ in self.nonterminals]
+        for p, body in enumerate(self.bodies):
+            for i, s in enumerate(body):
+                if not self.is_terminal[s]:
+                    occurs[self.index[s]].append((p, i))
+        return occurs
+
+    def _compute_nullable(self):
+        index, is_terminal = self.index, self.is_terminal
+        occurs = self._occurrences()
+        # symbols of each body not yet known to be nullable; a terminal never will be
+        remaining = [len(body) for body in self.bodies]
+        nullable = 0
+        work = deque()
+        for p, body in enumerate(self.bodies):
+            if not body:
+                a = index[self.heads[p]]
+                if not nullable >> a & 1:
+                    nullable |= 1 << a
+                    work.append(a)
+        while work:
+            a = work.popleft()
+            for p, _ in occurs[a]:
+                remaining[p] -= 1
+                if remaining[p] == 0 and not any(is_terminal[s] for s in self.bodies[p]):
+                    h = index[self.heads[p]]
+                    if not nullable >> h & 1:
+                        nullable |= 1 << h
+                        work.append(h)
+        self.nullable = nullable
+
+    def _propagate(self, sets, edges):
+        """Close sets under the edges: for every edge x -> y, sets[y] includes sets[x]."""
+        work = deque(x for x in range(len(sets)) if sets[x] and edges[x])
+        queued = set(work)
+        while work:
+            x = work.popleft()
+            queued.discard(x)
+            bits = sets[x]
+            for y in edges[x]:
+                new = bits & ~sets[y]
+                if new:
+                    sets[y] |= new
+                    if y not in queued and edges[y]:
+                        queued.add(y)
+                        work.append(y)
+        return sets
+
+    def _compute_first(self):
+        index, is_terminal, nullable = self.index, self.is_terminal, self.nullable
+        first = [0] * len(self.nonterminals)
+        edges = [set() for _ in self.nonterminals]   # FIRST(x) flows into FIRST(y)
+        for head, body in zip(self.heads, self.bodies):
+            a = index[head]
+            for s in body:
+                if is_terminal[s]:
+                    first[a] |= 1 << index[s]
+                    break
+                if index[s] != a:
+                    edges[index[s]].add(a)
+                if not nullable >> index[s] & 1:
+                    break
+        self.first = self._propagate(first, edges)
+
+    def first_of(self, symbols):
+        """(FIRST bitset, nullable) of a sequence of symbol ids."""
+        bits = 0
+        for s in symbols:
+            if self.is_terminal[s]:
+                return bits | 1 << self.index[s], False
+            bits |= self.first[self.index[s]]
+            if not self.nullable >> self.index[s] & 1:
+                return bits, False
+        return bits, True
+
+    def _compute_follow(self):
+        index, is_terminal = self.index, self.is_terminal
+        follow = [0] * len(self.nonterminals)
+        follow[index[self.start]] = 1 << index[self.ids[END]]
+        edges = [set() for _ in self.nonterminals]   # FOLLOW(x) flows into FOLLOW(y)
+        for head, body in zip(self.heads, self.bodies):
+            a = index[head]
+            # walk right to left, keeping FIRST and nullability of the suffix
+            suffix, suffix_nullable = 0, True
+            for s in reversed(body):
+                if is_terminal[s]:
+                    suffix, suffix_nullable = 1 << index[s], False
+                    continue
+                b = index[s]
+                follow[b] |= suffix
+                if suffix_nullable and b != a:
+                    edges[a].add(b)
+                if self.nullable >> b & 1:
+                    suffix |= self.first[b]
+                else:
+                    suffix, suffix_nullable = self.first[b], False
+        self.follow = self._propagate(follow, edges)
+
+    def analysis(self):
+        """The computed sets, as plain ints and lists (for caching)."""
+        self.analyze()
+        return {"nullable": self.nullable, "first": self.first, "follow": self.follow}
+
+    def restore_analysis(self, analysis):
+        """Install sets returned by analysis() instead of computing them."""
+        self.nullable, self.first, self.follow = analysis["nullable"], analysis["first"], analysis["follow"]
+        self._analyzed = True
+
+    def ll1_table(self):
+        """
+        {(nonterminal index, terminal index): [productions]} for LL(1) parsing.
+
+        Production p goes under every terminal in FIRST(body), and under
+        FOLLOW(head) when the body is nullable; a cell holding more than one
+        production is a conflict.
+        """
+        self.analyze()
+        table = {}
+        for p, (head, body) in enumerate(zip(self.heads, self.bodies)):
+            a = self.index[head]
+            bits, nullable = self.first_of(body)
+            if nullable:
+                bits |= self.follow[a]
+            while bits:
+                low = bits & -bits
+                table.setdefault((a, low.bit_length() - 1), []).append(p)
+                bits ^= low
+        return table
+
+    # -----------------------------
+    # Name-level views
+    # -----------------------------
+    def terminal_names(self, bits):
+        """Names of the terminals in a terminal bitset."""
+        names, terminals = [], self.terminals
+        while bits:
+            low = bits & -bits
+            names.append(self.names[terminals[low.bit_length() - 1]])
+            bits ^= low
+        return names
+
+    def is_nullable(self, name):
+        self.analyze()
+        return bool(self.nullable >> self.index[self.ids[name]] & 1)
+
+    def first_names(self, name):
+        """FIRST of a symbol as a set of names, with "ε" if it is nullable."""
+        self.analyze()
+        s = self.ids[name]
+        if self.is_terminal[s]:
+            return {name}
+        names = set(self.terminal_names(self.first[self.index[s]]))
+        if self.nullable >> self.index[s] & 1:
+            names.add(EPSILON)
+        return names
+
+    def follow_names(self, name):
+        self.analyze()
+        return set(self.terminal_names(self.follow[self.index[self.ids[name]]]))
+
+
+def random_grammar(n_nonterminals, n_terminals, n_productions, max_body=5, seed=0):
+    """A random grammar in which every nonterminal has at least one production."""
+    rng = random.Random(seed)
+    nts = [f"N{i}" for i in range(n_nonterminals)]
+    ts = [f"t{i}" for i in range(n_terminals)]
+    productions = [(nt, []) for nt in nts[: n_nonterminals // 10]]   # some ε-productions
+    for i in range(n_productions - len(productions)):
+        head = nts[i] if i < n_nonterminals else rng.choice(nts)
+        body = [rng.choice(nts) if rng.random() < 0.5 else rng.choice(ts)
+                for _ in range(rng.randint(1, max_body))]
+        productions.append((head, body))
+    return Grammar(productions, start="N0")
+
+
+if __name__ == "__main__":
+    from loader import load_script
+
+    g = Grammar.from_dict(load_script("new.py").GRAMMAR).analyze()
+    for p in range(len(g)):
+        print(g.production_str(p))
+    print()
+    for nt in g.nonterminals:
+        name = g.names[nt]
+        print(f"FIRST({name}) = {sorted(g.first_names(name))}   FOLLOW({name}) = {sorted(g.follow_names(name))}")
+
+    print(f"\n{'productions':>11} {'nonterminals':>12} {'ms':>8}")
+    for n in (1_000, 5_000, 20_000):
+        big = random_grammar(n // 4, 200, n, seed=n)
+        start = time.perf_counter()
+        big.analyze()
+        print(f"{n:11,} {len(big.nonterminals):12,} {(time.perf_counter() - start) * 1e3:8.1f}")
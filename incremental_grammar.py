@@ -0,0 +1,499 @@
+"""
+Nullable, FIRST, FOLLOW and the LL(1) table, kept up to date under edits.
+
+new.py's compute_first() / compute_follow() sweep every production until
+nothing changes, so a grammar editor that calls them after each edit pays
+for the whole grammar every time.  IncrementalGrammar takes edits instead:
+
+    g = IncrementalGrammar(GRAMMAR)
+    g.add_production("F", ["-", "F"])       -> {("E", "-"), ("T", "-"), ("F", "-")}
+    g.remove_production("T'", ["ε"])        -> {("T'", "+"), ("T'", ")"), ("T'", "$")}
+
+and each edit returns the LL(1) table cells (nonterminal, terminal) whose
+set of productions changed.
+
+FIRST and FOLLOW are unions along "X's set flows into Y's" edges plus
+bits contributed directly by productions, as in grammar.py.  Every
+production remembers what it contributes (its terminal bits and its
+edges); an edit recomputes the contributions of the edited production and
+of the productions that mention a symbol whose nullable or FIRST changed,
+and applies only the difference:
+
+    gained bits     are pushed along the edges, as in grammar._propagate()
+    lost bits       are deleted, together with every copy of them reachable
+                    along edges, then re-derived from what is left
+                    (delete-and-rederive: a bit on a cycle has no other
+                    support, so it cannot just be kept)
+
+Nullable is maintained the same way, with a count per production of body
+symbols not (yet) nullable.  So an edit costs the part of the grammar
+whose sets actually depend on it, not a pass over every production.
+
+A name becomes a nonterminal when it first gets a production; productions
+that used it as a terminal are re-added.  Terminal "$" is bit 0.
+"""
+
+import random
+import time
+
+from loader import load_script
+
+_grammar = load_script("grammar.py")
+
+END = _grammar.END
+
+
+class _Closure:
+    """sets[x] = union of direct[x] | union of sets[y] over edges y -> x, updated in batches."""
+
+    def __init__(self):
+        self.sets = {}      # node -> bitset
+        self.direct = {}    # node -> {key: bitset}
+        self.succ = {}      # node -> {node: number of productions giving the edge}
+        self.pred = {}
+        self._lost = {}     # node -> bits that may have lost their support
+        self._dirty = set()
+        self._old = {}      # node -> bitset before this batch
+
+    def set_direct(self, x, key, bits):
+        direct = self.direct.setdefault(x, {})
+        old = direct.pop(key, 0)
+        if bits:
+            direct[key] = bits
+        if old & ~bits:
+            self._suspect(x, old & ~bits)
+        if bits & ~old:
+            self._dirty.add(x)
+
+    def add_edge(self, y, x):
+        succ = self.succ.setdefault(y, {})
+        succ[x] = succ.get(x, 0) + 1
+        if succ[x] == 1:
+            self.pred.setdefault(x, {})[y] = None
+            self._dirty.add(x)
+
+    def remove_edge(self, y, x):
+        succ = self.succ[y]
+        succ[x] -= 1
+        if not succ[x]:
+            del succ[x]
+            del self.pred[x][y]
+            self._suspect(x, self.sets.get(y, 0))
+
+    def _suspect(self, x, bits):
+        bits &= self.sets.get(x, 0)
+        if bits:
+            self._lost[x] = self._lost.get(x, 0) | bits
+
+    def _set(self, x, bits):
+        self._old.setdefault(x, self.sets.get(x, 0))
+        self.sets[x] = bits
+
+    def settle(self):
+        """Bring sets up to date after the changes since the last call; the nodes whose set changed."""
+        sets, succ, lost = self.sets, self.succ, self._lost
+        # delete every bit that depended on something removed
+        work = list(lost)
+        while work:
+            x = work.pop()
+            bits = lost[x]
+            for z in succ.get(x, ()):
+                spread = bits & sets.get(z, 0) & ~lost.get(z, 0)
+                if spread:
+                    lost[z] = lost.get(z, 0) | spread
+                    work.append(z)
+        for x, bits in lost.items():
+            self._set(x, sets[x] & ~bits)
+        # re-derive them, and take in what was added, from direct bits and predecessors
+        work = []
+        for x in self._dirty.union(lost):
+            bits = 0
+            for b in self.direct.get(x, {}).values():
+                bits |= b
+            for y in self.pred.get(x, ()):
+                bits |= sets.get(y, 0)
+            if bits & ~sets.get(x, 0):
+                self._set(x, sets.get(x, 0) | bits)
+                work.append(x)
+        while work:
+            x = work.pop()
+            bits = sets[x]
+            for z in succ.get(x, ()):
+                new = bits & ~sets.get(z, 0)
+                if new:
+                    self._set(z, sets.get(z, 0) | new)
+                    work.append(z)
+        changed = {x for x, old in self._old.items() if sets[x] != old}
+        self._lost, self._dirty, self._old = {}, set(), {}
+        return changed
+
+
+class IncrementalGrammar:
+    def __init__(self, grammar=None, start=None):
+        """grammar: {head: [[symbol, ...], ...]} as in new.py ("ε"/"epsilon" for empty bodies)."""
+        self.start = None
+        self.productions = {}   # production id -> (head, body)
+        self.by_head = {}       # nonterminal -> {production id: None}
+        self.users = {}         # symbol -> {production id: occurrences in its body}
+        self.bits = {END: 0}    # terminal -> bit
+        self.terminals = [END]  # bit -> terminal
+        self.nullable = set()
+        self.remaining = {}     # production id -> body symbols not nullable
+        self.first = _Closure()
+        self.follow = _Closure()
+        self.first_contrib = {}     # production id -> (terminal bits, nonterminals whose FIRST flows in)
+        self.follow_contrib = {}    # production id -> ({nonterminal: bits}, nonterminals FOLLOW(head) flows into)
+        self.cells = {}             # production id -> bits of the terminals it is chosen on
+        self.table = {}             # (nonterminal, bit) -> {production id: None}
+        self._next_id = 0
+        self._detached = {}         # production id -> (head, body), during an edit
+        if start is not None:
+            self._set_start(start)
+        if grammar:
+            self.edit(add=[(head, body) for head, bodies in grammar.items() for body in bodies])
+
+    # -----------------------------
+    # Edits
+    # -----------------------------
+    def add_production(self, head, body):
+        """Add head -> body; the changed table cells."""
+        return self.edit(add=[(head, body)])
+
+    def remove_production(self, head, body):
+        """Remove one production head -> body; the changed table cells."""
+        return self.edit(remove=[(head, body)])
+
+    def edit(self, add=(), remove=()):
+        """Apply removals, then additions, as one update; {(nonterminal, terminal)} whose productions changed."""
+        doomed = []
+        for head, body in remove:
+            pid = self.find(head, body, skip=doomed)
+            if pid is None:
+                body = " ".join(s for s in body if s not in _grammar.EMPTY_MARKERS) or _grammar.EPSILON
+                raise KeyError(f"no production {head} → {body}")
+            doomed.append(pid)
+
+        touched, gained, suspects = set(doomed), set(), set()
+        for pid in doomed:
+            self._detach(pid, suspects)
+        for head, body in add:
+            if head not in self.by_head:
+                # a former terminal: the productions that used it as one are attached again
+                moved = list(self.users.get(head, ()))
+                for pid in moved:
+                    self._detach(pid, suspects)
+                self.by_head[head] = {}
+                for pid in moved:
+                    self._attach(pid, *self._detached[pid], gained)
+                touched.update(moved)
+            if self.start is None:
+                self._set_start(head)
+            pid = self._next_id
+            self._next_id += 1
+            self._attach(pid, head, tuple(s for s in body if s not in _grammar.EMPTY_MARKERS), gained)
+            touched.add(pid)
+        try:
+            return self._update(touched, gained, suspects)
+        finally:
+            self._detached = {}
+
+    def find(self, head, body, skip=()):
+        """Id of a production head -> body (not in skip), or None."""
+        body = tuple(s for s in body if s not in _grammar.EMPTY_MARKERS)
+        for pid in self.by_head.get(head, ()):
+            if self.productions[pid][1] == body and pid not in skip:
+                return pid
+        return None
+
+    def _set_start(self, start):
+        self.start = start
+        self.by_head.setdefault(start, {})
+        self.follow.set_direct(start, "start", 1)
+
+    def _attach(self, pid, head, body, gained):
+        self.productions[pid] = (head, body)
+        self.by_head[head][pid] = None
+        for s in body:
+            users = self.users.setdefault(s, {})
+            users[pid] = users.get(pid, 0) + 1
+        self.remaining[pid] = sum(s not in self.nullable for s in body)
+        gained.add(head)
+
+    def _detach(self, pid, suspects):
+        head, body = self._detached[pid] = self.productions.pop(pid)
+        del self.by_head[head][pid]
+        for s in body:
+            users = self.users[s]
+            users[pid] -= 1
+            if not users[pid]:
+                del users[pid]
+        del self.remaining[pid]
+        suspects.add(head)
+
+    def _head(self, pid):
+        return (self.productions.get(pid) or self._detached[pid])[0]
+
+    # -----------------------------
+    # Propagation
+    # -----------------------------
+    def _settle_nullable(self, gained, suspects):
+        """Nullable after productions were attached and detached; the nonterminals that changed."""
+        nullable, users, remaining, productions = self.nullable, self.users, self.remaining, self.productions
+        # delete nullable from every nonterminal that may have depended on a detached production
+        lost, work = set(), [a for a in suspects if a in nullable]
+        while work:
+            a = work.pop()
+            if a in lost:
+                continue
+            lost.add(a)
+            for pid in users.get(a, ()):
+                head = productions[pid][0]
+                if head in nullable and head not in lost and not remaining[pid]:
+                    work.append(head)
+        for a in lost:
+            nullable.discard(a)
+            for pid, count in users.get(a, {}).items():
+                remaining[pid] += count
+        # re-derive it, and take in attached productions, by counting down
+        work = [a for a in lost | gained
+                if a not in nullable and any(not remaining[pid] for pid in self.by_head[a])]
+        added = set()
+        while work:
+            a = work.pop()
+            if a in nullable:
+                continue
+            nullable.add(a)
+            added.add(a)
+            for pid, count in users.get(a, {}).items():
+                remaining[pid] -= count
+                if not remaining[pid] and productions[pid][0] not in nullable:
+                    work.append(productions[pid][0])
+        return lost ^ added
+
+    def _first_contribution(self, pid):
+        if pid not in self.productions:
+            return 0, frozenset()
+        head, body = self.productions[pid]
+        sources = set()
+        for s in body:
+            if s not in self.by_head:
+                return self._bit(s), frozenset(sources)
+            if s != head:
+                sources.add(s)
+            if s not in self.nullable:
+                break
+        return 0, frozenset(sources)
+
+    def _follow_contribution(self, pid):
+        if pid not in self.productions:
+            return {}, frozenset()
+        head, body = self.productions[pid]
+        first = self.first.sets
+        direct, edges = {}, set()
+        # walk right to left, keeping FIRST and nullability of the suffix
+        suffix, suffix_nullable = 0, True
+        for s in reversed(body):
+            if s not in self.by_head:
+                suffix, suffix_nullable = self._bit(s), False
+                continue
+            if suffix:
+                direct[s] = direct.get(s, 0) | suffix
+            if suffix_nullable and s != head:
+                edges.add(s)
+            if s in self.nullable:
+                suffix |= first.get(s, 0)
+            else:
+                suffix, suffix_nullable = first.get(s, 0), False
+        return direct, frozenset(edges)
+
+    def _cell_bits(self, pid):
+        if pid not in self.productions:
+            return 0
+        head, body = self.productions[pid]
+        bits = 0
+        for s in body:
+            if s not in self.by_head:
+                return bits | self._bit(s)
+            bits |= self.first.sets.get(s, 0)
+            if s not in self.nullable:
+                return bits
+        return bits | self.follow.sets.get(head, 0)
+
+    def _bit(self, terminal):
+        if terminal not in self.bits:
+            self.bits[terminal] = len(self.terminals)
+            self.terminals.append(terminal)
+        return 1 << self.bits[terminal]
+
+    def _users_of(self, symbols):
+        pids = set()
+        for s in symbols:
+            pids.update(self.users.get(s, ()))
+        return pids
+
+    def _update(self, touched, gained, suspects):
+        changed = self._settle_nullable(gained, suspects)
+
+        pids = touched | self._users_of(changed)
+        for pid in pids:
+            head = self._head(pid)
+            old_bits, old_sources = self.first_contrib.pop(pid, (0, frozenset()))
+            bits, sources = self._first_contribution(pid)
+            if bits or sources:
+                self.first_contrib[pid] = bits, sources
+            if bits != old_bits:
+                self.first.set_direct(head, pid, bits)
+            for y in old_sources - sources:
+                self.first.remove_edge(y, head)
+            for y in sources - old_sources:
+                self.first.add_edge(y, head)
+        changed = self.first.settle()
+
+        pids |= self._users_of(changed)
+        for pid in pids:
+            head = self._head(pid)
+            old_direct, old_edges = self.follow_contrib.pop(pid, ({}, frozenset()))
+            direct, edges = self._follow_contribution(pid)
+            if direct or edges:
+                self.follow_contrib[pid] = direct, edges
+            for b in old_direct.keys() | direct.keys():
+                if old_direct.get(b, 0) != direct.get(b, 0):
+                    self.follow.set_direct(b, pid, direct.get(b, 0))
+            for b in old_edges - edges:
+                self.follow.remove_edge(head, b)
+            for b in edges - old_edges:
+                self.follow.add_edge(head, b)
+        changed = self.follow.settle()
+
+        for a in changed:
+            pids.update(self.by_head.get(a, ()))
+        before = {}     # (nonterminal, bit) -> bodies in the cell before the edit, for cells touched
+        for pid in pids:
+            head = self._head(pid)
+            old = self.cells.pop(pid, 0)
+            bits = self._cell_bits(pid)
+            if bits:
+                self.cells[pid] = bits
+            for diff, present in ((old & ~bits, False), (bits & ~old, True)):
+                while diff:
+                    low = diff & -diff
+                    key = (head, low.bit_length() - 1)
+                    cell = self.table.setdefault(key, {})
+                    if key not in before:
+                        before[key] = self._bodies(cell)
+                    if present:
+                        cell[pid] = None
+                    else:
+                        del cell[pid]
+                        if not cell:
+                            del self.table[key]
+                    diff ^= low
+        return {(a, self.terminals[t]) for (a, t), old in before.items()
+                if self._bodies(self.table.get((a, t), ())) != old}
+
+    def _bodies(self, pids):
+        return sorted((self.productions.get(pid) or self._detached[pid])[1] for pid in pids)
+
+    # -----------------------------
+    # Name-level views
+    # -----------------------------
+    def terminal_names(self, bits):
+        """Names of the terminals in a terminal bitset."""
+        names = []
+        while bits:
+            low = bits & -bits
+            names.append(self.terminals[low.bit_length() - 1])
+            bits ^= low
+        return names
+
+    def is_nullable(self, name):
+        return name in self.nullable
+
+    def first_names(self, name):
+        """FIRST of a symbol as a set of names, with "ε" if it is nullable."""
+        if name not in self.by_head:
+            return {name}
+        names = set(self.terminal_names(self.first.sets.get(name, 0)))
+        if name in self.nullable:
+            names.add(_grammar.EPSILON)
+        return names
+
+    def follow_names(self, name):
+        return set(self.terminal_names(self.follow.sets.get(name, 0)))
+
+    def cell(self, nonterminal, terminal):
+        """Bodies of the productions chosen for nonterminal on terminal (more than one: a conflict)."""
+        pids = self.table.get((nonterminal, self.bits.get(terminal, -1)), ())
+        return [list(self.productions[pid][1]) for pid in pids]
+
+    def conflicts(self):
+        """[(nonterminal, terminal)] cells holding more than one production."""
+        return sorted((a, self.terminals[t]) for (a, t), pids in self.table.items() if len(pids) > 1)
+
+    def to_dict(self, empty=_grammar.EPSILON):
+        """{head: [[symbol, ...], ...]}, empty bodies written as [empty]."""
+        result = {}
+        for head, body in self.productions.values():
+            result.setdefault(head, []).append(list(body) or [empty])
+        return result
+
+
+def random_edits(grammar, count, seed=0):
+    """count (add, remove) edits on a grammar.random_grammar(): each drops one production and adds one."""
+    rng = random.Random(seed)
+    productions = [(head, body) for head, bodies in grammar.items() for body in bodies]
+    heads = list(grammar)
+    alternatives = {head: len(bodies) for head, bodies in grammar.items()}
+    symbols = sorted({s for _, body in productions for s in body if s not in _grammar.EMPTY_MARKERS})
+    edits = []
+    for _ in range(count):
+        i = rng.randrange(len(productions))
+        while alternatives[productions[i][0]] == 1:   # every nonterminal keeps a production
+            i = rng.randrange(len(productions))
+        removed = productions.pop(i)
+        added = (rng.choice(heads), [rng.choice(symbols) for _ in range(rng.randint(1, 5))])
+        productions.append(added)
+        alternatives[removed[0]] -= 1
+        alternatives[added[0]] += 1
+        edits.append(([added], [removed]))
+    return edits
+
+
+if __name__ == "__main__":
+    new = load_script("new.py")
+
+    g = IncrementalGrammar(new.GRAMMAR)
+    edits = [("add", "F", ["-", "F"]), ("add", "T'", ["/", "F", "T'"]), ("remove", "E'", ["ε"]),
+             ("remove", "F", ["-", "F"]), ("add", "E'", ["ε"]), ("add", "F", ["E"])]
+    for op, head, body in edits:
+        changed = (g.add_production if op == "add" else g.remove_production)(head, body)
+        print(f"{op} {head} → {' '.join(body)}: {sorted(changed)}")
+    print(f"conflicts: {g.conflicts()}")
+    for a in g.by_head:
+        print(f"FIRST({a}) = {sorted(g.first_names(a))}   FOLLOW({a}) = {sorted(g.follow_names(a))}")
+
+    print(f"\n{'productions':>11} {'edit ms':>8} {'full ms':>8} {'new.py ms':>10} {'cells/edit':>10}")
+    for n in (1_000, 5_000, 20_000):
+        grammar = _grammar.random_grammar(n // 4, 200, n, seed=n).to_dict(empty="epsilon")
+        g = IncrementalGrammar(grammar)
+        edits = random_edits(grammar, 100, seed=n)
+        cells = 0
+        start = time.perf_counter()
+        for add, remove in edits:
+            cells += len(g.edit(add=add, remove=remove))
+        incremental = (time.perf_counter() - start) / len(edits)
+        current = g.to_dict(empty="epsilon")
+
+        start = time.perf_counter()
+        full = _grammar.Grammar.from_dict(current, start="N0")
+        full.ll1_table()
+        full_ms = (time.perf_counter() - start) * 1e3
+        for a in g.by_head:   # same sets as a full recompute
+            assert g.follow_names(a) == full.follow_names(a) and g.first_names(a) == full.first_names(a)
+        slow = ""
+        if n <= 5_000:
+            start = time.perf_counter()
+            first = new.compute_first(current)
+            new.build_parsing_table(current, first, new.compute_follow(current, first, start="N0"))
+            slow = f"{(time.perf_counter() - start) * 1e3:.0f}"
+        print(f"{n:11,} {incremental * 1e3:8.3f} {full_ms:8.1f} {slow:>10} {cells / len(edits):10.1f}")
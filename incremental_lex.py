@@ -0,0 +1,320 @@
+"""
+Incremental re-lexing for the Python lexer in "lexeme 2.py".
+
+IncrementalLexer keeps the token stream of a buffer and applies edits
+(offset, deleted length, inserted text).  Only the damaged region is scanned
+again: from the token just before the edit until a freshly scanned token
+starts where an old token started (shifted by the edit).  From that point on
+the text, and so every later token, is unchanged.  Strings that span lines
+are handled like any other token: an edit that opens or closes one simply
+keeps the scan going until the streams line up again.
+
+The buffer is a sequence of chunks.  A chunk holds at most CHUNK tokens and
+its own piece of the text, from its first token up to the next chunk's first
+token, and its token offsets are relative to that piece; nothing in a chunk
+depends on where it sits in the buffer.  The chunks are the nodes of a treap
+ordered by position, each node also keeping the characters, tokens and
+chunks of its subtree, so the chunk holding an offset is found in
+O(log chunks) and a run of chunks is replaced by split and merge.
+
+An edit therefore reads and rewrites only the chunks from the token before
+it to the point where the streams line up again: its cost is the damaged
+region plus at most two chunks, plus O(log chunks), whatever the size of the
+buffer.  (A quote left open until the end of the buffer damages everything
+after it, as it would for any lexer.)  text and stream() build the whole
+buffer, and so are O(file size); __len__() is O(1).
+"""
+
+import random
+from array import array
+from bisect import bisect_left
+
+from loader import load_script
+from token_stream import TokenStream, number
+
+CHUNK = 1024
+
+_lexeme2 = load_script("lexeme 2.py")
+SKIPPED = {"COMMENT", "NEWLINE", "SKIP"}
+_priority = random.Random(0).random
+
+
+def _code(mo):
+    """Kind code of a match, as lexer_compact() assigns it (None for skipped text)."""
+    kind = mo.lastgroup
+    if kind in SKIPPED:
+        return None
+    if kind == "ID":
+        return 0 if mo.group() in _lexeme2.python_keywords else 1
+    if kind == "MISMATCH":
+        raise RuntimeError(f"Unexpected char: {mo.group()}")
+    return _lexeme2.GROUP_CODES[kind]
+
+
+def _scan(text, pos):
+    """Yield (kind code, start, end) from pos, exactly as lexer_compact() would."""
+    for mo in _lexeme2.token_re.finditer(text, pos):
+        code = _code(mo)
+        if code is not None:
+            yield code, mo.start(), mo.end()
+
+
+# -----------------------------
+# Chunks in a treap
+# -----------------------------
+class _Chunk:
+    __slots__ = ("text", "kinds", "starts", "ends", "priority", "left", "right", "chars", "count", "nodes")
+
+    def __init__(self, text, kinds, starts, ends):
+        self.text, self.kinds, self.starts, self.ends = text, kinds, starts, ends
+        self.priority = _priority()
+        self.left = self.right = None
+        self.update()
+
+    def update(self):
+        """Recompute the subtree totals: characters, tokens and chunks."""
+        chars, count, nodes = len(self.text), len(self.kinds), 1
+        for child in (self.left, self.right):
+            if child is not None:
+                chars += child.chars
+                count += child.count
+                nodes += child.nodes
+        self.chars, self.count, self.nodes = chars, count, nodes
+
+
+def _merge(a, b):
+    """The treap of a's chunks followed by b's."""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    if a.priority > b.priority:
+        a.right = _merge(a.right, b)
+        a.update()
+        return a
+    b.left = _merge(a, b.left)
+    b.update()
+    return b
+
+
+def _split(node, k):
+    """(treap of the first k chunks, treap of the rest)."""
+    if node is None:
+        return None, None
+    left_nodes = node.left.nodes if node.left is not None else 0
+    if k <= left_nodes:
+        a, node.left = _split(node.left, k)
+        node.update()
+        return a, node
+    node.right, b = _split(node.right, k - left_nodes - 1)
+    node.update()
+    return node, b
+
+
+def _make_chunks(text, tokens):
+    """Chunks for text and its tokens (offsets into text); at least one chunk."""
+    chunks = []
+    for k in range(0, max(len(tokens), 1), CHUNK):
+        part = tokens[k:k + CHUNK]
+        lo = part[0][1] if k else 0
+        hi = tokens[k + CHUNK][1] if k + CHUNK < len(tokens) else len(text)
+        chunks.append(_Chunk(text[lo:hi],
+                             array("B", [t[0] for t in part]),
+                             array("I", [t[1] - lo for t in part]),
+                             array("I", [t[2] - lo for t in part])))
+    return chunks
+
+
+class IncrementalLexer:
+    def __init__(self, text):
+        self.root = None
+        for chunk in _make_chunks(text, list(_scan(text, 0))):
+            self.root = _merge(self.root, chunk)
+
+    # --- treap helpers ---------------------------------------------------
+    def _find(self, pos):
+        """(chunk, its index, its offset, tokens before it) of the chunk holding offset pos."""
+        node, index, start, before = self.root, 0, 0, 0
+        while True:
+            left = node.left
+            if left is not None:
+                if pos < start + left.chars:
+                    node = left
+                    continue
+                index, start, before = index + left.nodes, start + left.chars, before + left.count
+            if pos < start + len(node.text) or node.right is None:
+                return node, index, start, before
+            index, start, before = index + 1, start + len(node.text), before + len(node.kinds)
+            node = node.right
+
+    def _chunks(self, k=0):
+        """Yield the chunks from index k on, in order."""
+        stack, node = [], self.root
+        while node is not None:
+            left_nodes = node.left.nodes if node.left is not None else 0
+            if k < left_nodes:
+                stack.append(node)
+                node = node.left
+            elif k == left_nodes:
+                stack.append(node)
+                break
+            else:
+                k -= left_nodes + 1
+                node = node.right
+        while stack:
+            node = stack.pop()
+            yield node
+            node = node.right
+            while node is not None:
+                stack.append(node)
+                node = node.left
+
+    def _replace(self, lo, hi, chunks):
+        """Replace chunks lo .. hi - 1 with chunks."""
+        head, rest = _split(self.root, lo)
+        _, tail = _split(rest, hi - lo)
+        for chunk in chunks:
+            head = _merge(head, chunk)
+        self.root = _merge(head, tail)
+
+    # --- public API ------------------------------------------------------
+    def __len__(self):
+        return self.root.count
+
+    @property
+    def text(self):
+        return "".join(chunk.text for chunk in self._chunks())
+
+    def stream(self):
+        """The current tokens as a TokenStream over the current text."""
+        stream = TokenStream(self.text, _lexeme2.KINDS, {"NUM": number})
+        base = 0
+        for chunk in self._chunks():
+            stream.kinds.extend(chunk.kinds)
+            stream.starts.extend(s + base for s in chunk.starts)
+            stream.ends.extend(e + base for e in chunk.ends)
+            base += len(chunk.text)
+        return stream
+
+    def edit(self, offset, deleted, inserted):
+        """
+        Replace text[offset:offset + deleted] with inserted.
+
+        Returns (first, removed, added): tokens first .. first + removed - 1
+        of the old stream were replaced by `added` new tokens; every token
+        after them only moved by len(inserted) - deleted.
+        """
+        if not 0 <= offset <= offset + deleted <= self.root.chars:
+            raise IndexError("edit outside the text")
+        delta = len(inserted) - deleted
+
+        # The region to rescan starts at the chunk holding the token before
+        # the first one the edit can touch; offsets below are relative to it
+        chunk, lo, start, before = self._find(offset)
+        i = bisect_left(chunk.ends, offset - start)
+        while i == 0 and lo > 0:
+            lo -= 1
+            chunk = next(self._chunks(lo))
+            start -= len(chunk.text)
+            before -= len(chunk.kinds)
+            i = bisect_left(chunk.ends, offset - start)
+        head = i - 1 if i > 0 else 0        # old tokens kept ahead of the rescan
+        restart = chunk.starts[head] if i > 0 else 0
+        offset -= start
+        old_end, new_end = offset + deleted, offset + len(inserted)
+
+        # Old text and tokens of the region, one chunk at a time as the
+        # rescan needs them
+        chunks = self._chunks(lo)
+        pieces, old = [], []   # old: (kind, start, end), relative, old offsets
+        loaded = 0             # old characters loaded
+        hi = lo                # chunks lo .. hi - 1 are loaded
+
+        def load():
+            nonlocal loaded, hi
+            chunk = next(chunks, None)
+            if chunk is None:
+                return False
+            pieces.append(chunk.text)
+            old.extend((k, s + loaded, e + loaded) for k, s, e in zip(chunk.kinds, chunk.starts, chunk.ends))
+            loaded += len(chunk.text)
+            hi += 1
+            return True
+
+        load()
+        while loaded < old_end:
+            load()
+        joined = "".join(pieces)
+        window = joined[:offset] + inserted + joined[old_end:]
+
+        def more():
+            nonlocal window
+            tail = len(pieces)
+            if not load():
+                return False
+            window += "".join(pieces[tail:])
+            return True
+
+        match, pending = _lexeme2.token_re.match, _lexeme2.open_tokens
+        fresh = []
+        sync = None        # index in old of the first old token kept after the rescan
+        k = head           # old tokens before k start before the current fresh token
+        pos = restart
+        while True:
+            if pos == len(window) and not more():
+                break
+            mo = match(window, pos)
+            while (mo.end() == len(window) or mo.lastgroup in pending and pending[mo.lastgroup].match(window, pos)) \
+                    and more():
+                # the token runs into the end of the loaded region, or is still open
+                mo = match(window, pos)
+            code = _code(mo)
+            if code is not None:
+                if pos >= new_end:
+                    while k < len(old) and old[k][1] + delta < pos:
+                        k += 1
+                    if k < len(old) and old[k][1] + delta == pos:
+                        sync = k
+                        break
+                fresh.append((code, pos, mo.end()))
+            pos = mo.end()
+
+        # Drop leading tokens that came out unchanged
+        replaced = old[head:sync]
+        same = 0
+        while same < len(fresh) and same < len(replaced) and fresh[same] == replaced[same] \
+                and replaced[same][2] <= offset:
+            same += 1
+
+        tail = [(kind, s + delta, e + delta) for kind, s, e in old[sync:]] if sync is not None else []
+        self._replace(lo, hi, _make_chunks(window, old[:head] + fresh + tail))
+        return before + head + same, len(replaced) - same, len(fresh) - same
+
+
+if __name__ == "__main__":
+    import time
+
+    code = "def limited_square(x):\n    return 100 if x <= -10.0 or x >= 10.0 else x * x\n"
+    lexer = IncrementalLexer(code)
+    print(f"{len(lexer)} tokens")
+    for offset, deleted, inserted in [(19, 1, "value"), (0, 0, "s = '''\n'\n"), (0, 10, "")]:
+        first, removed, added = lexer.edit(offset, deleted, inserted)
+        tokens = list(lexer.stream())
+        print(f"\nedit({offset}, {deleted}, {inserted!r}): tokens {first}..{first + removed - 1} -> {added} new")
+        print("  ", tokens[first:first + added])
+
+    print(f"\n{'chars':>11} {'tokens':>10} {'edit µs':>8} {'relex ms':>9}")
+    line = "def f(x):\n    return x * 2 + 'ab' # c\n"
+    for n in (10 ** 3, 10 ** 4, 10 ** 5):
+        text = line * n
+        lexer = IncrementalLexer(text)
+        rng = random.Random(n)
+        start = time.perf_counter()
+        for _ in range(1000):
+            offset = rng.randrange(len(text))
+            lexer.edit(offset, 0, "y")
+        edit = (time.perf_counter() - start) / 1000
+        start = time.perf_counter()
+        _lexeme2.lexer_compact(text)
+        relex = time.perf_counter() - start
+        print(f"{len(text):11,} {len(lexer):10,} {edit * 1e6:8.0f} {relex * 1e3:9.1f}")
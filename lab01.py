@@ -1,29 +1,62 @@
 import re
 
-def lexical_analyzer(source_code):
-    token_specification = [
-        ('COMMENT',    r'//.*|/\*[\s\S]*?\*/'),
-        ('WHITESPACE', r'[ \t]+'),
-        ('NEWLINE',    r'\n'),
-        ('IDENTIFIER', r'[A-Za-z_][A-Za-z_0-9]*'),
-        ('CONSTANT',   r'\b\d+(\.\d+)?\b'),
-        ('OPERATOR',   r'==|!=|<=|>=|&&|\|\||[\+\-\*/%=<>!]'),
-        ('DELIMITER',  r'[;,{}()\[\]]'),
-        ('STRING',     r'"[^"\n]*"'),
-        ('CHAR',       r"'.'"),
-    ]
-    tok_regex = '|'.join('(?P<%s>%s)' % pair for pair in token_specification)
-    get_token = re.compile(tok_regex).finditer
+from loader import load_script
+
+token_specification = [
+    ('COMMENT',    r'//.*|/\*[\s\S]*?\*/'),
+    ('WHITESPACE', r'[ \t]+'),
+    ('NEWLINE',    r'\n'),
+    ('IDENTIFIER', r'[A-Za-z_][A-Za-z_0-9]*'),
+    ('CONSTANT',   r'\b\d+(\.\d+)?\b'),
+    ('OPERATOR',   r'==|!=|<=|>=|&&|\|\||[\+\-\*/%=<>!]'),
+    ('DELIMITER',  r'[;,{}()\[\]]'),
+    ('STRING',     r'"[^"\n]*"'),
+    ('CHAR',       r"'.'"),
+]
+tok_regex = '|'.join('(?P<%s>%s)' % pair for pair in token_specification)
+token_re = re.compile(tok_regex)
+# Tokens that may not be finished yet at the end of a buffer window, by the kind
+# token_re falls back to: "/" of a comment that was not closed, a string (up to
+# the end of its line) or char literal, a constant ending in its dot
+open_tokens = {
+    "OPERATOR": re.compile(r'/\*'),
+    "MISMATCH": re.compile(r'"[^"\n]*\Z|\'.?\Z'),
+    "CONSTANT": re.compile(r'\d+\.\Z'),
+}
+
+def tokens(source_code):
+    """Yield (kind, value) pairs, skipping whitespace and newlines."""
+    get_token = token_re.finditer
 
     for match in get_token(source_code):
         kind = match.lastgroup
         value = match.group()
         if kind == "WHITESPACE" or kind == "NEWLINE":
             continue
+        yield kind, value
+
+def lexical_analyzer(source_code):
+    for kind, value in tokens(source_code):
         print(f"{kind}: {value}")
 
+def match_token(text, pos):
+    # finditer() silently skips characters no rule matches; do the same
+    match = token_re.match(text, pos)
+    if match is None:
+        return "MISMATCH", pos + 1
+    return match.lastgroup, match.end()
+
+def lexical_analyzer_stream(source, buffer_size=1 << 16):
+    """Yield (kind, value) pairs from a str or text file, one buffer at a time."""
+    buffering = load_script("sentinel buffering.py")
+    for kind, value in buffering.stream_tokens(source, match_token, buffer_size, open_tokens):
+        if kind == "WHITESPACE" or kind == "NEWLINE" or kind == "MISMATCH":
+            continue
+        yield kind, value
+
 # Example usage
-source_code = '''
+if __name__ == "__main__":
+    source_code = '''
 int main() {
     // Comment
     int a = 10;
@@ -34,6 +67,6 @@ int main() {
     printf("Value: %d", a);
 }
 '''
-print("Lab01: Lexical Analyzer Output")
-lexical_analyzer(source_code)
-print()
+    print("Lab01: Lexical Analyzer Output")
+    lexical_analyzer(source_code)
+    print()
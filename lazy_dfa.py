@@ -0,0 +1,189 @@
+"""
+NFA simulation with bitset state sets and a lazily built DFA.
+
+BitsetNFA numbers the states of an NFA in the automata2.py shape
+({state: {symbol: [states]}}, 'ε' for epsilon moves) and works on sets of
+states as int bitmasks: bit i is state i.  Epsilon closures are precomputed,
+so a move is an OR of precomputed masks, one per state in the set.
+
+LazyDFA determinizes on demand, as RE2 does.  Each state set that is reached
+becomes a DFA state, and each transition out of it is computed the first time
+it is taken and then memoized, so a long input runs at one dict lookup per
+character once its states are warm.  Only the states the input actually
+visits are ever built, never the whole (possibly exponential) subset
+construction.  The cache is bounded: when it holds max_states states it is
+flushed and rebuilt from the current state set, trading speed for bounded
+memory on inputs that keep reaching new sets.
+"""
+
+import random
+import time
+
+from loader import load_script
+
+EPSILON = "ε"
+
+
+class BitsetNFA:
+    def __init__(self, nfa, start, accepting, classify=None):
+        """
+        nfa        {state: {symbol: [states]}}; EPSILON labels epsilon moves
+        start      start state
+        accepting  set of accepting states
+        classify   optional function mapping an input character to the
+                   symbol used on the edges (None: the character itself)
+        """
+        self.names = list(nfa)
+        index = {name: i for i, name in enumerate(self.names)}
+        n = len(self.names)
+
+        # closure[i]: mask of the states reachable from i by epsilon moves
+        self.closure = []
+        for i in range(n):
+            mask, stack = 1 << i, [self.names[i]]
+            while stack:
+                for t in nfa[stack.pop()].get(EPSILON, ()):
+                    if not mask >> index[t] & 1:
+                        mask |= 1 << index[t]
+                        stack.append(t)
+            self.closure.append(mask)
+
+        # delta[i][symbol]: closed mask of the states i moves to on symbol
+        self.delta = []
+        for name in self.names:
+            row = {}
+            for symbol, targets in nfa[name].items():
+                if symbol != EPSILON:
+                    mask = 0
+                    for t in targets:
+                        mask |= self.closure[index[t]]
+                    row[symbol] = mask
+            self.delta.append(row)
+
+        self.start = self.closure[index[start]]
+        self.accept_mask = sum(1 << index[name] for name in accepting)
+        self.classify = classify
+
+    @classmethod
+    def from_regex(cls, regex):
+        """NFA for a regex in the regex_dfa.py subset (Thompson construction)."""
+        regex_dfa = load_script("regex_dfa.py")
+        nfa, start, accepts, classmap, members = regex_dfa.thompson([("MATCH", regex)])
+        labels = [chr(symbols[0]) for symbols in members]
+        other = regex_dfa.OTHER
+
+        def classify(ch):
+            c = ord(ch)
+            return labels[classmap[c if c < other else other]]
+
+        return cls(nfa, start, set(accepts), classify)
+
+    def move(self, mask, ch):
+        """The closed set of states reached from mask on character ch."""
+        symbol = ch if self.classify is None else self.classify(ch)
+        delta = self.delta
+        result = 0
+        while mask:
+            low = mask & -mask
+            result |= delta[low.bit_length() - 1].get(symbol, 0)
+            mask ^= low
+        return result
+
+    def accepts(self, string):
+        """Plain bitset simulation, no caching."""
+        mask = self.start
+        for ch in string:
+            mask = self.move(mask, ch)
+            if not mask:
+                return False
+        return bool(mask & self.accept_mask)
+
+    def state_names(self, mask):
+        return {self.names[i] for i in range(len(self.names)) if mask >> i & 1}
+
+
+class LazyDFA:
+    def __init__(self, nfa, max_states=4096):
+        self.nfa = nfa
+        self.max_states = max_states
+        self.hits = self.misses = self.flushes = 0
+        self._flush()
+
+    def _flush(self):
+        self.ids = {}     # state set mask -> DFA state id
+        self.masks = []   # DFA state id -> state set mask
+        self.trans = []   # DFA state id -> {character: DFA state id}
+        self.accepting = []
+
+    def _state(self, mask):
+        id = self.ids.get(mask)
+        if id is None:
+            id = self.ids[mask] = len(self.masks)
+            self.masks.append(mask)
+            self.trans.append({})
+            self.accepting.append(bool(mask & self.nfa.accept_mask))
+        return id
+
+    def _miss(self, id, ch):
+        """Compute and memoize the transition of state id on ch; returns the next id."""
+        self.misses += 1
+        mask = self.nfa.move(self.masks[id], ch)
+        if mask not in self.ids and len(self.masks) >= self.max_states:
+            self.flushes += 1
+            self._flush()
+            return self._state(mask)
+        target = self._state(mask)
+        self.trans[id][ch] = target
+        return target
+
+    @property
+    def n_states(self):
+        return len(self.masks)
+
+    def accepts(self, string):
+        trans = self.trans
+        state = self._state(self.nfa.start)
+        misses = self.misses
+        for ch in string:
+            next_state = trans[state].get(ch)
+            if next_state is None:
+                next_state = self._miss(state, ch)
+                trans = self.trans   # the cache may have been flushed
+            state = next_state
+        self.hits += len(string) - (self.misses - misses)
+        return self.accepting[state]
+
+
+# -----------------------------
+# Comparison with automata2.nfa_accept
+# -----------------------------
+def benchmark(regex, n_chars, alphabet="ab", seed=0, max_states=4096):
+    """(seconds, states built, flushes) of LazyDFA.accepts on one long random input."""
+    text = "".join(random.Random(seed).choices(alphabet, k=n_chars))
+    lazy = LazyDFA(BitsetNFA.from_regex(regex), max_states)
+    start = time.perf_counter()
+    lazy.accepts(text)
+    return time.perf_counter() - start, lazy.n_states, lazy.flushes
+
+
+if __name__ == "__main__":
+    automata2 = load_script("automata2.py")
+    nfa = BitsetNFA(automata2.nfa, automata2.start_state, automata2.accept_states)
+    lazy = LazyDFA(nfa)
+    for s in ["a", "ba", "aba", "bba", "abba", "", "b", "bb", "abb", "bab"]:
+        print(f"{s!r:8} -> {lazy.accepts(s)}  (nfa_accept: {automata2.nfa_accept(s)})")
+    print(f"{lazy.n_states} DFA states built")
+
+    text = "".join(random.Random(0).choices("ab", k=200_000))
+    start = time.perf_counter()
+    automata2.nfa_accept(text)
+    reference = time.perf_counter() - start
+    start = time.perf_counter()
+    lazy.accepts(text)
+    print(f"\n200,000 chars: nfa_accept {reference:.3f}s, LazyDFA {time.perf_counter() - start:.3f}s")
+
+    # (a|b)*a(a|b){k}: the full DFA has 2^(k+1) states
+    print(f"\n{'k':>3} {'seconds':>8} {'states':>7} {'flushes':>8}")
+    for k in (4, 10, 14):
+        seconds, states, flushes = benchmark("(a|b)*a" + "(a|b)" * k, 200_000)
+        print(f"{k:3} {seconds:8.3f} {states:7} {flushes:8}")
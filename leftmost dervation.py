@@ -33,17 +33,18 @@ def leftmost_derivation(symbols, target, derivation):
             return None  # No production worked
     return None  # No non-terminal left and target not matched
 
-# Example input string
-target_string = "aa+a*"
+if __name__ == "__main__":
+    # Example input string
+    target_string = "aa+a*"
 
-# Generate derivation
-derivation_steps = leftmost_derivation(["S"], target_string, [])
+    # Generate derivation
+    derivation_steps = leftmost_derivation(["S"], target_string, [])
 
-# Print the derivation
-if derivation_steps:
-    print(f"Grammar S -> SS+ | SS* | a")
-    print(f"Leftmost derivation for '{target_string}':")
-    for i, step in enumerate(derivation_steps):
-        print(f"Step {i}: {step}")
-else:
-    print(f"No derivation found for the string '{target_string}'.")
+    # Print the derivation
+    if derivation_steps:
+        print(f"Grammar S -> SS+ | SS* | a")
+        print(f"Leftmost derivation for '{target_string}':")
+        for i, step in enumerate(derivation_steps):
+            print(f"Step {i}: {step}")
+    else:
+        print(f"No derivation found for the string '{target_string}'.")
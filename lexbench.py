@@ -0,0 +1,266 @@
+"""
+Throughput benchmark for the lexers, on deterministic synthetic corpora.
+
+Each corpus is generated from a seed, a size in bytes and a token mix, so two
+runs with the same arguments lex exactly the same text:
+
+    c        C-like source for lab01.py
+    minic    the float/return language of lexeme.py
+    python   Python-like source for lexeme 2.py
+    ifthen   the if/then/else language of Lex program.py
+    relop    relational operators for relop.py
+
+Every lexer runs in a fresh child process so its peak RSS is its own.  The
+report gives MB/s, tokens/s, peak RSS, traced peak bytes per token and the
+allocated blocks still alive per token (tracemalloc), and --json writes the
+results so a later run can be compared with --compare.
+
+Usage:
+    python lexbench.py [--size BYTES] [--seed N] [--mix kind=weight,...]
+                       [--only NAME,...] [--json OUT] [--compare OLD]
+"""
+
+import argparse
+import json
+import random
+import resource
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+from loader import load_script
+
+# -----------------------------
+# Corpus generators
+# -----------------------------
+IDENT_CHARS = "abcdefghijklmnopqrstuvwxyz"
+
+
+def _ident(rng):
+    return rng.choice(IDENT_CHARS) + "".join(rng.choice(IDENT_CHARS + "_0123456789") for _ in range(rng.randint(0, 7)))
+
+
+def _number(rng, exponent=False):
+    text = str(rng.randint(0, 99999))
+    if rng.random() < 0.3:
+        text += "." + str(rng.randint(0, 999))
+    if exponent and rng.random() < 0.2:
+        text += "E" + rng.choice(["", "+", "-"]) + str(rng.randint(1, 30))
+    return text
+
+
+def _quoted(rng):
+    quote = rng.choice(["'", '"'])
+    return quote + _ident(rng) + " " + _ident(rng) + quote
+
+
+def _alpha_ident(rng):
+    return rng.choice("ABCxyzpq") + "".join(rng.choice("abcXYZ019") for _ in range(rng.randint(0, 5)))
+
+
+CORPORA = {
+    "c": {
+        "ident":   (10, _ident),
+        "keyword": (3, lambda rng: rng.choice(["int", "float", "if", "else", "return", "while"])),
+        "number":  (4, _number),
+        "op":      (6, lambda rng: rng.choice(["==", "!=", "<=", ">=", "&&", "||", "+", "-", "*", "/", "%", "=", "<", ">", "!"])),
+        "delim":   (6, lambda rng: rng.choice(list(";,{}()[]"))),
+        "string":  (1, lambda rng: '"' + _ident(rng) + ' ' + _ident(rng) + '"'),
+        "char":    (1, lambda rng: "'" + rng.choice(IDENT_CHARS) + "'"),
+        "comment": (1, lambda rng: rng.choice(["// " + _ident(rng) + "\n", "/* " + _ident(rng) + "\n " + _ident(rng) + " */"])),
+        "newline": (2, lambda rng: "\n"),
+    },
+    "minic": {
+        "ident":   (10, _ident),
+        "keyword": (2, lambda rng: rng.choice(["float", "return"])),
+        "number":  (4, lambda rng: rng.choice(["", "-"]) + _number(rng)),
+        "op":      (5, lambda rng: rng.choice(["<=", ">=", "||", "*", "?", ":"])),
+        "delim":   (6, lambda rng: rng.choice(list("(){};,"))),
+        "comment": (1, lambda rng: "/* " + _ident(rng) + " */"),
+        "newline": (2, lambda rng: "\n"),
+    },
+    "python": {
+        "ident":   (10, _ident),
+        "keyword": (4, lambda rng: rng.choice(["def", "return", "if", "else", "for", "in", "while", "and", "or", "not"])),
+        "number":  (4, _number),
+        "string":  (2, _quoted),
+        "op":      (6, lambda rng: rng.choice(["==", "!=", "<=", ">=", "->", ":=", "+", "-", "*", "/", "%", "=", "<", ">", "**", "//"])),
+        "delim":   (6, lambda rng: rng.choice(list("(){}[],.:;"))),
+        "comment": (1, lambda rng: "# " + _ident(rng) + "\n"),
+        "newline": (3, lambda rng: "\n" + " " * rng.choice([0, 4, 8])),
+    },
+    "ifthen": {
+        "keyword": (3, lambda rng: rng.choice(["if", "then", "else"])),
+        "ident":   (8, _alpha_ident),
+        "number":  (4, lambda rng: _number(rng, exponent=True)),
+        "relop":   (5, lambda rng: rng.choice(["<", "<=", "=", "<>", ">", ">="])),
+        "newline": (1, lambda rng: "\n"),
+    },
+    "relop": {
+        "relop":   (10, lambda rng: rng.choice(["<", "<=", "=", "<>", ">", ">="])),
+        "newline": (1, lambda rng: "\n"),
+    },
+}
+
+
+def generate(language, size, seed=0, mix=None):
+    """Deterministic corpus of about `size` characters in one of CORPORA."""
+    makers = CORPORA[language]
+    weights = dict((kind, weight) for kind, (weight, _) in makers.items())
+    weights.update({kind: w for kind, w in (mix or {}).items() if kind in makers})
+    kinds = [k for k in makers if weights[k] > 0]
+    rng = random.Random(seed)
+    parts, total = [], 0
+    while total < size:
+        kind = rng.choices(kinds, [weights[k] for k in kinds])[0]
+        text = makers[kind][1](rng)
+        parts.append(text)
+        parts.append(" ")
+        total += len(text) + 1
+    return "".join(parts)
+
+
+# -----------------------------
+# Lexers under test (each returns its token container)
+# -----------------------------
+def _lex_program(text):
+    return load_script("Lex program.py").lexer(text)
+
+
+_scanner = None
+
+
+def _lex_program_dfa(text):
+    global _scanner
+    if _scanner is None:
+        regex_dfa = load_script("regex_dfa.py")
+        tokens = load_script("Lex program.py").TOKENS
+        _scanner = regex_dfa.compile_rules(regex_dfa.rules_from_tokens(tokens))
+    return [token for token in _scanner.scan(text) if token[0] != "WS"]
+
+
+def _lab01(text):
+    return list(load_script("lab01.py").tokens(text))
+
+
+def _lexeme(text):
+    return load_script("lexeme.py").lexer(text)
+
+
+def _lexeme2(text):
+    return load_script("lexeme 2.py").lexer(text)
+
+
+def _lexeme2_compact(text):
+    return load_script("lexeme 2.py").lexer_compact(text)
+
+
+def _relop(text):
+    scan = load_script("relop.py").RELOP_DFA.scan
+    tokens, pos, n = [], 0, len(text)
+    while pos < n:
+        if text[pos] in " \n":
+            pos += 1
+            continue
+        name, end = scan(text, pos)
+        if name is None:
+            raise ValueError(f"Unexpected character at position {pos}: '{text[pos]}'")
+        tokens.append((name, end))
+        pos = end
+    return tokens
+
+
+LEXERS = {
+    "Lex program":      ("ifthen", _lex_program),
+    "Lex program DFA":  ("ifthen", _lex_program_dfa),
+    "lab01":            ("c", _lab01),
+    "lexeme":           ("minic", _lexeme),
+    "lexeme 2":         ("python", _lexeme2),
+    "lexeme 2 compact": ("python", _lexeme2_compact),
+    "relop":            ("relop", _relop),
+}
+
+
+def measure(name, size, seed, mix, repeat):
+    """Run one lexer in this process; returns its result row."""
+    language, fn = LEXERS[name]
+    text = generate(language, size, seed, mix)
+    fn(generate(language, 1000, seed, mix))   # load modules and warm caches outside the timing
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        tokens = len(fn(text))
+        best = min(best, time.perf_counter() - start)
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result_tokens = fn(text)
+    after = tracemalloc.take_snapshot()
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+    del result_tokens
+
+    size_mb = len(text.encode("utf-8")) / 1e6
+    return {
+        "lexer": name,
+        "corpus": language,
+        "bytes": len(text.encode("utf-8")),
+        "tokens": tokens,
+        "seconds": best,
+        "mb_per_s": size_mb / best,
+        "tokens_per_s": tokens / best,
+        "peak_rss_mb": peak_rss,
+        "peak_bytes_per_token": peak_bytes / max(tokens, 1),
+        "blocks_per_token": blocks / max(tokens, 1),
+    }
+
+
+def run(names, size, seed=0, mix=None, repeat=3):
+    """Measure each lexer in its own child process."""
+    rows = []
+    for name in names:
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            rows.append(pool.submit(measure, name, size, seed, mix, repeat).result())
+    return rows
+
+
+def report(rows, previous=None):
+    old = {row["lexer"]: row for row in previous or []}
+    print(f"{'lexer':18} {'MB/s':>7} {'tokens/s':>11} {'RSS MB':>7} {'B/token':>8} {'blocks/tok':>10}  change")
+    for row in rows:
+        change = ""
+        if row["lexer"] in old:
+            change = f"{row['tokens_per_s'] / old[row['lexer']]['tokens_per_s'] - 1:+.1%}"
+        print(f"{row['lexer']:18} {row['mb_per_s']:7.2f} {row['tokens_per_s']:11,.0f} {row['peak_rss_mb']:7.1f} "
+              f"{row['peak_bytes_per_token']:8.1f} {row['blocks_per_token']:10.2f}  {change}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the lexers on synthetic corpora.")
+    parser.add_argument("--size", type=int, default=1_000_000, help="corpus size in characters")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mix", default="", help="token weights, e.g. ident=5,comment=0")
+    parser.add_argument("--only", default="", help="comma-separated lexer names")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="earlier --json output to compare against")
+    args = parser.parse_args(argv)
+
+    mix = {k: float(v) for k, v in (item.split("=") for item in args.mix.split(",") if item)}
+    names = [n.strip() for n in args.only.split(",") if n.strip()] or list(LEXERS)
+    rows = run(names, args.size, args.seed, mix, args.repeat)
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)["results"]
+    report(rows, previous)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"size": args.size, "seed": args.seed, "mix": mix, "results": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
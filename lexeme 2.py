@@ -1,5 +1,10 @@
 import re
 import keyword
+from array import array
+
+from loader import load_script
+from symbols import NO_SYMBOL, PerfectHash, SymbolTable
+from token_stream import TokenStream, number
 
 # Get all Python keywords
 python_keywords = set(keyword.kwlist)
@@ -7,11 +12,11 @@ python_keywords = set(keyword.kwlist)
 # Define token categories and regex patterns for Python
 token_spec = [
     ("NUMBER",   r"-?\d+(\.\d+)?"),                # int or float
-    ("STRING",   r"(['\"]).*?\1"),                 # string literals ('...' or "...")
+    ("STRING",   r"(?P<q>['\"]).*?(?P=q)"),       # string literals ('...' or "...")
     ("ID",       r"[A-Za-z_]\w*"),                 # identifiers
     ("OP",       r"==|!=|<=|>=|->|:=|\+|-|\*|/|%|=|<|>|\*\*|//"),  # operators
     ("DELIM",    r"[\(\){}\[\],.:;]"),             # delimiters
-    ("COMMENT",  r"#.*"),                          # single-line comments
+    ("COMMENT",  r"#[^\n]*"),                      # single-line comments
     ("NEWLINE",  r"\n"),                           # newlines
     ("SKIP",     r"[ \t]+"),                       # whitespace
     ("MISMATCH", r"."),                            # any other character
@@ -19,45 +24,111 @@ token_spec = [
 
 # Compile regex
 token_re = re.compile("|".join(f"(?P<{name}>{pattern})" for name, pattern in token_spec), re.DOTALL)
+# Tokens that may not be finished at the end of a buffer window, by the kind
+# token_re falls back to: a string that was not closed (STRING spans lines, so
+# only max_token bounds it), a number ending in its dot
+open_tokens = {"MISMATCH": re.compile(r"['\"]"), "NUMBER": re.compile(r"-?\d+\.\Z")}
+
+def classify(kind, value):
+    """Turn one regex match into a token, or None for text that is skipped."""
+    if kind == "ID":
+        if value in python_keywords:
+            return ("KEYWORD", value)
+        else:
+            return ("IDENTIFIER", value)
+    elif kind == "NUMBER":
+        return ("NUM", float(value) if "." in value else int(value))
+    elif kind == "STRING":
+        return ("STRING", value)
+    elif kind == "OP":
+        return ("OPERATOR", value)
+    elif kind == "DELIM":
+        return ("DELIMITER", value)
+    elif kind == "COMMENT":
+        return None   # ignore comments
+    elif kind == "NEWLINE":
+        return None   # ignore newlines (optional)
+    elif kind == "SKIP":
+        return None   # ignore spaces/tabs
+    elif kind == "MISMATCH":
+        raise RuntimeError(f"Unexpected char: {value}")
 
 def lexer(code):
     tokens = []
+    for mo in token_re.finditer(code):
+        token = classify(mo.lastgroup, mo.group())
+        if token is not None:
+            tokens.append(token)
+    return tokens
+
+# Token kinds of the compact stream, and the code each regex group maps to
+KINDS = ["KEYWORD", "IDENTIFIER", "NUM", "STRING", "OPERATOR", "DELIMITER"]
+GROUP_CODES = {"NUMBER": 2, "STRING": 3, "OP": 4, "DELIM": 5}
+
+# Perfect hash of the keywords: find() gives a keyword's index in
+# keyword_hash.words, which is also its reserved id in symbol_table()
+keyword_hash = PerfectHash(python_keywords)
+
+def symbol_table():
+    """A SymbolTable whose reserved ids are exactly the keywords."""
+    return SymbolTable(reserved=keyword_hash.words)
+
+def lexer_compact(code, symbols=None):
+    """
+    Same tokens as lexer(), stored as a TokenStream of kind codes and offsets.
+
+    Keywords are classified by keyword_hash on the span of the source, so
+    a keyword's text is never cut out.  With a table from symbol_table(),
+    every name's id is kept in stream.symbols: a keyword's id is its hash
+    index, and only identifiers go through the interning lookup.
+    """
+    stream = TokenStream(code, KINDS, {"NUM": number})
+    append = stream.append
+    find = keyword_hash.find
+    if symbols is not None:
+        if [s.name for s in symbols.symbols[:symbols.n_reserved]] != keyword_hash.words:
+            raise ValueError("lexer_compact() needs a table from symbol_table()")
+        ids = stream.symbols = array("I")
+        intern = symbols.intern
     for mo in token_re.finditer(code):
         kind = mo.lastgroup
-        value = mo.group()
         if kind == "ID":
-            if value in python_keywords:
-                tokens.append(("KEYWORD", value))
-            else:
-                tokens.append(("IDENTIFIER", value))
-        elif kind == "NUMBER":
-            tokens.append(("NUM", float(value) if "." in value else int(value)))
-        elif kind == "STRING":
-            tokens.append(("STRING", value))
-        elif kind == "OP":
-            tokens.append(("OPERATOR", value))
-        elif kind == "DELIM":
-            tokens.append(("DELIMITER", value))
-        elif kind == "COMMENT":
-            continue   # ignore comments
-        elif kind == "NEWLINE":
-            continue   # ignore newlines (optional)
-        elif kind == "SKIP":
-            continue   # ignore spaces/tabs
+            start, end = mo.span()
+            k = find(code, start, end)
+            append(0 if k >= 0 else 1, start, end)
+            if symbols is not None:
+                ids.append(k if k >= 0 else intern(mo.group()))
+        elif kind in GROUP_CODES:
+            append(GROUP_CODES[kind], mo.start(), mo.end())
+            if symbols is not None:
+                ids.append(NO_SYMBOL)
         elif kind == "MISMATCH":
-            raise RuntimeError(f"Unexpected char: {value}")
-    return tokens
+            raise RuntimeError(f"Unexpected char: {mo.group()}")
+    return stream
+
+def match_token(text, pos):
+    mo = token_re.match(text, pos)
+    return mo.lastgroup, mo.end()
+
+def lexer_stream(source, buffer_size=1 << 16):
+    """Yield the tokens of a str or text file lazily, one buffer at a time."""
+    buffering = load_script("sentinel buffering.py")
+    for kind, value in buffering.stream_tokens(source, match_token, buffer_size, open_tokens):
+        token = classify(kind, value)
+        if token is not None:
+            yield token
 
 
 # ----------------------------
 # Example: Python input program
 # ----------------------------
-code = """
+if __name__ == "__main__":
+    code = """
 def limited_square(x):
     
     return 100 if x <= -10.0 or x >= 10.0 else x * x
 """
 
-tokens = lexer(code)
-for t in tokens:
-    print(t)
+    tokens = lexer(code)
+    for t in tokens:
+        print(t)
@@ -1,4 +1,9 @@
 import re
+from array import array
+
+from loader import load_script
+from symbols import NO_SYMBOL, PerfectHash, SymbolTable
+from token_stream import TokenStream, number
 
 # Define token categories
 keywords = {"float", "return"}
@@ -17,39 +22,104 @@ token_spec = [
 ]
 
 token_re = re.compile("|".join(f"(?P<{name}>{pattern})" for name, pattern in token_spec), re.DOTALL)
+# Tokens that may not be finished at the end of a buffer window, by the kind
+# token_re falls back to: a comment that was not closed, a number ending in its dot
+open_tokens = {"MISMATCH": re.compile(r"/\*"), "NUMBER": re.compile(r"-?\d+\.\Z")}
+
+def classify(kind, value):
+    """Turn one regex match into a token, or None for text that is skipped."""
+    if kind == "ID":
+        if value in keywords:
+            return ("KEYWORD", value)
+        else:
+            return ("IDENTIFIER", value)
+    elif kind == "NUMBER":
+        return ("NUM", float(value) if "." in value else int(value))
+    elif kind == "OP":
+        return ("OPERATOR", value)
+    elif kind == "DELIM":
+        return ("DELIMITER", value)
+    elif kind == "COMMENT":
+        return None
+    elif kind == "SKIP":
+        return None
+    elif kind == "MISMATCH":
+        raise RuntimeError(f"Unexpected char: {value}")
 
 def lexer(code):
     tokens = []
+    for mo in token_re.finditer(code):
+        token = classify(mo.lastgroup, mo.group())
+        if token is not None:
+            tokens.append(token)
+    return tokens
+
+# Token kinds of the compact stream, and the code each regex group maps to
+KINDS = ["KEYWORD", "IDENTIFIER", "NUM", "OPERATOR", "DELIMITER"]
+GROUP_CODES = {"NUMBER": 2, "OP": 3, "DELIM": 4}
+
+# Perfect hash of the keywords: find() gives a keyword's index in
+# keyword_hash.words, which is also its reserved id in symbol_table()
+keyword_hash = PerfectHash(keywords)
+
+def symbol_table():
+    """A SymbolTable whose reserved ids are exactly the keywords."""
+    return SymbolTable(reserved=keyword_hash.words)
+
+def lexer_compact(code, symbols=None):
+    """
+    Same tokens as lexer(), stored as a TokenStream of kind codes and offsets.
+
+    Keywords are classified by keyword_hash on the span of the source, so
+    a keyword's text is never cut out.  With a table from symbol_table(),
+    every name's id is kept in stream.symbols: a keyword's id is its hash
+    index, and only identifiers go through the interning lookup.
+    """
+    stream = TokenStream(code, KINDS, {"NUM": number})
+    append = stream.append
+    find = keyword_hash.find
+    if symbols is not None:
+        if [s.name for s in symbols.symbols[:symbols.n_reserved]] != keyword_hash.words:
+            raise ValueError("lexer_compact() needs a table from symbol_table()")
+        ids = stream.symbols = array("I")
+        intern = symbols.intern
     for mo in token_re.finditer(code):
         kind = mo.lastgroup
-        value = mo.group()
         if kind == "ID":
-            if value in keywords:
-                tokens.append(("KEYWORD", value))
-            else:
-                tokens.append(("IDENTIFIER", value))
-        elif kind == "NUMBER":
-            tokens.append(("NUM", float(value) if "." in value else int(value)))
-        elif kind == "OP":
-            tokens.append(("OPERATOR", value))
-        elif kind == "DELIM":
-            tokens.append(("DELIMITER", value))
-        elif kind == "COMMENT":
-            continue
-        elif kind == "SKIP":
-            continue
+            start, end = mo.span()
+            k = find(code, start, end)
+            append(0 if k >= 0 else 1, start, end)
+            if symbols is not None:
+                ids.append(k if k >= 0 else intern(mo.group()))
+        elif kind in GROUP_CODES:
+            append(GROUP_CODES[kind], mo.start(), mo.end())
+            if symbols is not None:
+                ids.append(NO_SYMBOL)
         elif kind == "MISMATCH":
-            raise RuntimeError(f"Unexpected char: {value}")
-    return tokens
+            raise RuntimeError(f"Unexpected char: {mo.group()}")
+    return stream
+
+def match_token(text, pos):
+    mo = token_re.match(text, pos)
+    return mo.lastgroup, mo.end()
+
+def lexer_stream(source, buffer_size=1 << 16):
+    """Yield the tokens of a str or text file lazily, one buffer at a time."""
+    buffering = load_script("sentinel buffering.py")
+    for kind, value in buffering.stream_tokens(source, match_token, buffer_size, open_tokens):
+        token = classify(kind, value)
+        if token is not None:
+            yield token
 
 
-# Test input (the C++ program)
-code = """float limitedSquare(x) float x; {
+if __name__ == "__main__":
+    # Test input (the C++ program)
+    code = """float limitedSquare(x) float x; {
  /* returns x-squared, but never more than 100 */
  return (x<=-10.0||x>=10.0)?100:x*x;
  }"""
-print ("input ----\nfloat limitedSquare(x) float x; {\n        /* returns x-squared, but never more than 100 */\n          return (x<=-10.0||x>=10.0)?100:x*x;")
-print ("\noutput:")
-tokens = lexer(code)
-for t in tokens:
-    print(t)
+    print ("input ----\nfloat limitedSquare(x) float x; {\n        /* returns x-squared, but never more than 100 */\n          return (x<=-10.0||x>=10.0)?100:x*x;")
+    print ("\noutput:")
+    tokens = lexer(code)
+    for t in tokens:
+        print(t)
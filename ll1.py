@@ -0,0 +1,157 @@
+"""
+LL(1) tables as flat integer arrays, with every conflict reported.
+
+new.py's build_parsing_table() writes table[A][b] = prod and lets a later
+production overwrite an earlier one, so a grammar that is not LL(1) still
+yields a table.  LL1Table keeps every production that lands in a cell and
+reports each cell holding more than one, with how each got there:
+
+    FIRST/FIRST    two productions of A can both start with b
+    FIRST/FOLLOW   a nullable production of A is chosen on FOLLOW(A) and
+                   another production starts with b (or is nullable too)
+
+The parse table itself is dense:
+
+    table[A * n_terminals + b]   production number, or ERROR
+    lhs[p]                       nonterminal index of production p
+    rhs[rhs_start[p]:rhs_start[p + 1]]
+                                 body of p, reversed (the order it is pushed)
+
+Symbols in rhs and on the parse stack are ints: a terminal is its terminal
+index, a nonterminal A is n_terminals + A.  Terminal 0 is END, as in
+grammar.py.  A conflicting cell gets the first production that reached it
+through FIRST (so a nullable alternative loses, as in the usual dangling-else
+resolution), or else the lowest numbered one.
+
+parse() runs on terminal indices and touches nothing but these arrays until
+it reports an error.
+"""
+
+import random
+import time
+from array import array
+
+from loader import load_script
+
+_grammar = load_script("grammar.py")
+
+ERROR = -1
+
+
+class LL1Table:
+    def __init__(self, grammar, cells=None):
+        """cells: grammar.ll1_table() if already at hand (e.g. from the bnf.py cache)."""
+        g = self.grammar = grammar.analyze()
+        cells = g.ll1_table() if cells is None else cells
+        self.n_terminals = n_t = len(g.terminals)
+        self.n_nonterminals = len(g.nonterminals)
+        self.start = n_t + g.index[g.start]
+
+        self.lhs = array("i", (g.index[h] for h in g.heads))
+        self.rhs, self.rhs_start = array("i"), array("i", [0])
+        for body in g.bodies:
+            self.rhs.extend(g.index[s] if g.is_terminal[s] else n_t + g.index[s] for s in reversed(body))
+            self.rhs_start.append(len(self.rhs))
+
+        self.table = array("i", [ERROR]) * (self.n_nonterminals * n_t)
+        self.conflicts = []   # (kind, nonterminal, terminal, [(production, "FIRST" | "FOLLOW")])
+        for (a, t), productions in sorted(cells.items()):
+            if len(productions) == 1:
+                self.table[a * n_t + t] = productions[0]
+                continue
+            reasons = [(p, "FIRST" if g.first_of(g.bodies[p])[0] >> t & 1 else "FOLLOW") for p in productions]
+            via_first = [p for p, why in reasons if why == "FIRST"]
+            kind = "FIRST/FIRST" if len(via_first) == len(reasons) else "FIRST/FOLLOW"
+            self.conflicts.append((kind, g.names[g.nonterminals[a]], g.names[g.terminals[t]], reasons))
+            self.table[a * n_t + t] = via_first[0] if via_first else min(productions)
+
+    @property
+    def is_ll1(self):
+        return not self.conflicts
+
+    def report(self):
+        """One line per conflicting cell."""
+        g = self.grammar
+        return [f"{kind} conflict at M[{a}, {t}]: " + "; ".join(f"{g.production_str(p)} (by {why})" for p, why in reasons)
+                for kind, a, t, reasons in self.conflicts]
+
+    def encode(self, names):
+        """Terminal indices for a list of token names, END appended."""
+        g = self.grammar
+        codes = []
+        for name in names:
+            s = g.ids.get(name)
+            if s is None or not g.is_terminal[s]:
+                raise SyntaxError(f"Unknown token {name!r}")
+            codes.append(g.index[s])
+        codes.append(0)
+        return codes
+
+    def parse(self, tokens):
+        """
+        Production numbers of the leftmost derivation of tokens (terminal
+        indices ending with END); SyntaxError on failure.
+        """
+        table, rhs, rhs_start, n_t = self.table, self.rhs, self.rhs_start, self.n_terminals
+        stack = [0, self.start]
+        derivation = []
+        i, tok = 0, tokens[0]
+        while stack:
+            top = stack.pop()
+            if top < n_t:
+                if top != tok:
+                    self._error(i, tok, [top])
+                if top == 0:
+                    return derivation
+                i += 1
+                tok = tokens[i]
+                continue
+            p = table[(top - n_t) * n_t + tok]
+            if p < 0:
+                self._error(i, tok, [t for t in range(n_t) if table[(top - n_t) * n_t + t] >= 0])
+            derivation.append(p)
+            stack.extend(rhs[rhs_start[p]:rhs_start[p + 1]])
+        return derivation
+
+    def _error(self, i, tok, expected):
+        names = self.grammar.names
+        terminals = self.grammar.terminals
+        raise SyntaxError(f"Unexpected {names[terminals[tok]]!r} at token {i}, "
+                          f"expected one of {[names[terminals[t]] for t in expected]}")
+
+
+if __name__ == "__main__":
+    new = load_script("new.py")
+    expr = LL1Table(_grammar.Grammar.from_dict(new.GRAMMAR))
+    print("new.py GRAMMAR: LL(1)" if expr.is_ll1 else "\n".join(expr.report()))
+
+    for title, text in [("dangling else", """
+            S ::= 'if' E 'then' S S_else | 'other'
+            S_else ::= 'else' S | ε
+            E ::= 'b'"""), ("left recursive", "E ::= E '+' T | T\nT ::= 'id' | '(' E ')'")]:
+        table = LL1Table(load_script("bnf.py").parse_bnf(text))
+        print(f"\n{title}:")
+        for line in table.report():
+            print("  " + line)
+
+    for tokens in (["id", "+", "id", "*", "id"], ["id", "*", "+", "id"]):
+        try:
+            print(tokens, "->", [expr.grammar.production_str(p) for p in expr.parse(expr.encode(tokens))])
+        except SyntaxError as e:
+            print(tokens, "->", e)
+
+    # Throughput against new.py's dict-of-dicts table
+    rng = random.Random(0)
+    names = ["id"]
+    while len(names) < 200_000:
+        names += [rng.choice("+*"), "id"] if rng.random() < 0.8 else ["+", "(", "id", "*", "id", ")"]
+    dict_table = new.build_parsing_table(new.GRAMMAR, new.compute_first(new.GRAMMAR),
+                                         new.compute_follow(new.GRAMMAR, new.compute_first(new.GRAMMAR)))
+    start = time.perf_counter()
+    new.predictive_parse_build_tree(names + ["$"], dict_table)
+    dict_time = time.perf_counter() - start
+    codes = expr.encode(names)
+    start = time.perf_counter()
+    expr.parse(codes)
+    dense_time = time.perf_counter() - start
+    print(f"\n{len(names):,} tokens: new.py {dict_time:.3f} s, dense table {dense_time:.3f} s")
@@ -0,0 +1,24 @@
+"""
+Import a sibling script by its file name.
+
+Several scripts in this folder have spaces in their names ("Lex program.py",
+"sentinel buffering.py", ...), so a plain import statement cannot reach them.
+"""
+
+import importlib.util
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_script(filename):
+    """Load (once) and return the module defined by filename."""
+    name = os.path.splitext(filename)[0].replace(" ", "_").replace("-", "_")
+    module = sys.modules.get(name)
+    if module is None:
+        spec = importlib.util.spec_from_file_location(name, os.path.join(HERE, filename))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,156 @@
+"""
+SLR(1) tables for a grammar.Grammar, in the shape of LR parsing.py.
+
+The grammar is augmented with S' -> S (production 0, so the grammar's own
+productions are numbered from 1 as in LR parsing.py; S' gets more primes
+while the grammar already has that name, as E' in expr_ll.bnf).  States
+are sets of LR(0) items (production, dot); the closure of a kernel adds the
+productions of every nonterminal that can appear first after a dot, a set
+precomputed per nonterminal.  Reductions are placed under FOLLOW(head).
+
+    action[state]  {terminal name: ("S", state) | ("R", production) | ("ACC",)}
+    goto[state]    {nonterminal name: state}
+
+Cells with more than one possible action are listed in `conflicts`
+({(state, terminal): [actions]}) and resolved in favour of the shift, then
+the earliest production (as yacc does), so the tables stay usable.
+"""
+
+import os
+
+from loader import HERE, load_script
+
+_grammar = load_script("grammar.py")
+
+
+class SLRTables:
+    def __init__(self, grammar):
+        start = grammar.names[grammar.start]
+        augmented = start + "'"
+        while augmented in grammar.ids:   # E' may already be a nonterminal of the grammar
+            augmented += "'"
+        g = self.grammar = _grammar.Grammar(
+            [(augmented, [start])]
+            + [(grammar.names[h], [grammar.names[s] for s in body]) for h, body in zip(grammar.heads, grammar.bodies)],
+            start=augmented).analyze()
+        self.productions = [(g.names[h], [g.names[s] for s in body]) for h, body in zip(g.heads, g.bodies)]
+
+        # entered[A]: items (q, 0) the closure gains from an item with A after the dot
+        entered = []
+        for a in range(len(g.nonterminals)):
+            seen, stack = {a}, [a]
+            while stack:
+                for p in g.by_head[stack.pop()]:
+                    body = g.bodies[p]
+                    if body and not g.is_terminal[body[0]] and g.index[body[0]] not in seen:
+                        seen.add(g.index[body[0]])
+                        stack.append(g.index[body[0]])
+            entered.append(frozenset((q, 0) for b in seen for q in g.by_head[b]))
+        follow = [g.terminal_names(bits) for bits in g.follow]
+
+        def closure(kernel):
+            items = set(kernel)
+            for p, dot in kernel:
+                body = g.bodies[p]
+                if dot < len(body) and not g.is_terminal[body[dot]]:
+                    items |= entered[g.index[body[dot]]]
+            return items
+
+        # one tuple per action, shared by every cell that holds it
+        reduces = [("R", p) for p in range(len(g))]
+        shifts = [("S", 0)]
+
+        first = frozenset([(0, 0)])
+        index = {first: 0}
+        kernels = [first]
+        self.action, self.goto, self.conflicts = [], [], {}
+        for state, kernel in enumerate(kernels):
+            moves = {}
+            reduce_items = []
+            for p, dot in closure(kernel):
+                body = g.bodies[p]
+                if dot < len(body):
+                    moves.setdefault(body[dot], []).append((p, dot + 1))
+                else:
+                    reduce_items.append(p)
+            action, goto = {}, {}
+            for symbol, items in sorted(moves.items()):
+                target = frozenset(items)
+                if target not in index:
+                    index[target] = len(kernels)
+                    shifts.append(("S", len(kernels)))
+                    kernels.append(target)
+                if g.is_terminal[symbol]:
+                    action[g.names[symbol]] = shifts[index[target]]
+                else:
+                    goto[g.names[symbol]] = index[target]
+            for p in sorted(reduce_items):
+                if p == 0:
+                    self._put(state, action, _grammar.END, ("ACC",))
+                    continue
+                for name in follow[g.index[g.heads[p]]]:
+                    self._put(state, action, name, reduces[p])
+            self.action.append(action)
+            self.goto.append(goto)
+
+    def _put(self, state, action, terminal, entry):
+        old = action.get(terminal)
+        if old is None:
+            action[terminal] = entry
+            return
+        self.conflicts.setdefault((state, terminal), [old]).append(entry)
+        if old[0] != "S" and (entry[0] == "S" or entry < old):
+            action[terminal] = entry   # shift wins, then the earlier production
+
+    @property
+    def n_states(self):
+        return len(self.action)
+
+    def parse(self, tokens):
+        """Production numbers of the rightmost derivation in reverse; SyntaxError on failure."""
+        tokens = list(tokens) + [_grammar.END]
+        stack, i, reductions = [0], 0, []
+        while True:
+            entry = self.action[stack[-1]].get(tokens[i])
+            if entry is None:
+                raise SyntaxError(f"Unexpected {tokens[i]!r} at token {i}")
+            if entry[0] == "S":
+                stack.append(entry[1])
+                i += 1
+            elif entry[0] == "R":
+                head, body = self.productions[entry[1]]
+                if body:
+                    del stack[-len(body):]
+                stack.append(self.goto[stack[-1]][head])
+                reductions.append(entry[1])
+            else:
+                return reductions
+
+    def tables(self):
+        """(action, goto, productions, conflicts) as plain lists and dicts."""
+        return self.action, self.goto, self.productions, self.conflicts
+
+
+if __name__ == "__main__":
+    lr_parsing = {1: ("E", ["E", "+", "T"]), 2: ("E", ["T"]), 3: ("T", ["T", "*", "F"]),
+                  4: ("T", ["F"]), 5: ("F", ["(", "E", ")"]), 6: ("F", ["id"])}
+    slr = SLRTables(_grammar.Grammar(lr_parsing.values()))
+    print(f"{slr.n_states} states, {len(slr.conflicts)} conflicts")
+    for state, (action, goto) in enumerate(zip(slr.action, slr.goto)):
+        print(f"{state:3} {action} {goto}")
+    for tokens in (["id", "+", "id", "*", "id"], ["(", "id", "+", "id", ")", "*", "id"], ["id", "*", "+", "id"]):
+        try:
+            print(tokens, "->", [f"{h} → {' '.join(b)}" for h, b in map(slr.productions.__getitem__, slr.parse(tokens))])
+        except SyntaxError as e:
+            print(tokens, "->", e)
+
+    # the augmented start must not merge into a grammar's own E'
+    bnf = load_script("bnf.py")
+    slr = SLRTables(bnf.load_bnf(os.path.join(HERE, "grammars", "expr_ll.bnf")))
+    assert slr.productions[0] == ("E''", ["E"])
+    assert slr.productions[slr.parse(["id", "+", "id"])[-1]] == ("E", ["T", "E'"])
+    try:
+        slr.parse(["id", "id"])
+        raise AssertionError("id id accepted")
+    except SyntaxError:
+        pass
@@ -0,0 +1,257 @@
+"""
+Run a DFA over a large file on several cores by composing transition functions.
+
+A DFA over a chunk of input is a function from states to states: start in s,
+read the chunk, end in f(s).  Each worker maps its chunk of a shared,
+read-only mmap to that function, as a vector over all states, without
+knowing which state the chunk will really be entered in.  The parent composes
+the vectors in order, so the final state is
+
+    f_last( ... f_2(f_1(start)))
+
+and the work per chunk is independent of every other chunk.
+
+Inside a worker the function is built with NumPy.  When the DFA's
+transition monoid (every state->state function its input can produce) has
+at most MONOID_LIMIT elements, the elements are numbered once and their
+composition table precomputed; a chunk becomes an array of element codes,
+one per byte, reduced pairwise with one 1-D gather per halving.  Otherwise a
+block of columns table[:, class(byte)] is reduced pairwise the same way with
+take_along_axis.
+
+With matches=True a second pass, also parallel, rescans each chunk from its
+now known entry state and returns the offsets at which the DFA is in an
+accepting state; the states come from a prefix composition (doubling) read
+at the entry state.
+
+DFAs come as dfa_batch.BatchDFA, which has an explicit dead state and a
+class for bytes outside the alphabet.
+
+Usage:
+    python parallel_dfa.py [FILE] [--size MB] [--scaling 1,2,4] [--matches]
+"""
+
+import argparse
+import mmap
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from loader import load_script
+
+_dfa_batch = load_script("dfa_batch.py")
+
+CHUNK = 1 << 24          # bytes per task
+CELLS = 1 << 22          # block length x states kept in memory at once
+MONOID_LIMIT = 1024
+
+
+class Transitions:
+    """State->state functions of one DFA, composed in bulk."""
+
+    def __init__(self, dfa, limit=MONOID_LIMIT):
+        self.dfa = dfa
+        self.n = n = dfa.n_states
+        self.columns = np.ascontiguousarray(dfa.table.T, dtype=np.uint8 if n <= 256 else np.int32)
+        self.block = max(1024, CELLS // n)
+        self.elements = self._monoid(limit) if n <= 15 else None
+        if self.elements is not None:
+            self._compose_table()
+
+    def _monoid(self, limit):
+        """Elements as an [m, n] array (identity first), or None beyond limit."""
+        identity = tuple(range(self.n))
+        generators = [tuple(int(t) for t in column) for column in self.columns]
+        index = {identity: 0}
+        elements = [identity]
+        for f in elements:   # grows while iterating: closure under appending a letter
+            for g in generators:
+                h = tuple(g[s] for s in f)
+                if h not in index:
+                    if len(elements) >= limit:
+                        return None
+                    index[h] = len(elements)
+                    elements.append(h)
+        self.letter = np.array([index[g] for g in generators], dtype=np.uint16)
+        return np.array(elements, dtype=np.intp)
+
+    def _compose_table(self):
+        """compose[a * m + b] = code of (b o a), i.e. a read first, then b."""
+        m, n = len(self.elements), self.n
+        weights = n ** np.arange(n, dtype=np.int64)
+        keys = self.elements @ weights
+        order = np.argsort(keys)
+        sorted_keys = keys[order]
+        table = np.empty((m, m), dtype=np.uint16)
+        for a in range(m):
+            products = self.elements[:, self.elements[a]] @ weights
+            table[a] = order[np.searchsorted(sorted_keys, products)]
+        self.compose = table.ravel()
+        self.m = m
+
+    def _codes(self, data):
+        return self.letter[self.dfa.classes[data]]
+
+    def _reduce_codes(self, codes):
+        compose, m = self.compose, self.m
+        while len(codes) > 1:
+            if len(codes) % 2:
+                codes = np.append(codes, np.uint16(0))
+            codes = compose[codes[0::2].astype(np.intp) * m + codes[1::2]]
+        return int(codes[0]) if len(codes) else 0
+
+    def _reduce_maps(self, maps):
+        while len(maps) > 1:
+            if len(maps) % 2:
+                maps = np.concatenate([maps, np.arange(self.n, dtype=maps.dtype)[None]])
+            # (second o first)[s] = second[first[s]]
+            maps = np.take_along_axis(maps[1::2], maps[0::2].astype(np.intp), axis=1)
+        return maps[0].astype(np.intp)
+
+    def chunk_map(self, data):
+        """Vector f with f[s] = state after reading data from state s."""
+        if self.elements is not None:
+            return self.elements[self._reduce_codes(self._codes(data))]
+        f = np.arange(self.n, dtype=np.intp)
+        for lo in range(0, len(data), self.block):
+            f = self._reduce_maps(self.columns[self.dfa.classes[data[lo:lo + self.block]]])[f]
+        return f
+
+    def chunk_matches(self, data, entry):
+        """(offsets in data after which the DFA accepts, exit state), entering in state entry."""
+        found = []
+        for lo in range(0, len(data), self.block):
+            piece = data[lo:lo + self.block]
+            d = 1
+            if self.elements is not None:
+                prefix = self._codes(piece)
+                while d < len(prefix):
+                    # prefix[i] becomes the composition of codes i-2d+1 .. i
+                    prefix[d:] = self.compose[prefix[:-d].astype(np.intp) * self.m + prefix[d:]]
+                    d *= 2
+                states = self.elements[prefix, entry]
+            else:
+                prefix = self.columns[self.dfa.classes[piece]]
+                while d < len(prefix):
+                    prefix[d:] = np.take_along_axis(prefix[d:], prefix[:-d].astype(np.intp), axis=1)
+                    d *= 2
+                states = prefix[:, entry]
+            found.append(np.flatnonzero(self.dfa.accepting[states]) + lo + 1)
+            if len(states):
+                entry = int(states[-1])
+        return (np.concatenate(found) if found else np.empty(0, dtype=np.int64)), entry
+
+
+def chunk_map(dfa, data):
+    return Transitions(dfa).chunk_map(data)
+
+
+def chunk_matches(dfa, data, entry):
+    return Transitions(dfa).chunk_matches(data, entry)
+
+
+# -----------------------------
+# Process pool over a shared mmap
+# -----------------------------
+_worker = {}
+
+
+def _init_worker(dfa, path):
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+    _worker.update(transitions=Transitions(dfa), data=np.frombuffer(mapped, dtype=np.uint8))
+
+
+def _map_task(span):
+    lo, hi = span
+    return _worker["transitions"].chunk_map(_worker["data"][lo:hi])
+
+
+def _match_task(task):
+    lo, hi, entry = task
+    offsets, _ = _worker["transitions"].chunk_matches(_worker["data"][lo:hi], entry)
+    return offsets + lo
+
+
+def run_file(dfa, path, workers=None, chunk=CHUNK, matches=False):
+    """
+    Run dfa over the file at path.
+
+    Returns (accepted, final state, match offsets or None).  Match offsets
+    are end positions: offset i means the first i bytes leave the DFA in an
+    accepting state.
+    """
+    size = os.path.getsize(path)
+    spans = [(lo, min(lo + chunk, size)) for lo in range(0, size, chunk)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(dfa, path)) as pool:
+        maps = list(pool.map(_map_task, spans))
+        entries = []
+        state = dfa.start
+        for f in maps:
+            entries.append(state)
+            state = int(f[state])
+        offsets = None
+        if matches:
+            parts = list(pool.map(_match_task, [(lo, hi, e) for (lo, hi), e in zip(spans, entries)]))
+            offsets = np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+            if dfa.accepting[dfa.start]:
+                offsets = np.concatenate([[0], offsets])
+    return bool(dfa.accepting[state]), state, offsets
+
+
+def report(dfa, path, core_counts, chunk=CHUNK, matches=False):
+    """Print throughput for each core count and efficiency relative to the first."""
+    size = os.path.getsize(path)
+    print(f"{'cores':>5} {'seconds':>9} {'MB/s':>9} {'efficiency':>10}  result")
+    base = None
+    for cores in core_counts:
+        start = time.perf_counter()
+        accepted, state, offsets = run_file(dfa, path, cores, chunk, matches)
+        seconds = time.perf_counter() - start
+        if base is None:
+            base = seconds * cores
+        extra = f", {len(offsets):,} match offsets" if offsets is not None else ""
+        print(f"{cores:5} {seconds:9.2f} {size / seconds / 1e6:9.1f} {base / (seconds * cores):10.0%}  "
+              f"{'ACCEPT' if accepted else 'REJECT'}{extra}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run dfa_even_ones over a file on several cores.")
+    parser.add_argument("file", nargs="?", help="binary string file (default: a generated one)")
+    parser.add_argument("--size", type=int, default=256, help="MB to generate when no file is given")
+    parser.add_argument("--scaling", default=",".join(str(2 ** i) for i in range(os.cpu_count().bit_length())),
+                        help="comma-separated core counts")
+    parser.add_argument("--chunk", type=int, default=CHUNK)
+    parser.add_argument("--matches", action="store_true", help="also collect accepting offsets")
+    args = parser.parse_args(argv)
+
+    dfa = _dfa_batch.even_ones()
+    automata1 = load_script("automata1.py")
+    path, generated = args.file, None
+    if path is None:
+        rng = random.Random(0)
+        generated = tempfile.NamedTemporaryFile(suffix=".bin", delete=False)
+        block = bytes(rng.choice(b"01") for _ in range(1 << 20))
+        for _ in range(args.size):
+            generated.write(block)
+        generated.close()
+        path = generated.name
+    try:
+        with open(path, "rb") as f:
+            sample = f.read(1 << 20).decode("latin-1")
+        start = time.perf_counter()
+        automata1.dfa_even_ones(sample)
+        print(f"dfa_even_ones on 1 MB: {len(sample) / (time.perf_counter() - start) / 1e6:.1f} MB/s\n")
+        report(dfa, path, [int(c) for c in args.scaling.split(",")], args.chunk, args.matches)
+    finally:
+        if generated is not None:
+            os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
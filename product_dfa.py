@@ -0,0 +1,173 @@
+"""
+Classify a string against many languages in one pass.
+
+product() builds the product automaton of N regex_dfa.DFA tables.  A product
+state is a tuple of component states (-1 for a component that has died), and
+its label is the set of languages whose component accepts.  Only tuples
+reachable from the start are built, the tuple where every component is dead
+becomes the dead state, and max_states caps the construction.
+
+Labels are stored as token names ("even_ones+contains_a"), so the product is
+an ordinary regex_dfa.DFA: regex_dfa.minimize() keeps states with different
+label sets apart and merges the rest (prune=True), and automaton_file can
+save it.  ProductDFA.classify() then costs one table lookup per character,
+however many languages there are.
+
+Recognizers from the automata modules plug in through from_dict() (DFAs) and
+from_nfa_dict() (NFAs, determinized with regex_dfa.subset_construction).
+Characters outside a component's alphabet kill that component, where the
+scalar functions would raise ValueError.
+"""
+
+import random
+import time
+from array import array
+from collections import deque
+
+from loader import load_script
+
+_regex_dfa = load_script("regex_dfa.py")
+_dfa_check = load_script("dfa_check.py")
+from_dict = _dfa_check.from_dict
+OTHER = _regex_dfa.OTHER
+
+
+def from_nfa_dict(nfa, start, accept):
+    """Minimal DFA for an automata2.py-style NFA {state: {symbol: [states]}}."""
+    symbols = sorted({sym for row in nfa.values() for sym in row if sym != _regex_dfa.EPSILON})
+    if any(len(sym) != 1 or ord(sym) >= OTHER for sym in symbols):
+        raise ValueError("from_nfa_dict needs single ASCII characters as symbols")
+    members = [[ord(sym)] for sym in symbols]
+    rest = [c for c in range(_regex_dfa.N_SYMBOLS) if chr(c) not in symbols]
+    classmap = bytearray([len(members)] * _regex_dfa.N_SYMBOLS)
+    for c, sym in enumerate(symbols):
+        classmap[ord(sym)] = c
+    members.append(rest)
+    dfa = _regex_dfa.subset_construction(nfa, start, {s: 0 for s in accept}, bytes(classmap),
+                                         members, [_dfa_check.MATCH])
+    return _regex_dfa.minimize(dfa)
+
+
+class ProductDFA:
+    def __init__(self, dfa, languages, masks):
+        self.dfa = dfa
+        self.languages = languages   # language names, bit i = languages[i]
+        self.masks = masks           # token index of dfa -> bitmask of languages
+
+    @property
+    def n_states(self):
+        return self.dfa.n_states
+
+    def match_mask(self, string):
+        """Bitmask of the languages string belongs to."""
+        dfa = self.dfa
+        table, classmap, k = dfa.table, dfa.classmap, dfa.n_classes
+        state = 0
+        for ch in string:
+            c = ord(ch)
+            state = table[state * k + classmap[c if c < OTHER else OTHER]]
+            if state < 0:
+                return 0
+        token = dfa.accept[state]
+        return self.masks[token] if token >= 0 else 0
+
+    def classify(self, string):
+        """Names of the languages string belongs to."""
+        mask = self.match_mask(string)
+        return [name for i, name in enumerate(self.languages) if mask >> i & 1]
+
+
+def product(dfas, names=None, max_states=100_000, prune=True):
+    """
+    ProductDFA of a list of regex_dfa.DFA (or a {name: DFA} dict).
+
+    A component "accepts" when its state accepts any token.  Raises
+    ValueError if more than max_states product states are reachable.
+    """
+    if isinstance(dfas, dict):
+        names, dfas = list(dfas), list(dfas.values())
+    names = names or [f"L{i}" for i in range(len(dfas))]
+
+    # Joint alphabet: one class per distinct tuple of component classes
+    joint, letters = {}, []
+    classmap = bytearray(_regex_dfa.N_SYMBOLS)
+    for symbol in range(_regex_dfa.N_SYMBOLS):
+        key = tuple(d.classmap[symbol] for d in dfas)
+        if key not in joint:
+            joint[key] = len(letters)
+            letters.append(key)
+        classmap[symbol] = joint[key]
+    if len(letters) > 256:
+        raise ValueError("product alphabet has more than 256 classes")
+    k = len(letters)
+
+    start = tuple(0 for _ in dfas)
+    index = {start: 0}
+    order = [start]
+    table = array("i")
+    labels, label_index, accept = [], {}, []
+    queue = deque([start])
+    while queue:
+        current = queue.popleft()
+        mask = 0
+        for i, (d, s) in enumerate(zip(dfas, current)):
+            if s >= 0 and d.accept[s] >= 0:
+                mask |= 1 << i
+        if mask and mask not in label_index:
+            label_index[mask] = len(labels)
+            labels.append(mask)
+        accept.append(label_index[mask] if mask else -1)
+        for key in letters:
+            nxt = tuple(d.table[s * d.n_classes + c] if s >= 0 else -1
+                        for d, s, c in zip(dfas, current, key))
+            if max(nxt) < 0:
+                table.append(-1)
+                continue
+            if nxt not in index:
+                if len(order) >= max_states:
+                    raise ValueError(f"product automaton exceeds {max_states} states")
+                index[nxt] = len(order)
+                order.append(nxt)
+                queue.append(nxt)
+            table.append(index[nxt])
+
+    token_names = ["+".join(names[i] for i in range(len(names)) if mask >> i & 1) for mask in labels]
+    dfa = _regex_dfa.DFA(table, accept, bytes(classmap), k, token_names)
+    if prune:
+        dfa = _regex_dfa.minimize(dfa)
+    return ProductDFA(dfa, names, labels)
+
+
+if __name__ == "__main__":
+    automata1 = load_script("automata1.py")
+    automata2 = load_script("automata2.py")
+    automata3 = load_script("automata3.py")
+    recognizers = {
+        "even_ones": from_dict(automata1.dfa, automata1.start_state, automata1.accept_states),
+        "ends_in_a": from_nfa_dict(automata2.nfa, automata2.start_state, automata2.accept_states),
+        "contains_a": from_dict(automata3.dfa, automata3.start_state, automata3.accept_states),
+    }
+    p = product(recognizers)
+    print(f"product of {len(recognizers)} recognizers: {p.n_states} states")
+    for s in ["", "a", "ba", "abb", "0110", "1", "b"]:
+        print(f"  {s!r:7} {p.classify(s)}")
+
+    # Cost against the number of rules: N keyword-like patterns
+    rng = random.Random(0)
+    text_set = ["".join(rng.choices("abcd", k=rng.randint(1, 12))) for _ in range(20_000)]
+    print(f"\n{'rules':>5} {'states':>7} {'build s':>8} {'product s':>10} {'one by one s':>13}")
+    for n in (1, 4, 16, 64):
+        regexes = {f"R{i}": "".join(rng.choice(["a", "b", "c", "d", "(a|b)", "[cd]*"]) for _ in range(4)) + ".*"
+                   for i in range(n)}
+        dfas = {name: _regex_dfa.compile_regex(rx) for name, rx in regexes.items()}
+        start = time.perf_counter()
+        p = product(dfas)
+        build = time.perf_counter() - start
+        start = time.perf_counter()
+        together = [p.match_mask(s) for s in text_set]
+        product_time = time.perf_counter() - start
+        start = time.perf_counter()
+        separate = [sum(1 << i for i, d in enumerate(dfas.values()) if d.accepts(s)) for s in text_set]
+        separate_time = time.perf_counter() - start
+        assert together == separate
+        print(f"{n:5} {p.n_states:7} {build:8.2f} {product_time:10.3f} {separate_time:13.3f}")
@@ -1,11 +1,16 @@
 import ast
 
+from symbols import SymbolTable
+
 class TACQuadSequential:
-    def __init__(self):
+    def __init__(self, symbols=None):
         self.temp_count = 0
         self.tac = []
         self.quadruples = []
 
+        # Optional SymbolTable: names become interned Symbols (ints that print as names)
+        self.symbols = symbols
+
     def new_temp(self):
         self.temp_count += 1
         return f"t{self.temp_count}"
@@ -32,7 +37,7 @@ class TACQuadSequential:
                 raise NotImplementedError("Only unary minus supported")
 
         elif isinstance(node, ast.Name):
-            return node.id
+            return self.name(node.id)
 
         elif isinstance(node, ast.Constant):
             return str(node.value)
@@ -42,12 +47,15 @@ class TACQuadSequential:
 
     def visit_Assign(self, node):
         """Handle assignment statements"""
-        target = node.targets[0].id
+        target = self.name(node.targets[0].id)
         value = self.visit(node.value)
         self.tac.append(f"{target} = {value}")
         self.quadruples.append(('=', value, '-', target))
         return target
 
+    def name(self, ident):
+        return ident if self.symbols is None else self.symbols.intern(ident)
+
     def get_op(self, op_node):
         ops = {
             ast.Add: "+",
@@ -79,7 +87,7 @@ class TACQuadSequential:
 # =========================
 if __name__ == "__main__":
     stmt = input("Enter an arithmetic statement (with or without assignment): ")
-    generator = TACQuadSequential()
+    generator = TACQuadSequential(SymbolTable())
     generator.generate(stmt)
 
     print("\nThree Address Code (TAC):\n")
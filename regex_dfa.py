@@ -0,0 +1,500 @@
+"""
+Scanner generator: regex -> NFA -> DFA -> minimal DFA -> dense table.
+
+    1. parse()              regex subset to a small tuple AST
+    2. thompson()           Thompson construction into the NFA shape used in
+                            automata2.py: {state: {symbol: [states]}}, with
+                            'ε' as the epsilon symbol
+    3. subset_construction  NFA -> DFA over alphabet equivalence classes
+    4. minimize()           Hopcroft's algorithm, keeping token kinds apart
+
+The result is a DFA whose transitions live in one flat array('i'), indexed by
+state * n_classes + class, with -1 as the dead state.  DFA.scan() runs the
+usual maximal-munch loop over it; ties go to the rule listed first, so
+keywords beat identifiers without the \\b anchors the re-based lexers need.
+
+Supported syntax: literals, escapes (\\d \\w \\s and their negations, \\t \\n
+...), [...] classes with ranges and ^, '.', (...) and (?:...), |, *, + and ?.
+Characters are folded to 0..127 plus one "non-ASCII" symbol (128).
+"""
+
+from array import array
+
+from loader import load_script
+
+EPSILON = "ε"
+PIPELINE_VERSION = 1             # bump when the DFAs built for the same rules change
+OTHER = 128                      # every non-ASCII character
+N_SYMBOLS = 129
+ANY = (1 << N_SYMBOLS) - 1
+
+
+def _mask(chars):
+    m = 0
+    for ch in chars:
+        m |= 1 << min(ord(ch), OTHER)
+    return m
+
+
+def _range(lo, hi):
+    return ((1 << (hi + 1)) - 1) ^ ((1 << lo) - 1)
+
+
+DIGIT = _range(ord("0"), ord("9"))
+WORD = DIGIT | _range(ord("A"), ord("Z")) | _range(ord("a"), ord("z")) | _mask("_") | 1 << OTHER
+SPACE = _mask(" \t\n\r\f\v")
+DOT = ANY & ~_mask("\n")
+CLASS_ESCAPES = {"d": DIGIT, "D": ANY & ~DIGIT, "w": WORD, "W": ANY & ~WORD, "s": SPACE, "S": ANY & ~SPACE}
+CHAR_ESCAPES = {"t": "\t", "n": "\n", "r": "\r", "f": "\f", "v": "\v", "0": "\0"}
+
+
+# -----------------------------
+# 1. Regex parser
+# -----------------------------
+class _Parser:
+    def __init__(self, regex):
+        self.regex = regex
+        self.i = 0
+
+    def error(self, message):
+        raise ValueError(f"{message} at position {self.i} in {self.regex!r}")
+
+    def peek(self):
+        return self.regex[self.i] if self.i < len(self.regex) else None
+
+    def parse(self):
+        node = self.alt()
+        if self.i != len(self.regex):
+            self.error("Unbalanced ')'")
+        return node
+
+    def alt(self):
+        node = self.cat()
+        while self.peek() == "|":
+            self.i += 1
+            node = ("alt", node, self.cat())
+        return node
+
+    def cat(self):
+        node = ("eps",)
+        while self.peek() not in (None, "|", ")"):
+            item = self.repeat()
+            node = item if node == ("eps",) else ("cat", node, item)
+        return node
+
+    def repeat(self):
+        node = self.atom()
+        while self.peek() in ("*", "+", "?"):
+            op = self.regex[self.i]
+            self.i += 1
+            if self.peek() == "?":
+                self.error("Lazy quantifiers have no DFA meaning")
+            node = ({"*": "star", "+": "plus", "?": "opt"}[op], node)
+        if self.peek() == "{":
+            self.error("Counted repetition is not supported")
+        return node
+
+    def atom(self):
+        ch = self.regex[self.i]
+        self.i += 1
+        if ch == "(":
+            if self.regex.startswith("?:", self.i):
+                self.i += 2
+            elif self.peek() == "?":
+                self.error("Only (?:...) groups are supported")
+            node = self.alt()
+            if self.peek() != ")":
+                self.error("Missing ')'")
+            self.i += 1
+            return node
+        if ch == "[":
+            return ("sym", self.char_class())
+        if ch == ".":
+            return ("sym", DOT)
+        if ch == "\\":
+            return ("sym", self.escape())
+        if ch in "*+?":
+            self.error("Nothing to repeat")
+        if ch in "^$":
+            self.error("Anchors are not supported")
+        return ("sym", _mask(ch))
+
+    def escape(self):
+        if self.i >= len(self.regex):
+            self.error("Trailing backslash")
+        ch = self.regex[self.i]
+        self.i += 1
+        if ch in CLASS_ESCAPES:
+            return CLASS_ESCAPES[ch]
+        if ch in "bBAZ" or ch.isdigit() and ch != "0":
+            self.error(f"\\{ch} is not supported")
+        return _mask(CHAR_ESCAPES.get(ch, ch))
+
+    def char_class(self):
+        negate = self.peek() == "^"
+        if negate:
+            self.i += 1
+        mask = 0
+        first = True
+        while True:
+            ch = self.peek()
+            if ch is None:
+                self.error("Missing ']'")
+            if ch == "]" and not first:
+                self.i += 1
+                break
+            first = False
+            self.i += 1
+            if ch == "\\":
+                item = self.escape()
+            else:
+                item = _mask(ch)
+            if self.peek() == "-" and self.regex[self.i + 1:self.i + 2] not in ("]", ""):
+                lo = item.bit_length() - 1
+                self.i += 1
+                hi_ch = self.regex[self.i]
+                self.i += 1
+                hi = (self.escape() if hi_ch == "\\" else _mask(hi_ch)).bit_length() - 1
+                if item & (item - 1) or hi < lo:
+                    self.error("Bad character range")
+                item = _range(lo, hi)
+            mask |= item
+        return ANY & ~mask if negate else mask
+
+
+def parse(regex):
+    """Parse regex into a tuple AST of sym/cat/alt/star/plus/opt/eps nodes."""
+    return _Parser(regex).parse()
+
+
+# -----------------------------
+# Alphabet classes
+# -----------------------------
+def _masks(node, out):
+    if node[0] == "sym":
+        out.add(node[1])
+    for child in node[1:]:
+        if isinstance(child, tuple):
+            _masks(child, out)
+    return out
+
+
+def alphabet_classes(trees):
+    """
+    Split the 129 symbols into classes no regex can tell apart.
+
+    Returns (classmap, members): classmap[symbol] is a class index and
+    members[class] lists its symbols.  Class 0 holds the symbols no rule uses.
+    """
+    masks = set()
+    for tree in trees:
+        _masks(tree, masks)
+    masks = sorted(masks)
+    groups = {}
+    for s in range(N_SYMBOLS):
+        key = tuple(m >> s & 1 for m in masks)
+        groups.setdefault(key, []).append(s)
+    unused = tuple(0 for _ in masks)
+    members = [groups.pop(unused, [])] + list(groups.values())
+    if not members[0]:
+        members.pop(0)
+    classmap = bytearray(N_SYMBOLS)
+    for c, symbols in enumerate(members):
+        for s in symbols:
+            classmap[s] = c
+    return bytes(classmap), members
+
+
+# -----------------------------
+# 2. Thompson construction
+# -----------------------------
+def thompson(rules):
+    """
+    Build one NFA for a list of (name, regex) rules.
+
+    Returns (nfa, start, accepts, classmap, members) where nfa has the
+    automata2.py shape, edges are labelled with one representative character
+    per alphabet class, and accepts maps an accepting state to its rule index.
+    """
+    trees = [parse(regex) for _, regex in rules]
+    classmap, members = alphabet_classes(trees)
+    labels = [chr(symbols[0]) for symbols in members]
+    nfa = {}
+
+    def new_state():
+        state = len(nfa)
+        nfa[state] = {}
+        return state
+
+    def edge(src, symbol, dst):
+        nfa[src].setdefault(symbol, []).append(dst)
+
+    def build(node):
+        kind = node[0]
+        s = new_state()
+        if kind == "eps":
+            return s, s
+        if kind == "sym":
+            e = new_state()
+            for c, symbols in enumerate(members):
+                if node[1] >> symbols[0] & 1:
+                    edge(s, labels[c], e)
+            return s, e
+        if kind == "cat":
+            s1, e1 = build(node[1])
+            s2, e2 = build(node[2])
+            edge(s, EPSILON, s1)
+            edge(e1, EPSILON, s2)
+            return s, e2
+        e = new_state()
+        if kind == "alt":
+            for child in node[1:]:
+                cs, ce = build(child)
+                edge(s, EPSILON, cs)
+                edge(ce, EPSILON, e)
+            return s, e
+        cs, ce = build(node[1])
+        edge(s, EPSILON, cs)
+        edge(ce, EPSILON, e)
+        if kind in ("star", "opt"):
+            edge(s, EPSILON, e)
+        if kind in ("star", "plus"):
+            edge(ce, EPSILON, cs)
+        return s, e
+
+    start = new_state()
+    accepts = {}
+    for index, tree in enumerate(trees):
+        s, e = build(tree)
+        edge(start, EPSILON, s)
+        accepts[e] = index
+    return nfa, start, accepts, classmap, members
+
+
+# -----------------------------
+# Dense DFA
+# -----------------------------
+class DFA:
+    """
+    Table-driven DFA; state 0 is the start state.
+
+    table[state * n_classes + cls] is the next state (-1 = dead) and
+    accept[state] is the index of the rule the state accepts (-1 = none).
+    """
+
+    def __init__(self, table, accept, classmap, n_classes, names):
+        self.table = table
+        self.accept = accept
+        self.classmap = classmap
+        self.n_classes = n_classes
+        self.names = names
+
+    @property
+    def n_states(self):
+        return len(self.accept)
+
+    def accepts(self, string):
+        table, classmap, k = self.table, self.classmap, self.n_classes
+        state = 0
+        for ch in string:
+            c = ord(ch)
+            state = table[state * k + classmap[c if c < OTHER else OTHER]]
+            if state < 0:
+                return False
+        return self.accept[state] >= 0
+
+    def scan(self, text, pos=0):
+        """Yield (name, start, end) for each longest match, left to right."""
+        table, classmap, accept, k, names = self.table, self.classmap, self.accept, self.n_classes, self.names
+        n = len(text)
+        while pos < n:
+            state, i = 0, pos
+            token, end = -1, pos
+            while i < n:
+                c = ord(text[i])
+                state = table[state * k + classmap[c if c < OTHER else OTHER]]
+                if state < 0:
+                    break
+                i += 1
+                if accept[state] >= 0:
+                    token, end = accept[state], i
+            if token < 0:
+                raise ValueError(f"Unexpected character at position {pos}: '{text[pos]}'")
+            yield names[token], pos, end
+            pos = end
+
+
+# -----------------------------
+# 3. Subset construction
+# -----------------------------
+def _closure(nfa, states):
+    stack = list(states)
+    seen = set(states)
+    while stack:
+        for t in nfa[stack.pop()].get(EPSILON, ()):
+            if t not in seen:
+                seen.add(t)
+                stack.append(t)
+    return frozenset(seen)
+
+
+def subset_construction(nfa, start, accepts, classmap, members, names):
+    """Determinize; a DFA state accepts the lowest-numbered rule it contains."""
+    k = len(members)
+    class_of = {chr(symbols[0]): c for c, symbols in enumerate(members)}
+    first = _closure(nfa, [start])
+    index = {first: 0}
+    order = [first]
+    table = array("i")
+    accept = []
+    for current in order:
+        moves = {}
+        for s in current:
+            for symbol, targets in nfa[s].items():
+                if symbol != EPSILON:
+                    moves.setdefault(class_of[symbol], set()).update(targets)
+        row = [-1] * k
+        for c, targets in moves.items():
+            target = _closure(nfa, targets)
+            if target not in index:
+                index[target] = len(order)
+                order.append(target)
+            row[c] = index[target]
+        table.extend(row)
+        rules = [accepts[s] for s in current if s in accepts]
+        accept.append(min(rules) if rules else -1)
+    return DFA(table, accept, classmap, k, names)
+
+
+# -----------------------------
+# 4. Hopcroft minimization
+# -----------------------------
+def minimize(dfa):
+    """Return the minimal DFA accepting the same tokens (Hopcroft, O(k n log n))."""
+    n, k, table = dfa.n_states, dfa.n_classes, dfa.table
+    dead = n
+    inverse = [[[] for _ in range(n + 1)] for _ in range(k)]
+    for s in range(n):
+        for c in range(k):
+            t = table[s * k + c]
+            inverse[c][dead if t < 0 else t].append(s)
+    for c in range(k):
+        inverse[c][dead].append(dead)
+
+    by_label = {}
+    for s, label in enumerate(list(dfa.accept) + [-1]):
+        by_label.setdefault(label, set()).add(s)
+    blocks = list(by_label.values())
+    block_of = [0] * (n + 1)
+    for b, members in enumerate(blocks):
+        for s in members:
+            block_of[s] = b
+
+    work = set(range(len(blocks)))
+    while work:
+        splitter = list(blocks[work.pop()])
+        for c in range(k):
+            inv = inverse[c]
+            touched = {}
+            for t in splitter:
+                for s in inv[t]:
+                    touched.setdefault(block_of[s], set()).add(s)
+            for b, hit in touched.items():
+                if len(hit) == len(blocks[b]):
+                    continue
+                blocks[b] -= hit
+                nb = len(blocks)
+                blocks.append(hit)
+                for s in hit:
+                    block_of[s] = nb
+                if b in work or len(hit) <= len(blocks[b]):
+                    work.add(nb)
+                else:
+                    work.add(b)
+
+    # Renumber reachable blocks breadth-first from the start; the dead block becomes -1
+    dead_block = block_of[dead]
+    number = {block_of[0]: 0}
+    order = [block_of[0]]
+    new_table = array("i")
+    accept = []
+    for b in order:
+        rep = min(blocks[b])   # never the dead state, which is numbered last
+        for c in range(k):
+            t = table[rep * k + c]
+            tb = dead_block if t < 0 else block_of[t]
+            if tb == dead_block:
+                new_table.append(-1)
+                continue
+            if tb not in number:
+                number[tb] = len(order)
+                order.append(tb)
+            new_table.append(number[tb])
+        accept.append(dfa.accept[rep])
+    return DFA(new_table, accept, dfa.classmap, k, dfa.names)
+
+
+# -----------------------------
+# Front ends
+# -----------------------------
+def compile_rules(rules):
+    """Compile [(name, regex), ...] into one minimal scanner DFA."""
+    nfa, start, accepts, classmap, members = thompson(rules)
+    dfa = subset_construction(nfa, start, accepts, classmap, members, [name for name, _ in rules])
+    return minimize(dfa)
+
+
+def compile_regex(regex):
+    """Minimal DFA for a single regex."""
+    return compile_rules([("MATCH", regex)])
+
+
+def rules_from_tokens(tokens):
+    r"""
+    Rules for a TOKENS dict as in Lex program.py.
+
+    The \b anchors are dropped: under maximal munch a keyword rule only ties
+    with ID when the whole identifier is the keyword, and then it wins by
+    being listed first.
+    """
+    return [(name, pattern.replace(r"\b", "")) for name, pattern in tokens.items()]
+
+
+# lab01's lazy /\*[\s\S]*?\*/ spelled as a plain regular expression
+C_COMMENT = r"//.*|/\*([^*]|\*+[^*/])*\*+/"
+
+
+def lab01_rules():
+    lab01 = load_script("lab01.py")
+    rules = []
+    for name, pattern in lab01.token_specification:
+        if name == "COMMENT":
+            pattern = C_COMMENT
+        rules.append((name, pattern.replace(r"\b", "")))
+    return rules
+
+
+if __name__ == "__main__":
+    nfa, start, accepts, _, _ = thompson([("T", "(a|b)*a")])
+    print("Thompson NFA for (a|b)*a:")
+    for state, moves in nfa.items():
+        print(f"  {state}: {moves}")
+    dfa = compile_regex("(a|b)*a")
+    print(f"Minimal DFA: {dfa.n_states} states")
+    for s in ["a", "ba", "aba", "bba", "abba", "", "b", "bb", "abb", "bab"]:
+        print(f"  {s!r:8} -> {dfa.accepts(s)}")
+
+    lex_program = load_script("Lex program.py")
+    scanner = compile_rules(rules_from_tokens(lex_program.TOKENS))
+    print(f"\nLex program scanner: {scanner.n_states} states, {scanner.n_classes} classes")
+    code = "if x <= 10 then y = 20 else y <> z"
+    for name, i, j in scanner.scan(code):
+        if name != "WS":
+            print(f"  {name:10} → {code[i:j]}")
+
+    scanner = compile_rules(lab01_rules())
+    print(f"\nlab01 scanner: {scanner.n_states} states, {scanner.n_classes} classes")
+    code = "int a = 10; /* c */ if (a >= 3.14) a = a + 1; // done"
+    for name, i, j in scanner.scan(code):
+        if name not in ("WHITESPACE", "NEWLINE"):
+            print(f"  {name}: {code[i:j]}")
@@ -7,80 +7,95 @@ class Token:
         return f"TOKEN(type={self.token_type}, attribute={self.attribute})"
 
 
-def getRelop(input_string):
+# Operator sets: relops, and the multi-char operators of lab01.py and lexeme 2.py
+RELOPS = {"<": "LT", "<=": "LE", "<>": "NE", "=": "EQ", ">": "GT", ">=": "GE"}
+C_OPERATORS = ["==", "!=", "<=", ">=", "&&", "||", "+", "-", "*", "/", "%", "=", "<", ">", "!"]
+PY_OPERATORS = ["==", "!=", "<=", ">=", "->", ":=", "+", "-", "*", "/", "%", "=", "<", ">", "**", "//"]
+
+
+class OperatorDFA:
     """
-    Simulates the DFA for relational operators (relops).
-    Recognizes: <, <=, <>, =, >, >=
+    Table-driven recognizer generated from an operator list.
+
+    The operators are laid out as a trie: table[state] maps a character to the
+    next state and accept[state] names the operator ending there.  scan() does
+    longest match from any position of a buffer and allocates nothing per
+    character.  trace, if given, is called as trace(event, *args) with the
+    events "next", "retract" and "match".
     """
-    state = 0
-    i = 0
-    retToken = Token("RELOP")
-
-    def nextChar():
-        nonlocal i
-        if i < len(input_string):
-            ch = input_string[i]
+
+    def __init__(self, operators):
+        if not isinstance(operators, dict):
+            operators = {op: op for op in operators}
+        self.table = [{}]
+        self.accept = [None]
+        for op, name in operators.items():
+            state = 0
+            for ch in op:
+                nxt = self.table[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.table)
+                    self.table[state][ch] = nxt
+                    self.table.append({})
+                    self.accept.append(None)
+                state = nxt
+            self.accept[state] = name
+
+    def scan(self, buf, pos=0, trace=None):
+        """Return (name, end) of the longest operator at buf[pos:], or (None, pos)."""
+        table, accept = self.table, self.accept
+        n = len(buf)
+        state, i = 0, pos
+        name, end = None, pos
+        while table[state]:   # stop as soon as no longer operator is possible
+            ch = buf[i] if i < n else None
+            if trace is not None and ch is not None:
+                trace("next", ch)
+            nxt = table[state].get(ch)
             i += 1
-            print(f"nextChar() -> '{ch}'")
-            return ch
-        else:
-            return None
+            if nxt is None:
+                break   # the rejected lookahead still counts as read
+            state = nxt
+            if accept[state] is not None:
+                name, end = accept[state], i
+        if trace is not None and name is not None:
+            if i > end:
+                trace("retract", i - end)
+            trace("match", buf[pos:end], name)
+        return name, end
+
+
+RELOP_DFA = OperatorDFA(RELOPS)
+C_OPERATOR_DFA = OperatorDFA(C_OPERATORS)
+PY_OPERATOR_DFA = OperatorDFA(PY_OPERATORS)
 
-    def retract():
-        nonlocal i
-        i -= 1
-        print("retract() called → step back one char")
 
-    def fail():
+def print_trace(event, *args):
+    """Trace hook that prints the steps the way the hand-written getRelop did."""
+    if event == "next":
+        print(f"nextChar() -> '{args[0]}'")
+    elif event == "retract":
+        for _ in range(args[0]):
+            print("retract() called → step back one char")
+    elif event == "match":
+        print(f"Matched '{args[0]}' → {args[1]}")
+
+
+def getRelop(input_string, trace=None):
+    """
+    Simulates the DFA for relational operators (relops).
+    Recognizes: <, <=, <>, =, >, >=
+    """
+    attribute, _ = RELOP_DFA.scan(input_string, 0, trace)
+    if attribute is None:
         raise ValueError(f"fail(): '{input_string}' is not a valid relop")
+    return Token("RELOP", attribute)
+
+
+if __name__ == "__main__":
+    tests = ["<", "<=", "<>", "=", ">", ">="]
 
-    while True:
-        if state == 0:
-            c = nextChar()
-            if c == '<':
-                state = 1
-            elif c == '=':
-                state = 5
-            elif c == '>':
-                state = 6
-            else:
-                fail()
-
-        elif state == 1:  # saw '<'
-            c = nextChar()
-            if c == '=':
-                retToken.attribute = "LE"
-                print("Matched '<=' → LE")
-                return retToken
-            elif c == '>':
-                retToken.attribute = "NE"
-                print("Matched '<>' → NE")
-                return retToken
-            else:
-                retract()
-                retToken.attribute = "LT"
-                print("Matched '<' → LT")
-                return retToken
-
-        elif state == 5:  # saw '='
-            retToken.attribute = "EQ"
-            print("Matched '=' → EQ")
-            return retToken
-
-        elif state == 6:  # saw '>'
-            c = nextChar()
-            if c == '=':
-                retToken.attribute = "GE"
-                print("Matched '>=' → GE")
-                return retToken
-            else:
-                retract()
-                retToken.attribute = "GT"
-                print("Matched '>' → GT")
-                return retToken
-tests = ["<", "<=", "<>", "=", ">", ">="]
-
-for t in tests:
-    print(f"\nInput: '{t}'")
-    token = getRelop(t)
-    print("Output:", token)
+    for t in tests:
+        print(f"\nInput: '{t}'")
+        token = getRelop(t, trace=print_trace)
+        print("Output:", token)
@@ -34,17 +34,18 @@ def rightmost_derivation(symbols, target, derivation):
             return None  # No production worked
     return None  # No non-terminal left and target not matched
 
-# Example input string
-target_string = "aa+a*"
+if __name__ == "__main__":
+    # Example input string
+    target_string = "aa+a*"
 
-# Generate rightmost derivation
-derivation_steps = rightmost_derivation(["S"], target_string, [])
+    # Generate rightmost derivation
+    derivation_steps = rightmost_derivation(["S"], target_string, [])
 
-# Print the derivation
-if derivation_steps:
-    print(f"Grammar S -> SS+ | SS* | a")
-    print(f"Rightmost derivation for '{target_string}':")
-    for i, step in enumerate(derivation_steps):
-        print(f"Step {i}: {step}")
-else:
-    print(f"No derivation found for the string '{target_string}'.")
+    # Print the derivation
+    if derivation_steps:
+        print(f"Grammar S -> SS+ | SS* | a")
+        print(f"Rightmost derivation for '{target_string}':")
+        for i, step in enumerate(derivation_steps):
+            print(f"Step {i}: {step}")
+    else:
+        print(f"No derivation found for the string '{target_string}'.")
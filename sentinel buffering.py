@@ -1,39 +1,63 @@
 EOF = "EOF"  # sentinel symbol
 
+
 class TwoBufferInput:
-    def __init__(self, text, buffer_size=5):
+    def __init__(self, text, buffer_size=5, verbose=True):
+        """text is either a str or a file object opened in text mode."""
         self.buffer_size = buffer_size
         self.buffers = [[], []]
         self.text = text
         self.pos = 0
         self.active_buffer = 0
         self.forward = 0
+        self.verbose = verbose
+
+        # One chunk of read-ahead, so the end of a file object is known
+        # before its last buffer is handed out.
+        self.pending = self.read_source()
 
         # Load only the first buffer
         self.load_buffer(0)
 
+    def read_source(self):
+        if isinstance(self.text, str):
+            chunk = self.text[self.pos:self.pos + self.buffer_size]
+        else:
+            chunk = self.text.read(self.buffer_size)
+        self.pos += len(chunk)
+        return chunk
+
+    def more(self):
+        """True while there is input that has not been loaded yet."""
+        return bool(self.pending)
+
+    def next_chunk(self):
+        """Return the next buffer_size characters of input ('' at the end)."""
+        chunk = self.pending
+        self.pending = self.read_source() if chunk else ""
+        return chunk
+
     def load_buffer(self, index):
         """Load buffer[index] with sentinel at the end."""
-        start = self.pos
-        end = min(self.pos + self.buffer_size, len(self.text))
-        chunk = list(self.text[start:end])
-        self.pos = end
+        chunk = list(self.next_chunk())
         chunk.append(EOF)
         self.buffers[index] = chunk
-        print(f"Buffer[{index}] loaded: {chunk}")
+        if self.verbose:
+            print(f"Buffer[{index}] loaded: {chunk}")
 
     def get_next_char(self):
         char = self.buffers[self.active_buffer][self.forward]
         self.forward += 1
 
         if char == EOF:
-            if self.pos < len(self.text):
+            if self.more():
                 # Switch buffer
                 old_buffer = self.active_buffer
                 self.active_buffer = 1 - self.active_buffer
                 self.forward = 0
                 self.load_buffer(self.active_buffer)
-                print(f"[Switch] End of buffer[{old_buffer}] → switch to buffer[{self.active_buffer}]")
+                if self.verbose:
+                    print(f"[Switch] End of buffer[{old_buffer}] → switch to buffer[{self.active_buffer}]")
                 # Read next char from new buffer
                 return self.get_next_char()
             else:
@@ -41,18 +65,362 @@ class TwoBufferInput:
         else:
             return char
 
+    def tokens(self, match, pending=None, max_token=1 << 20):
+        """
+        Yield (kind, lexeme) lazily, reading the input one buffer at a time.
+
+        match(text, pos) -> (kind, end) is a lexer's single-token matcher;
+        kind None means nothing matched.  The window always holds the half
+        that lexemeBegin is in plus the next half, so at least buffer_size
+        characters of lookahead are available.  A token that runs into the end
+        of the window is matched again once the next half is loaded, so tokens
+        that span a buffer boundary come out whole.
+
+        That is not enough for a token that only matches once it is closed:
+        in "/* c" the comment rule fails and a shorter rule ("/") wins.
+        pending maps such a fallback kind to a compiled regex that matches at
+        lexemeBegin when the token there is really an unfinished one (an open
+        comment or string, "12." before its digits); the window then keeps
+        growing until it no longer does or the input ends.  The regex is only
+        tried when match() returns one of those kinds, and should only look
+        at the token's opening (or, for a string that cannot span lines, up
+        to the end of its line), so it costs O(1) per token, not O(window).
+
+        A token still open after max_token characters raises ValueError, so
+        memory stays at two buffers plus max_token however the input ends.
+        """
+        pending = pending or {}
+        window = "".join(self.buffers[self.active_buffer][:-1])  # drop the sentinel
+        begin = 0   # lexemeBegin
+        base = 0    # offset of window[0] in the whole input
+        while True:
+            if len(window) - begin < self.buffer_size and self.more():
+                # lexemeBegin left the older half: drop it (keeping one
+                # character of left context for \b) and load the other half
+                keep = begin - 1 if begin else 0
+                window = window[keep:] + self.next_chunk()
+                base += keep
+                begin -= keep
+            if begin >= len(window):
+                return
+            kind, end = match(window, begin)
+            while self.more() and (end == len(window) or kind in pending and pending[kind].match(window, begin)):
+                # forward hit the end of the loaded input, or the token is still
+                # open: it may go on
+                if len(window) - begin >= max_token:
+                    raise ValueError(f"Token at position {base + begin} is still open after "
+                                     f"{max_token} characters (max_token)")
+                window += self.next_chunk()
+                kind, end = match(window, begin)
+            if kind is None:
+                raise ValueError(f"Unexpected character at position {base + begin}: '{window[begin]}'")
+            yield kind, window[begin:end]
+            begin = end
+
+
+def stream_tokens(source, match, buffer_size=1 << 16, pending=None, max_token=1 << 20):
+    """Tokenize a str or text file object through a TwoBufferInput."""
+    return TwoBufferInput(source, buffer_size, verbose=False).tokens(match, pending, max_token)
+
+
+SENTINEL = 0  # sentinel byte of ByteTwoBufferInput
+
+
+class ByteTwoBufferInput:
+    """
+    Buffer pair over a binary source: a file object (refilled with readinto)
+    or anything exposing the buffer protocol, such as bytes or an mmap.
+
+    One preallocated bytearray holds both halves back to back:
+
+        buf[0:N]    first half
+        buf[N:2N]   second half
+        buf[2N]     sentinel, always
+
+    and a sentinel byte sits right after the last byte loaded, so next_byte()
+    does one comparison per byte; only on a sentinel does it check whether
+    this is the end of a half (load the other one), the end of the input, or
+    a NUL that belongs to the data.  Lexemes that cross from the first half
+    into the second are contiguous, so lexeme() is a zero-copy memoryview;
+    only a lexeme that wraps from the second half back into the first is
+    copied.  A lexeme must be shorter than half_size bytes.
+
+    Lines are tracked per half: loading a half counts the newlines of the one
+    before it once (at C speed), and location() counts forward from the last
+    position it was asked about, so asking for the position of every token
+    stays cheap.
+    """
+
+    def __init__(self, source, half_size=1 << 16):
+        n = self.half_size = half_size
+        self.buf = bytearray(2 * n + 1)
+        self.view = memoryview(self.buf)
+        if hasattr(source, "readinto"):
+            self._readinto = source.readinto
+        else:
+            self._source, self._source_pos = memoryview(source).cast("B"), 0
+            self._readinto = self._copy_into
+        self.begin = 0      # lexemeBegin
+        self.forward = 0
+        self.end = 0        # index of the sentinel after the last byte loaded
+        self.eof = False
+        # Per half: absolute offset of its first byte, bytes loaded, and an
+        # anchor (index, its line, absolute offset where that line starts)
+        self.base = [0, 0]
+        self.size = [0, 0]
+        self.anchor = [(0, 1, 0), (n, 1, 0)]
+        self._mark = (0, -1, 1, 0)   # (index, half base, line, line start) of the last location()
+        self._load(0)
+
+    # --- loading ----------------------------------------------------------
+    def _copy_into(self, target):
+        data = self._source[self._source_pos:self._source_pos + len(target)]
+        target[:len(data)] = data
+        self._source_pos += len(data)
+        return len(data)
+
+    def _load(self, h):
+        """Fill half h from the source; returns the number of bytes read."""
+        n = self.half_size
+        lo = h * n
+        if (lo - self.begin) % (2 * n) >= n:
+            raise ValueError(f"Lexeme at offset {self.offset()} is longer than the buffer half ({n} bytes)")
+        k = 0
+        while k < n:
+            got = self._readinto(self.view[lo + k:lo + n])
+            if not got:
+                break
+            k += got
+        if k < n:
+            self.eof = True
+        if k == 0:
+            return 0
+
+        p = 1 - h   # the half holding the input just before this one
+        plo, pend = p * n, p * n + self.size[p]
+        index, line, line_start = self.anchor[p]
+        last = self.buf.rfind(b"\n", index, pend)
+        self.anchor[h] = (lo, line + self.buf.count(b"\n", index, pend),
+                          self.base[p] + last - plo + 1 if last >= 0 else line_start)
+        self.base[h] = self.base[p] + self.size[p]
+        self.size[h] = k
+        self.end = lo + k
+        # the last location() may have counted over bytes that are replaced
+        # now (this half, or the byte the sentinel is about to cover)
+        self._mark = (0, -1, 1, 0)
+        if self.end == n and self.size[1]:
+            # the sentinel covers the first byte of the older second half:
+            # move its anchor past that byte
+            index, line, line_start = self.anchor[1]
+            if index == n:
+                if self.buf[n] == ord("\n"):
+                    line, line_start = line + 1, self.base[1] + 1
+                self.anchor[1] = (n + 1, line, line_start)
+        self.buf[self.end] = SENTINEL
+        return k
+
+    # --- scanning ---------------------------------------------------------
+    def next_byte(self):
+        """The byte at forward (an int), advancing forward; -1 at end of input."""
+        c = self.buf[self.forward]
+        self.forward += 1
+        if c == SENTINEL:
+            return self._sentinel(self.forward - 1)
+        return c
+
+    def _sentinel(self, i):
+        n2 = 2 * self.half_size
+        if i == self.end:
+            if self.eof or not self._load(1 if i == self.half_size else 0):
+                self.forward = i
+                return -1
+        elif i != n2:
+            return SENTINEL   # a NUL in the data
+        if i == n2:
+            # wrap around into the first half (already loaded after a retract)
+            self.forward = 0
+            if self.begin == n2:
+                self.begin = 0
+        else:
+            self.forward = i
+        return self.next_byte()
+
+    def retract(self, n=1):
+        """Move forward back n bytes (never before lexemeBegin)."""
+        self.forward -= n
+        if self.forward < 0:
+            self.forward += 2 * self.half_size
+
+    def start_lexeme(self):
+        """Set lexemeBegin to forward."""
+        self.begin = self.forward
+
+    def lexeme(self):
+        """The bytes from lexemeBegin to forward: a memoryview unless the lexeme wraps."""
+        if self.begin <= self.forward:
+            return self.view[self.begin:self.forward]
+        return bytes(self.view[self.begin:2 * self.half_size]) + bytes(self.view[:self.forward])
+
+    # --- positions --------------------------------------------------------
+    def _half(self, i):
+        n = self.half_size
+        if i == n:
+            return 0 if self.end == n else 1
+        return 1 if i > n else 0
+
+    def offset(self, i=None):
+        """Absolute offset in the input of buffer index i (default lexemeBegin)."""
+        i = self.begin if i is None else i
+        h = self._half(i)
+        return self.base[h] + i - h * self.half_size
+
+    def location(self, i=None):
+        """(line, column), both from 1, of buffer index i (default lexemeBegin)."""
+        i = self.begin if i is None else i
+        h = self._half(i)
+        lo = h * self.half_size
+        mark, mark_base, line, line_start = self._mark
+        if mark_base != self.base[h] or not lo <= mark <= i:
+            mark, line, line_start = self.anchor[h]
+        nl = self.buf.count(b"\n", mark, i)
+        if nl:
+            line += nl
+            line_start = self.base[h] + self.buf.rfind(b"\n", mark, i) - lo + 1
+        self._mark = (i, self.base[h], line, line_start)
+        return line, self.base[h] + i - lo - line_start + 1
+
+    def tokens(self, dfa, skip=()):
+        """
+        Yield (name, lexeme, line, column) using a regex_dfa.DFA, longest match
+        first.  forward runs ahead until the DFA dies and is then retracted to
+        the end of the last accepted lexeme.  The lexeme is a view into the
+        buffer, valid until the next token is requested; copy it with bytes()
+        to keep it.
+        """
+        table, classmap, accept, k, names = dfa.table, dfa.classmap, dfa.accept, dfa.n_classes, dfa.names
+        other = len(classmap) - 1
+        next_byte = self.next_byte
+        while True:
+            self.start_lexeme()
+            state, token, length, read = 0, -1, 0, 0
+            while True:
+                c = next_byte()
+                if c < 0:
+                    break
+                read += 1
+                state = table[state * k + classmap[c if c < other else other]]
+                if state < 0:
+                    break
+                if accept[state] >= 0:
+                    token, length = accept[state], read
+            if token < 0:
+                if read == 0:
+                    return
+                line, column = self.location()
+                raise ValueError(f"Unexpected byte at line {line}, column {column}: {bytes(self.lexeme()[:1])!r}")
+            self.retract(read - length)
+            name = names[token]
+            if name not in skip:
+                yield (name, self.lexeme(), *self.location())
+
+
+def compare_streams(count=300, sizes=(1, 2, 3, 4, 7), seed=0):
+    """
+    Lex random snippets with each lexer's whole-text and streaming entry
+    points at small buffer sizes; returns the (lexer, buffer size, text)
+    cases where they disagree (an exception counts as output).
+    """
+    import random
+    from loader import load_script
+
+    lab01, lexeme, lexeme2, lex = (load_script(f) for f in ("lab01.py", "lexeme.py", "lexeme 2.py", "Lex program.py"))
+    lexers = [
+        ("lab01", lab01.tokens, lab01.lexical_analyzer_stream,
+         ["int", " ", "a", ";", "/*", "*/", "//", "\n", "12", ".", "5", '"', "'", "==", "=", "/", "*", "&&", "("]),
+        ("lexeme", lexeme.lexer, lexeme.lexer_stream,
+         ["int", " ", "a", ";", "/*", "*/", "\n", "12", ".", "5", "-", "<=", "<", "=", "*", "?", ":", "||"]),
+        ("lexeme 2", lexeme2.lexer, lexeme2.lexer_stream,
+         ["def", " ", "a", ":", '"', "'", '"""', "#", "\n", "12", ".", "5", "-", "==", "=", "*", "/", "->"]),
+        ("Lex program", lex.lexer, lambda text, size: lex.lexer_stream(text, buffer_size=size),
+         ["if", "then", " ", "x", "1", "12", ".", "5", "E", "+", "-", "<", ">", "=", "\n", "iffy"]),
+    ]
+
+    def run(tokens):
+        try:
+            return list(tokens())
+        except (RuntimeError, ValueError) as e:
+            return type(e).__name__
+
+    rng = random.Random(seed)
+    mismatches = []
+    for name, whole, stream, pieces in lexers:
+        for _ in range(count):
+            text = "".join(rng.choice(pieces) for _ in range(rng.randint(1, 30)))
+            expected = run(lambda: whole(text))
+            mismatches += [(name, size, text) for size in sizes if run(lambda: stream(text, size)) != expected]
+    return mismatches
+
+
+def check_locations(count=2000, half_sizes=(1, 2, 3, 4, 5, 8), seed=0):
+    """
+    Lex random byte strings (newlines and NULs included) with
+    ByteTwoBufferInput at small half sizes and with DFA.scan on the whole
+    text; returns the (half size, data) cases whose tokens or (line, column)
+    positions disagree.
+    """
+    import random
+    from regex_dfa import compile_rules
+
+    dfa = compile_rules([("ID", "[a-z]+"), ("NUM", "[0-9]+"), ("WS", "[ \n]+"), ("OP", "<=|<|="), ("Z", "\0")])
+    pieces = [b"a", b"b", b"x", b"1", b" ", b"\n", b"\n\n", b"<", b"=", b"\0"]
+    rng = random.Random(seed)
+    mismatches = []
+    for _ in range(count):
+        data = b"".join(rng.choice(pieces) for _ in range(rng.randint(0, 40)))
+        text = data.decode("latin-1")
+        expected = [(name, data[start:end], text.count("\n", 0, start) + 1, start - text.rfind("\n", 0, start))
+                    for name, start, end in dfa.scan(text)]
+        longest = max((len(lexeme) for _, lexeme, _, _ in expected), default=0)
+        for size in half_sizes:
+            if longest >= size:
+                continue   # lexemes must be shorter than a half
+            got = [(name, bytes(lexeme), line, column)
+                   for name, lexeme, line, column in ByteTwoBufferInput(data, size).tokens(dfa)]
+            if got != expected:
+                mismatches.append((size, data))
+    return mismatches
+
 
 # ----------------------
 # Example Usage
 # ----------------------
-text = "hello world!"
-print(text , "\n")
-scanner = TwoBufferInput(text, buffer_size=5)
-
-print("\nCharacters read with sentinel buffering:\n")
-while True:
-    ch = scanner.get_next_char()
-    if ch is None:
-        print("\n[END] All characters processed.")
-        break
-    print(f"Read: {ch}")
+if __name__ == "__main__":
+    text = "hello world!"
+    print(text , "\n")
+    scanner = TwoBufferInput(text, buffer_size=5)
+
+    print("\nCharacters read with sentinel buffering:\n")
+    while True:
+        ch = scanner.get_next_char()
+        if ch is None:
+            print("\n[END] All characters processed.")
+            break
+        print(f"Read: {ch}")
+
+    print("\nTokens read from a binary file with ByteTwoBufferInput:\n")
+    import io
+    from regex_dfa import compile_rules
+    dfa = compile_rules([("ID", r"[A-Za-z_]\w*"), ("NUM", r"\d+"), ("OP", r"[-+*/<>=!]=?"), ("WS", r"\s+")])
+    source = io.BytesIO(b"count = 10\nwhile count >= 1\n    count = count - 1\n")
+    for name, lexeme, line, column in ByteTwoBufferInput(source, half_size=8).tokens(dfa, skip={"WS"}):
+        print(f"{line}:{column:<3} {name:4} {bytes(lexeme).decode()}")
+
+    print("\nByteTwoBufferInput positions against DFA.scan, halves of 1 to 8 bytes:")
+    mismatches = check_locations()
+    print(f"{len(mismatches)} mismatches")
+    assert not mismatches, mismatches[:5]
+
+    print("\nStreaming lexers against whole-text lexing, buffers of 1 to 7 characters:")
+    mismatches = compare_streams()
+    print(f"{len(mismatches)} mismatches")
+    assert not mismatches, mismatches[:5]
@@ -0,0 +1,163 @@
+"""
+Identifier interning and perfect-hash keyword classification.
+
+SymbolTable hands out one Symbol per distinct name.  A Symbol is an int (its
+id), so equality, hashing and array indexing are integer operations, but it
+prints as its name, so code that formats names keeps working.  Reserved words
+passed to the table get the ids 0..n_reserved-1.
+
+PerfectHash is a gperf-style perfect hash over a fixed word set:
+
+    h(w) = (len(w) + sum(asso[w[p]] for p in positions)) % size
+
+Every word gets its own slot, so classifying a lexeme costs a few character
+lookups and one comparison.  find() works on a span of a larger text, so a
+lexeme can be classified without cutting it out of the source, and source()
+emits the classifier as standalone Python.  lexer_compact() in lexeme.py and
+lexeme 2.py classifies names this way, and uses a keyword's index in words
+as its reserved symbol id.
+"""
+
+import random
+
+NO_SYMBOL = 0xFFFFFFFF   # TokenStream.symbols entry of a token that is not a name
+
+
+class Symbol(int):
+    """An interned name: compares and hashes as its id, prints as its name."""
+
+    def __new__(cls, id, name):
+        self = int.__new__(cls, id)
+        self.name = name
+        return self
+
+    def __bool__(self):
+        return True   # a name, even the one with id 0
+
+    def __str__(self):
+        return self.name
+
+    def __repr__(self):
+        return f"Symbol({int(self)}, {self.name!r})"
+
+    def __format__(self, spec):
+        return format(self.name, spec)
+
+
+class SymbolTable:
+    def __init__(self, reserved=()):
+        self._by_name = {}
+        self.symbols = []
+        for word in reserved:
+            self.intern(word)
+        self.n_reserved = len(self.symbols)
+
+    def intern(self, name):
+        """The Symbol for name, created on first use."""
+        symbol = self._by_name.get(name)
+        if symbol is None:
+            symbol = self._by_name[name] = Symbol(len(self.symbols), name)
+            self.symbols.append(symbol)
+        return symbol
+
+    def is_reserved(self, symbol):
+        return symbol < self.n_reserved
+
+    def __getitem__(self, id):
+        return self.symbols[id]
+
+    def __contains__(self, name):
+        return name in self._by_name
+
+    def __len__(self):
+        return len(self.symbols)
+
+
+class PerfectHash:
+    POSITION_SETS = ((0, -1), (0, 1, -1), (0, 1, 2, -1))
+
+    def __init__(self, words, seed=0, tries=200):
+        self.words = sorted(set(words))
+        if not self.words or "" in self.words:
+            raise ValueError("PerfectHash needs a non-empty set of non-empty words")
+        self.min_len = min(map(len, self.words))
+        self.max_len = max(map(len, self.words))
+        rng = random.Random(seed)
+        n = len(self.words)
+        for positions in self.POSITION_SETS:
+            chars = sorted({w[p] for w in self.words for p in positions if p < len(w)})
+            for size in range(n, 4 * n + 1):
+                for _ in range(tries):
+                    asso = {c: rng.randrange(size) for c in chars}
+                    slots = self._place(positions, asso, size)
+                    if slots is not None:
+                        self.positions, self.asso, self.size, self.slots = positions, asso, size, slots
+                        return
+        raise ValueError("No perfect hash found; try another seed")
+
+    def _place(self, positions, asso, size):
+        slots = [-1] * size
+        for index, w in enumerate(self.words):
+            h = (len(w) + sum(asso[w[p]] for p in positions if p < len(w))) % size
+            if slots[h] >= 0:
+                return None
+            slots[h] = index
+        return slots
+
+    def find(self, text, start=0, end=None):
+        """Index of text[start:end] in self.words, or -1; the span is never copied."""
+        if end is None:
+            end = len(text)
+        n = end - start
+        if n < self.min_len or n > self.max_len:
+            return -1
+        h = n
+        asso = self.asso
+        for p in self.positions:
+            if p < n:
+                v = asso.get(text[start + p if p >= 0 else end + p])
+                if v is None:
+                    return -1
+                h += v
+        index = self.slots[h % self.size]
+        if index < 0 or len(self.words[index]) != n or not text.startswith(self.words[index], start):
+            return -1
+        return index
+
+    def __contains__(self, word):
+        return self.find(word) >= 0
+
+    def source(self, name="keyword_index"):
+        """Python source of a standalone function equivalent to find()."""
+        return f"""\
+WORDS = {self.words!r}
+ASSO = {self.asso!r}
+SLOTS = {self.slots!r}
+
+def {name}(s):
+    n = len(s)
+    if n < {self.min_len} or n > {self.max_len}:
+        return -1
+    h = n
+    for p in {self.positions!r}:
+        if p < n:
+            v = ASSO.get(s[p])
+            if v is None:
+                return -1
+            h += v
+    i = SLOTS[h % {self.size}]
+    return i if i >= 0 and WORDS[i] == s else -1
+"""
+
+
+if __name__ == "__main__":
+    import keyword
+
+    kw = PerfectHash(keyword.kwlist)
+    print(f"{len(kw.words)} Python keywords in {kw.size} slots, positions {kw.positions}")
+    for word in ["while", "whale", "lambda", "x", "nonlocal"]:
+        print(f"  {word!r:12} -> {kw.find(word)}")
+
+    table = SymbolTable(reserved=["float", "return"])
+    a, b, a2 = table.intern("limitedSquare"), table.intern("x"), table.intern("limitedSquare")
+    print(f"\n{a!r} {b!r}; same symbol again: {a2 is a}; reserved 'return': {table.is_reserved(table.intern('return'))}")
@@ -0,0 +1,96 @@
+"""
+Compact token storage shared by the lexers.
+
+A list of (kind, value) tuples costs a tuple, a substring and often a
+float/int per token.  TokenStream keeps the kind as one byte and the lexeme
+as two 4-byte offsets into the source, about 9 bytes per token.  Values are
+cut from the source only when asked for, and numbers are converted on demand.
+For bytes-like sources the values are zero-copy memoryview slices.
+"""
+
+from array import array
+
+
+def number(text):
+    """Convert a NUM lexeme the way the tuple lexers do."""
+    return float(text) if "." in text else int(text)
+
+
+class TokenStream:
+    def __init__(self, source, kinds, converters=None):
+        """
+        source     the text the offsets point into (str or bytes-like)
+        kinds      kind names, indexed by the codes stored in self.kinds
+        converters optional {kind name: function} applied to values on demand
+        """
+        self.source = source
+        self.kind_names = kinds
+        self.kinds = array("B")
+        self.starts = array("I")
+        self.ends = array("I")
+        self._convert = [None] * len(kinds)
+        for name, fn in (converters or {}).items():
+            self._convert[kinds.index(name)] = fn
+        self._view = None if source is None or isinstance(source, str) else memoryview(source)
+        self.symbols = None   # array('I') of symbol ids, filled by lexers given a SymbolTable
+
+    def append(self, kind, start, end):
+        self.kinds.append(kind)
+        self.starts.append(start)
+        self.ends.append(end)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def kind(self, i):
+        return self.kind_names[self.kinds[i]]
+
+    def text(self, i):
+        """The raw lexeme: a str slice, or a memoryview for bytes sources."""
+        if self._view is not None:
+            return self._view[self.starts[i]:self.ends[i]]
+        return self.source[self.starts[i]:self.ends[i]]
+
+    def value(self, i):
+        """The lexeme, converted if its kind has a converter (e.g. NUM)."""
+        fn = self._convert[self.kinds[i]]
+        text = self.text(i)
+        if fn is None:
+            return text
+        if self._view is not None:
+            text = str(text, "utf-8")
+        return fn(text)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self.kinds)
+        if not 0 <= i < len(self.kinds):
+            raise IndexError("token index out of range")
+        return self.kind_names[self.kinds[i]], self.value(i)
+
+    def __iter__(self):
+        """Yield (kind, value) tuples, so code written for the list lexers keeps working."""
+        names, convert = self.kind_names, self._convert
+        source = self.source if self._view is None else self._view
+        for k, i, j in zip(self.kinds, self.starts, self.ends):
+            fn = convert[k]
+            text = source[i:j]
+            if fn is None:
+                yield names[k], text
+            else:
+                yield names[k], fn(text if self._view is None else str(text, "utf-8"))
+
+    def nbytes(self):
+        """Memory held by the token arrays (the source is not counted)."""
+        return sum(a.itemsize * len(a) for a in (self.kinds, self.starts, self.ends))
+
+    def to_bytes(self):
+        """(kinds, starts, ends) as bytes, cheap to pickle or write out."""
+        return self.kinds.tobytes(), self.starts.tobytes(), self.ends.tobytes()
+
+    @classmethod
+    def from_bytes(cls, source, kinds, packed, converters=None):
+        stream = cls(source, kinds, converters)
+        for arr, data in zip((stream.kinds, stream.starts, stream.ends), packed):
+            arr.frombytes(data)
+        return stream
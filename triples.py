@@ -1,12 +1,35 @@
 import ast
+from collections import namedtuple
+
+from symbols import SymbolTable
+
+
+class Ref(namedtuple("Ref", "index")):
+    """
+    Operand that refers to an earlier triple.  Interned names are ints, so a
+    bare index would compare equal to a name; a Ref never does, but it prints
+    as the plain index.
+    """
+    __slots__ = ()
+
+    def __str__(self):
+        return str(self.index)
+
+    def __format__(self, spec):
+        return format(self.index, spec)
+
 
 class TACTriplesSequential:
-    def __init__(self):
+    def __init__(self, symbols=None):
         self.triples = []
         self.tac = []
         self.expr_map = {}  # maps temp/variable to triple index
         self.temp_count = 0
 
+        # Optional SymbolTable: names are stored as their interned Symbols (ints);
+        # results of earlier triples are Refs
+        self.symbols = symbols
+
     def new_temp(self):
         self.temp_count += 1
         return f"t{self.temp_count}"
@@ -25,8 +48,8 @@ class TACTriplesSequential:
             idx = len(self.triples)
             self.triples.append((op, left_ref, right_ref))
             self.tac.append(f"t{idx} = {left_ref} {op} {right_ref}")
-            self.expr_map[f"t{idx}"] = idx  # map temp to triple index
-            return idx  # return triple index as result
+            self.expr_map[f"t{idx}"] = Ref(idx)  # map temp to triple index
+            return Ref(idx)  # return triple index as result
 
         elif isinstance(node, ast.UnaryOp):
             operand = self.visit(node.operand)
@@ -35,13 +58,13 @@ class TACTriplesSequential:
                 idx = len(self.triples)
                 self.triples.append(('neg', operand_ref, '-'))
                 self.tac.append(f"t{idx} = -{operand_ref}")
-                self.expr_map[f"t{idx}"] = idx
-                return idx
+                self.expr_map[f"t{idx}"] = Ref(idx)
+                return Ref(idx)
             else:
                 raise NotImplementedError("Only unary minus supported")
 
         elif isinstance(node, ast.Name):
-            return node.id
+            return self.name(node.id)
 
         elif isinstance(node, ast.Constant):
             return str(node.value)
@@ -51,14 +74,17 @@ class TACTriplesSequential:
 
     def visit_Assign(self, node):
         """Handle assignment statements"""
-        target = node.targets[0].id
+        target = self.name(node.targets[0].id)
         value_idx = self.visit(node.value)
         # Assignment triple: target in Arg1, computed index in Arg2
         idx = len(self.triples)
         self.triples.append(('=', target, value_idx))
-        self.tac.append(f"{target} = t{value_idx}" if isinstance(value_idx, int) else f"{target} = {value_idx}")
+        self.tac.append(f"{target} = t{value_idx}" if isinstance(value_idx, Ref) else f"{target} = {value_idx}")
         return idx
 
+    def name(self, ident):
+        return ident if self.symbols is None else self.symbols.intern(ident)
+
     def get_op(self, op_node):
         ops = {
             ast.Add: "+",
@@ -87,7 +113,7 @@ class TACTriplesSequential:
 # =========================
 if __name__ == "__main__":
     stmt = input("Enter an arithmetic statement (with or without assignment): ")
-    generator = TACTriplesSequential()
+    generator = TACTriplesSequential(SymbolTable())
     generator.generate(stmt)
 
     print("\nThree Address Code (TAC):\n")
@@ -2,19 +2,24 @@
 # Compiler-style Type Conversion Simulation
 # =============================================
 
+from symbols import SymbolTable
+
+
 def type_conversion_demo():
-    # Symbol table: var_name -> (type, value)
+    # Symbol table: interned name -> (type, value)
+    names = SymbolTable()
+    a, b = names.intern('a'), names.intern('b')
     symbol_table = {}
 
     # Step 1: Declare a = 2
     a_val = 2
     a_type = 'int'
-    symbol_table['a'] = (a_type, a_val)
+    symbol_table[a] = (a_type, a_val)
     print(f"a = {a_val} (type: {a_type})")
 
     # Step 2: Expression b = a * 3.14
     # Get a's value and type
-    operand1_val, operand1_type = symbol_table['a'][1], symbol_table['a'][0]
+    operand1_val, operand1_type = symbol_table[a][1], symbol_table[a][0]
     operand2_val, operand2_type = 3.14, 'float'
 
     # Compiler-style implicit type conversion
@@ -30,7 +35,7 @@ def type_conversion_demo():
 
     # Compute result
     b_val = operand1_val * operand2_val
-    symbol_table['b'] = (result_type, b_val)
+    symbol_table[b] = (result_type, b_val)
 
     print(f"b = {b_val} (type: {result_type})")
 